@@ -475,23 +475,31 @@ class AdminService:
             
             conn.commit()
             conn.close()
+            
+            # Indexar el resumen para que el chat pueda recuperarlo
+            self._index_repository_document({**doc, 'summary_es': summary})
             return True
             
         except Exception as e:
             logger.error(f"Error adding document to DB: {str(e)}")
             return False
 
+    def _index_repository_document(self, doc: Dict):
+        """Indexar documento del repositorio en el índice de recuperación del chat"""
+        try:
+            from document_manager import document_manager
+            document_manager.index_repository_document(doc)
+        except Exception as e:
+            logger.error(f"Error indexing repository document: {str(e)}")
+
     def _generate_summary(self, title: str) -> str:
         """Generar resumen automático en castellano usando LLM"""
         try:
-            from emergentintegrations import LLMService
+            from llm_client import llm_pool
             
-            llm_key = os.getenv('EMERGENT_LLM_KEY')
-            if not llm_key:
+            if not llm_pool.api_key:
                 return f"Documento sobre {title}"
             
-            llm_service = LLMService(api_key=llm_key)
-            
             prompt = f"""
             Genera un resumen breve en castellano (máximo 100 palabras) sobre este documento legal/técnico:
             
@@ -501,13 +509,15 @@ class AdminService:
             Usa un lenguaje profesional pero accesible.
             """
             
-            response = llm_service.chat_completion(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=150
+            response = llm_pool.complete_sync(
+                "openai", "gpt-4o-mini",
+                prompt=prompt,
+                system_message="Eres un asistente que resume documentos normativos y técnicos en castellano.",
+                session_id=f"admin_summary_{hashlib.md5(title.encode()).hexdigest()}",
+                fairness_key="admin"
             )
             
-            return response.choices[0].message.content.strip()
+            return response.strip()
             
         except Exception as e:
             logger.error(f"Error generating summary: {str(e)}")
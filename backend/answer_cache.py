@@ -0,0 +1,135 @@
+import os
+import time
+import uuid
+import logging
+from collections import OrderedDict
+from threading import Lock
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class SemanticAnswerCache:
+    """Reuses previous answers for questions that mean the same thing
+
+    Entries are bucketed by (category, knowledge-base generation), so an answer
+    is only reused while the index it was grounded on is unchanged. Within a
+    bucket the closest stored question by cosine similarity wins if it clears
+    the threshold. Entries expire after ``ttl_seconds`` and the least recently
+    used are evicted beyond ``max_entries``.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.92, ttl_seconds: float = 86400, max_entries: int = 2000):
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._buckets: Dict[Tuple[str, int], set] = {}
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
+
+    def _remove(self, entry_id: str):
+        entry = self._entries.pop(entry_id, None)
+        if entry:
+            bucket = self._buckets.get(entry["bucket"])
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[entry["bucket"]]
+
+    def lookup(self, embedding: List[float], category: Optional[str], generation: int) -> Optional[Dict[str, Any]]:
+        """Return the cached answer closest to this question, or None"""
+        vector = self._normalize(embedding)
+        bucket_key = (category or "general", generation)
+        now = time.monotonic()
+
+        with self._lock:
+            best_id, best_similarity = None, -1.0
+            for entry_id in list(self._buckets.get(bucket_key, ())):
+                entry = self._entries[entry_id]
+                if now - entry["created"] > self.ttl_seconds:
+                    self._remove(entry_id)
+                    self.expirations += 1
+                    continue
+                if vector is None:
+                    continue
+                similarity = float(np.dot(vector, entry["vector"]))
+                if similarity > best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+
+            if best_id is None or best_similarity < self.similarity_threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(best_id)
+            entry = self._entries[best_id]
+            entry["hits"] += 1
+            return {
+                "answer": entry["answer"],
+                "relevant_documents": entry["relevant_documents"],
+                "question": entry["question"],
+                "similarity": round(best_similarity, 4)
+            }
+
+    def store(self, embedding: List[float], category: Optional[str], generation: int, question: str,
+              answer: str, relevant_documents: List[Dict[str, Any]]):
+        """Remember an answer for future similar questions"""
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+        bucket_key = (category or "general", generation)
+
+        with self._lock:
+            entry_id = str(uuid.uuid4())
+            self._entries[entry_id] = {
+                "bucket": bucket_key,
+                "vector": vector,
+                "question": question,
+                "answer": answer,
+                "relevant_documents": relevant_documents,
+                "created": time.monotonic(),
+                "hits": 0
+            }
+            self._buckets.setdefault(bucket_key, set()).add(entry_id)
+
+            # Entries from older generations can never be hit again
+            for stale_key in [key for key in self._buckets if key[1] != generation]:
+                for stale_id in list(self._buckets[stale_key]):
+                    self._remove(stale_id)
+                    self.evictions += 1
+
+            while len(self._entries) > self.max_entries:
+                oldest_id = next(iter(self._entries))
+                self._remove(oldest_id)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit-rate and size metrics"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "similarity_threshold": self.similarity_threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+answer_cache = SemanticAnswerCache(
+    similarity_threshold=float(os.getenv('ANSWER_CACHE_SIMILARITY', '0.92')),
+    ttl_seconds=float(os.getenv('ANSWER_CACHE_TTL_SECONDS', '86400')),
+    max_entries=int(os.getenv('ANSWER_CACHE_MAX_ENTRIES', '2000'))
+)
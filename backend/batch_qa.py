@@ -0,0 +1,356 @@
+import os
+import sys
+import json
+import uuid
+import asyncio
+import hashlib
+import logging
+import argparse
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Set
+from answer_cache import answer_cache
+from chat_service import RETRIEVAL_SOURCES
+from document_manager import document_manager
+from llm_client import PRIORITY_BATCH
+
+logger = logging.getLogger(__name__)
+
+# Invalid lines reported in a job's progress; the rest are only counted
+MAX_REPORTED_LINE_ERRORS = 20
+
+def load_questions(path: Path, errors: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """Read questions from a text file (one per line) or NDJSON ({"question", "id"?, "category"?})
+    
+    Invalid lines are skipped; each one is logged and, if ``errors`` is given,
+    appended to it as {"line", "error"}.
+    """
+    def skip(line_number: int, error: str):
+        logger.warning(f"Skipping line {line_number} of {path}: {error}")
+        if errors is not None:
+            errors.append({"line": line_number, "error": error})
+    
+    questions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    skip(line_number, f"invalid JSON ({e.msg})")
+                    continue
+            else:
+                record = {"question": line}
+            if not isinstance(record, dict) or not isinstance(record.get("question"), str) or not record["question"].strip():
+                skip(line_number, "no question")
+                continue
+            record.setdefault("id", hashlib.sha1(record["question"].encode("utf-8")).hexdigest()[:16])
+            questions.append(record)
+    return questions
+
+class BatchQAJob:
+    """Answers a file of questions offline through the chat pipeline
+
+    Contexts are retrieved in batches (one embedding call and one vector query per
+    batch), then answers are generated with bounded concurrency and retries. Each
+    result is appended to an NDJSON file as soon as it is ready; that file is
+    also the checkpoint, so running the job again skips questions already answered.
+    """
+
+    def __init__(self, chat_service, questions_path: Path, output_path: Path, job_id: Optional[str] = None,
+                 category: Optional[str] = None, concurrency: int = 8, max_retries: int = 3,
+                 retrieval_batch_size: int = 64):
+        self.chat_service = chat_service
+        self.questions_path = Path(questions_path)
+        self.output_path = Path(output_path)
+        self.job_id = job_id or str(uuid.uuid4())
+        self.category = category
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.retrieval_batch_size = retrieval_batch_size
+        self.status = "pending"
+        self.total = 0
+        self.skipped = 0
+        self.completed = 0
+        self.failed = 0
+        self.line_errors: List[Dict[str, Any]] = []
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self._write_lock = asyncio.Lock()
+
+    def _results(self) -> List[Dict[str, Any]]:
+        """Results written so far, by this or a previous run"""
+        results = []
+        if not self.output_path.exists():
+            return results
+        with open(self.output_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    results.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A line cut short by a crash; that question is simply answered again
+                    continue
+        return results
+
+    def answered_ids(self) -> Set[str]:
+        """Questions already answered successfully by a previous run"""
+        return {result["id"] for result in self._results() if result.get("status") == "ok"}
+
+    def load_checkpoint(self):
+        """Progress of a job that is not running in this process, read from its files"""
+        self.line_errors = []
+        ids = {question["id"] for question in load_questions(self.questions_path, self.line_errors)}
+        results = self._results()
+        answered = {result["id"] for result in results if result.get("status") == "ok"} & ids
+        failed = ({result["id"] for result in results if result.get("status") == "error"} & ids) - answered
+        self.total = len(ids)
+        self.completed = len(answered)
+        self.failed = len(failed)
+        if self.completed == self.total:
+            self.status = "completed"
+        elif self.completed + self.failed == self.total:
+            self.status = "completed_with_errors"
+        else:
+            self.status = "interrupted"
+
+    async def _write_result(self, result: Dict[str, Any]):
+        line = json.dumps(result, ensure_ascii=False, default=str) + "\n"
+        async with self._write_lock:
+            await asyncio.to_thread(self._append, line)
+
+    def _append(self, line: str):
+        with open(self.output_path, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+
+    async def _retrieve(self, questions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Batched retrieval for questions sharing a category"""
+        generation = document_manager.index_generation
+        category = questions[0].get("category") or self.category
+        embeddings, results = await asyncio.to_thread(
+            document_manager.batch_search_documents,
+            [q["question"] for q in questions], 5, category, RETRIEVAL_SOURCES
+        )
+        contexts = []
+        for embedding, candidates in zip(embeddings, results):
+            cached = answer_cache.lookup(embedding, category, generation)
+            if cached:
+                candidates = cached["relevant_documents"]
+            contexts.append({
+                "query_embedding": embedding,
+                "generation": generation,
+                "cached": cached,
+                "use_cache": True,
+                "candidates": candidates,
+                "relevant_documents": candidates[:3]
+            })
+        return contexts
+
+    async def _answer(self, question: Dict[str, Any], context: Dict[str, Any], semaphore: asyncio.Semaphore):
+        category = question.get("category") or self.category
+        result = {"id": question["id"], "question": question["question"], "category": category or "general"}
+        async with semaphore:
+            for attempt in range(1, self.max_retries + 1):
+                try:
+                    answer = await self.chat_service.complete_answer(
+                        f"batch_{self.job_id}", question["question"], category, context,
+                        priority=PRIORITY_BATCH, fairness_key=f"batch_{self.job_id}"
+                    )
+                    result.update({
+                        "status": "ok",
+                        "answer": answer["answer"],
+                        "metadata": answer["metadata"],
+                        "relevant_documents": [doc.get("metadata", {}).get("title") for doc in context["relevant_documents"]]
+                    })
+                    self.completed += 1
+                    break
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        result.update({"status": "error", "error": str(e)})
+                        self.failed += 1
+                        logger.error(f"Batch QA {self.job_id}: giving up on {question['id']}: {str(e)}")
+                    else:
+                        await asyncio.sleep(2 ** attempt)
+            result["attempts"] = attempt
+        result["completed_at"] = datetime.now(timezone.utc).isoformat()
+        await self._write_result(result)
+
+    async def run(self):
+        """Answer every question not already in the output file"""
+        self.status = "running"
+        self.started_at = datetime.now(timezone.utc)
+        self.completed = self.failed = 0
+        try:
+            self.line_errors = []
+            questions = load_questions(self.questions_path, self.line_errors)
+            done = self.answered_ids()
+            pending = [q for q in questions if q["id"] not in done]
+            self.total = len(questions)
+            self.skipped = len(questions) - len(pending)
+            logger.info(f"Batch QA {self.job_id}: {len(pending)} questions to answer, {self.skipped} already done")
+
+            groups: Dict[Optional[str], List[Dict[str, Any]]] = {}
+            for question in pending:
+                groups.setdefault(question.get("category") or self.category, []).append(question)
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+            tasks = []
+            for group in groups.values():
+                for start in range(0, len(group), self.retrieval_batch_size):
+                    batch = group[start:start + self.retrieval_batch_size]
+                    contexts = await self._retrieve(batch)
+                    # Generation of this batch overlaps with retrieval of the next one
+                    tasks.extend(
+                        asyncio.create_task(self._answer(question, context, semaphore))
+                        for question, context in zip(batch, contexts)
+                    )
+            await asyncio.gather(*tasks)
+            self.status = "completed" if not self.failed else "completed_with_errors"
+
+        except asyncio.CancelledError:
+            self.status = "cancelled"
+            raise
+        except Exception as e:
+            self.status = "failed"
+            logger.error(f"Batch QA {self.job_id} failed: {str(e)}")
+        finally:
+            self.finished_at = datetime.now(timezone.utc)
+            logger.info(f"Batch QA {self.job_id} {self.status}: {self.completed} answered, {self.failed} failed")
+
+    def progress(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "total": self.total,
+            "skipped": self.skipped,
+            "completed": self.completed,
+            "failed": self.failed,
+            "invalid_lines": len(self.line_errors),
+            "line_errors": self.line_errors[:MAX_REPORTED_LINE_ERRORS],
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class BatchQAManager:
+    """Runs batch QA jobs in the background; each job lives in its own directory"""
+
+    QUESTIONS_FILE = "questions.txt"
+    RESULTS_FILE = "results.ndjson"
+    SETTINGS_FILE = "job.json"
+
+    def __init__(self, chat_service, jobs_path: Path, concurrency: int = 8, max_retries: int = 3):
+        self.chat_service = chat_service
+        self.jobs_path = Path(jobs_path)
+        self.jobs_path.mkdir(parents=True, exist_ok=True)
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.jobs: Dict[str, BatchQAJob] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def checked_id(job_id: str) -> str:
+        """Canonical form of a job id from a URL; anything but a UUID never reaches the filesystem"""
+        try:
+            return str(uuid.UUID(job_id))
+        except (ValueError, TypeError):
+            raise ValueError("Batch QA job not found")
+
+    def job_dir(self, job_id: str) -> Path:
+        return self.jobs_path / self.checked_id(job_id)
+
+    def results_path(self, job_id: str) -> Path:
+        return self.job_dir(job_id) / self.RESULTS_FILE
+
+    def create_job(self, questions: bytes, category: Optional[str] = None, concurrency: Optional[int] = None) -> BatchQAJob:
+        """Store the uploaded questions file and start answering it"""
+        job_id = str(uuid.uuid4())
+        job_dir = self.job_dir(job_id)
+        job_dir.mkdir(parents=True)
+        (job_dir / self.QUESTIONS_FILE).write_bytes(questions)
+        settings = {"category": category, "concurrency": concurrency or self.concurrency}
+        (job_dir / self.SETTINGS_FILE).write_text(json.dumps(settings))
+        return self._start(job_id, settings)
+
+    def resume_job(self, job_id: str) -> BatchQAJob:
+        """Run a job again from its checkpoint (also after a restart)"""
+        job_id = self.checked_id(job_id)
+        if job_id in self._tasks and not self._tasks[job_id].done():
+            return self.jobs[job_id]
+        settings_path = self.job_dir(job_id) / self.SETTINGS_FILE
+        if not settings_path.exists():
+            raise ValueError("Batch QA job not found")
+        return self._start(job_id, json.loads(settings_path.read_text()))
+
+    def _job(self, job_id: str, settings: Dict[str, Any]) -> BatchQAJob:
+        return BatchQAJob(
+            self.chat_service,
+            self.job_dir(job_id) / self.QUESTIONS_FILE,
+            self.results_path(job_id),
+            job_id=job_id,
+            category=settings.get("category"),
+            concurrency=settings.get("concurrency") or self.concurrency,
+            max_retries=self.max_retries
+        )
+
+    def _start(self, job_id: str, settings: Dict[str, Any]) -> BatchQAJob:
+        job = self._job(job_id, settings)
+        self.jobs[job_id] = job
+        self._tasks[job_id] = asyncio.create_task(job.run())
+        return job
+
+    def get_job(self, job_id: str) -> Optional[BatchQAJob]:
+        """A job started by this process, or one left on disk (e.g. before a restart)"""
+        job_id = self.checked_id(job_id)
+        if job_id in self.jobs:
+            return self.jobs[job_id]
+        settings_path = self.job_dir(job_id) / self.SETTINGS_FILE
+        if not settings_path.exists():
+            return None
+        job = self._job(job_id, json.loads(settings_path.read_text()))
+        job.load_checkpoint()
+        return job
+
+    async def stop(self):
+        """Cancel running jobs; they can be resumed from their checkpoint"""
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+
+async def main():
+    parser = argparse.ArgumentParser(description="Answer a file of questions with the compliance chat pipeline")
+    parser.add_argument("questions", help="Text file with one question per line, or NDJSON")
+    parser.add_argument("--output", help="NDJSON results file; also used to resume (default: <questions>.answers.ndjson)")
+    parser.add_argument("--category", help="Restrict retrieval to one category")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv('BATCH_QA_CONCURRENCY', '8')))
+    parser.add_argument("--max-retries", type=int, default=3)
+    args = parser.parse_args()
+
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from llm_client import llm_pool
+    from chat_service import ChatService
+
+    llm_pool.attach(asyncio.get_running_loop())
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    try:
+        job = BatchQAJob(
+            ChatService(client),
+            Path(args.questions),
+            Path(args.output or f"{args.questions}.answers.ndjson"),
+            category=args.category,
+            concurrency=args.concurrency,
+            max_retries=args.max_retries
+        )
+        await job.run()
+        print(json.dumps(job.progress(), indent=2))
+    finally:
+        await llm_pool.close()
+        client.close()
+    return 0 if job.status == "completed" else 1
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(main()))
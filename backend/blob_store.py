@@ -0,0 +1,92 @@
+import os
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, Optional
+import zstandard
+
+logger = logging.getLogger(__name__)
+
+class BlobStore:
+    """Content-addressed, zstd-compressed file store
+
+    Objects live under ``{root}/{kind}/{digest[:2]}/{digest}.zst`` where ``digest``
+    is the SHA-256 of the uncompressed bytes, so identical content is stored once
+    and two knowledge bases can be synced by copying the objects they lack.
+    """
+
+    SUFFIX = ".zst"
+
+    def __init__(self, root: Path, level: int = 10):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.level = level
+
+    def path_for(self, digest: str, kind: str = "sources") -> Path:
+        return self.root / kind / digest[:2] / f"{digest}{self.SUFFIX}"
+
+    def exists(self, digest: str, kind: str = "sources") -> bool:
+        return self.path_for(digest, kind).exists()
+
+    def _write(self, path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        compressed = zstandard.ZstdCompressor(level=self.level).compress(data)
+        # Write to a temp file first so readers never see a partial object
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(compressed)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def put(self, data: bytes, kind: str = "sources") -> str:
+        """Store bytes and return their SHA-256 digest"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest, kind)
+        if not path.exists():
+            self._write(path, data)
+            logger.info(f"Stored {kind} object {digest[:12]} ({len(data)} -> {path.stat().st_size} bytes)")
+        return digest
+
+    def get(self, digest: str, kind: str = "sources") -> bytes:
+        """Read and decompress an object"""
+        with open(self.path_for(digest, kind), 'rb') as f:
+            return zstandard.ZstdDecompressor().decompress(f.read())
+
+    def put_text(self, key: str, text: str, kind: str = "text") -> Path:
+        """Store derived text (e.g. PDF extraction) under the digest of its source"""
+        path = self.path_for(key, kind)
+        self._write(path, text.encode("utf-8"))
+        return path
+
+    def get_text(self, key: str, kind: str = "text") -> Optional[str]:
+        """Read derived text, or None if it has not been stored"""
+        if not self.exists(key, kind):
+            return None
+        return self.get(key, kind).decode("utf-8")
+
+    def read_path(self, path: Path) -> bytes:
+        """Read a file transparently, whether it is a stored object or a plain file"""
+        path = Path(path)
+        with open(path, 'rb') as f:
+            data = f.read()
+        if path.suffix == self.SUFFIX:
+            return zstandard.ZstdDecompressor().decompress(data)
+        return data
+
+    def stats(self) -> Dict[str, Any]:
+        """Count objects and compressed bytes per kind"""
+        stats = {}
+        for kind_dir in self.root.iterdir() if self.root.exists() else []:
+            if not kind_dir.is_dir():
+                continue
+            files = list(kind_dir.glob(f"*/*{self.SUFFIX}"))
+            stats[kind_dir.name] = {
+                "objects": len(files),
+                "stored_bytes": sum(f.stat().st_size for f in files)
+            }
+        return stats
@@ -0,0 +1,210 @@
+import os
+import re
+import logging
+import unicodedata
+from typing import List, Dict, Optional, Tuple
+from threading import Lock, Thread
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Keyword rules per category, matched against the accent-free, lowercased query.
+# Everyday words ("seguro", "prima", "sanidad") only count as part of a phrase
+CATEGORY_KEYWORDS = {
+    "ai_regulation": [
+        "ai act", "reglamento de ia", "ley de ia", "inteligencia artificial", "artificial intelligence",
+        "alto riesgo", "high risk", "sistema de ia", "ai system", "modelo fundacional", "proposito general",
+        "evaluacion de conformidad", "marcado ce", "transparencia algoritmica"
+    ],
+    "medical_devices": [
+        "mdr", "dispositivo medico", "dispositivos medicos", "medical device", "producto sanitario",
+        "productos sanitarios", "clase iia", "clase iib", "clase iii", "clase i", "organismo notificado",
+        "notified body", "software como dispositivo", "samd", "iso 13485", "iso 14971", "iec 62304"
+    ],
+    "data_protection": [
+        "gdpr", "rgpd", "proteccion de datos", "datos personales", "data protection", "personal data",
+        "consentimiento del interesado", "consentimiento explicito", "dpo", "delegado de proteccion", "eipd",
+        "dpia", "evaluacion de impacto", "derecho de acceso", "categorias especiales", "datos de salud", "lopdgdd"
+    ],
+    "data_governance": [
+        "dga", "data governance", "gobernanza de datos", "altruismo de datos", "data altruism",
+        "intermediacion de datos", "reutilizacion de datos", "sector publico"
+    ],
+    "data_sharing": [
+        "data act", "ley de datos", "intercambio de datos", "data sharing", "dispositivos conectados",
+        "iot", "portabilidad", "cambio de proveedor", "cloud switching"
+    ],
+    "health_law": [
+        "ley general de sanidad", "ley 14/1986", "ley 41/2002", "ministerio de sanidad", "sanidad publica",
+        "sistema nacional de salud", "historia clinica", "servicio de salud", "centros sanitarios", "telemedicina",
+        "derechos del paciente", "autonomia del paciente", "seguridad del paciente", "consentimiento informado"
+    ],
+    "insurance_law": [
+        "seguros", "aseguradora", "aseguradoras", "insurtech", "poliza", "contrato de seguro", "dgsfp",
+        "seguro de vida", "seguro de salud", "seguro medico", "seguro de responsabilidad", "compania de seguros",
+        "prima del seguro", "prima de seguro", "siniestro", "solvencia", "solvencia ii"
+    ]
+}
+
+# Terms that also have an everyday or cross-category meaning; one of them alone
+# is a hint, not enough to restrict the search
+WEAK_KEYWORDS = {"seguros", "siniestro", "solvencia", "portabilidad", "sector publico"}
+
+# Points per hit: a category reaching KEYWORD_MATCH_SCORE has one unambiguous
+# term or several weak ones
+STRONG_HIT = 2
+WEAK_HIT = 1
+KEYWORD_MATCH_SCORE = 2
+
+CATEGORY_PATTERNS = {
+    category: [
+        (re.compile(rf"\b{re.escape(keyword)}\b"), WEAK_HIT if keyword in WEAK_KEYWORDS else STRONG_HIT)
+        for keyword in keywords
+    ]
+    for category, keywords in CATEGORY_KEYWORDS.items()
+}
+
+def normalize_text(text: str) -> str:
+    """Lowercase and strip accents so keyword rules match Spanish and English input alike"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", text).strip()
+
+def keyword_scores(text: str) -> Dict[str, int]:
+    """Keyword rule points per category (STRONG_HIT or WEAK_HIT per matching keyword)"""
+    text = normalize_text(text)
+    scores = {}
+    for category, patterns in CATEGORY_PATTERNS.items():
+        points = sum(weight for pattern, weight in patterns if pattern.search(text))
+        if points:
+            scores[category] = points
+    return scores
+
+def keyword_categories(text: str) -> List[str]:
+    """Categories with enough keyword evidence to be considered matched"""
+    return [category for category, points in keyword_scores(text).items() if points >= KEYWORD_MATCH_SCORE]
+
+class CategoryRouter:
+    """Predicts which regulation categories a query is about, to narrow vector search
+
+    Combines keyword rules with cosine similarity against the mean embedding of
+    each category's chunks; one unambiguous keyword is enough to route, a weak
+    one needs the embedding to agree. Centroids follow the document manager's regulation
+    generation (news and repository updates do not move them) and are
+    recomputed in a background thread; until that finishes, queries are scored
+    against the previous centroids, or by keywords only on the first run.
+    """
+
+    def __init__(self, manager, min_similarity: float = 0.25, min_margin: float = 0.03,
+                 max_categories: int = 2, min_confidence: float = 0.6):
+        self.manager = manager
+        self.min_confidence = min_confidence
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.max_categories = max_categories
+        self._centroids: Dict[str, np.ndarray] = {}
+        self._centroid_generation = None
+        self._refreshing = Lock()
+
+    def _refresh_centroids(self):
+        generation = self.manager.regulation_generation
+        try:
+            centroids = {}
+            for category in self.manager.get_document_categories():
+                try:
+                    embeddings = self.manager.vectorstore.get(
+                        where={"category": category}, include=["embeddings"]
+                    ).get("embeddings")
+                    if embeddings is None or len(embeddings) == 0:
+                        continue
+                    centroid = np.asarray(embeddings, dtype=np.float32).mean(axis=0)
+                    norm = np.linalg.norm(centroid)
+                    if norm > 0:
+                        centroids[category] = centroid / norm
+                except Exception as e:
+                    logger.warning(f"Could not compute centroid for {category}: {str(e)}")
+            self._centroids = centroids
+            self._centroid_generation = generation
+            logger.info(f"Computed category centroids for {len(centroids)} categories (generation {generation})")
+        finally:
+            self._refreshing.release()
+
+    def refresh_centroids(self) -> bool:
+        """Recompute stale centroids in a background thread; True if a refresh was started"""
+        if self._centroid_generation == self.manager.regulation_generation:
+            return False
+        if not self._refreshing.acquire(blocking=False):
+            return False
+        Thread(target=self._refresh_centroids, name="category-centroids", daemon=True).start()
+        return True
+
+    def centroid_scores(self, query_embedding: List[float]) -> Dict[str, float]:
+        """Cosine similarity of the query to each category centroid"""
+        self.refresh_centroids()
+        centroids = self._centroids
+        if not centroids:
+            return {}
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return {}
+        query = query / norm
+        return {category: float(np.dot(query, centroid)) for category, centroid in centroids.items()}
+
+    def _centroid_confidence(self, query_embedding: List[float]) -> Dict[str, float]:
+        """Confidence in [0, 1] for the categories whose centroid clearly leads"""
+        similarities = self.centroid_scores(query_embedding)
+        if len(similarities) < 2:
+            return {}
+        ranked = sorted(similarities.items(), key=lambda item: item[1], reverse=True)
+        best_category, best = ranked[0]
+        runner_up = ranked[1][1]
+        if best < self.min_similarity or best - runner_up < self.min_margin:
+            return {}
+
+        confidence = min(1.0, (best - runner_up) / (4 * self.min_margin))
+        scores = {best_category: confidence}
+        if self.max_categories > 1 and best - runner_up < 2 * self.min_margin:
+            scores[ranked[1][0]] = confidence
+        return scores
+
+    def predict(self, query: str, query_embedding: Optional[List[float]] = None) -> Tuple[List[str], float]:
+        """Return the predicted categories and a confidence in [0, 1]; no categories means search globally
+
+        Keyword points and centroid similarity are both turned into a per-category
+        confidence and combined as independent evidence (1 - (1 - k)(1 - c)), so a
+        single weak keyword only routes when the embedding agrees with it.
+        """
+        available = set(self.manager.get_document_categories())
+        keyword_confidence = {
+            category: min(1.0, points / KEYWORD_MATCH_SCORE)
+            for category, points in keyword_scores(query).items() if category in available
+        }
+        centroid_confidence = self._centroid_confidence(query_embedding) if query_embedding is not None else {}
+
+        evidence = {
+            category: 1 - (1 - keyword_confidence.get(category, 0.0)) * (1 - centroid_confidence.get(category, 0.0))
+            for category in set(keyword_confidence) | set(centroid_confidence)
+        }
+        if not evidence:
+            return [], 0.0
+        ranked = sorted(evidence, key=evidence.get, reverse=True)
+        categories = ranked[:self.max_categories]
+        # Evidence left out of the chosen categories lowers the confidence
+        share = sum(evidence[c] for c in categories) / sum(evidence.values())
+        return categories, evidence[categories[0]] * share
+
+    def route(self, query: str, query_embedding: Optional[List[float]] = None) -> List[str]:
+        """Categories to restrict the search to, or an empty list when confidence is too low"""
+        categories, confidence = self.predict(query, query_embedding)
+        return categories if confidence >= self.min_confidence else []
+
+def create_category_router(manager) -> CategoryRouter:
+    """Build a router using environment settings"""
+    return CategoryRouter(
+        manager,
+        min_similarity=float(os.getenv('CATEGORY_ROUTER_MIN_SIMILARITY', '0.25')),
+        min_margin=float(os.getenv('CATEGORY_ROUTER_MIN_MARGIN', '0.03')),
+        max_categories=int(os.getenv('CATEGORY_ROUTER_MAX_CATEGORIES', '2')),
+        min_confidence=float(os.getenv('CATEGORY_ROUTER_MIN_CONFIDENCE', '0.6'))
+    )
@@ -0,0 +1,297 @@
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import List, Dict, Any, Optional
+import bson
+import zstandard
+from single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Stored once on the archive document instead of on every message
+SESSION_FIELDS = ("session_id", "user_id")
+
+class ChatArchive:
+    """Cold storage for the messages of idle chat sessions
+
+    Sessions not updated for ``idle_days`` have their messages packed into a
+    single ``chat_archives`` document (BSON, zstd-compressed) and removed from
+    ``chat_messages``; the session keeps an ``archived_at`` marker. Reads of an
+    archived session are served from the decompressed archive, and the first
+    new turn restores the messages to ``chat_messages``, so a session is always
+    either fully hot or fully archived.
+
+    Every step can be repeated after a crash: the archive is written before the
+    session is marked and the messages deleted, and a restore clears any
+    archived messages left behind before inserting them again. Only messages up
+    to the archive's last one are ever deleted, so a turn saved while its
+    session was being archived stays in ``chat_messages``; reads include it and
+    a restore keeps it.
+
+    Only one restore of a session runs at a time: concurrent turns in this
+    process share it, and across processes the archive document is claimed
+    first (``restoring_at``) while other workers wait for it to disappear. A
+    claim older than ``restore_claim_seconds`` is taken over, in case its
+    worker died.
+    """
+
+    def __init__(self, db, idle_days: float = 30, interval_hours: float = 6,
+                 batch_size: int = 200, level: int = 10, restore_claim_seconds: float = 60):
+        self.db = db
+        self.collection = db.chat_archives
+        self.idle_days = idle_days
+        self.interval_hours = interval_hours
+        self.batch_size = batch_size
+        self.level = level
+        self.restore_claim_seconds = restore_claim_seconds
+        self._restores = SingleFlight("archive-restore")
+        self._task: Optional[asyncio.Task] = None
+        self.last_run: Optional[datetime] = None
+        self._metrics = {
+            "sessions_archived": 0,
+            "messages_archived": 0,
+            "raw_bytes": 0,
+            "stored_bytes": 0,
+            "archive_seconds": 0.0,
+            "sessions_restored": 0,
+            "messages_restored": 0,
+            "restore_seconds": 0.0,
+            "archived_reads": 0,
+            "read_seconds": 0.0,
+            "skipped_active": 0
+        }
+
+    def _encode(self, messages: List[Dict[str, Any]]) -> bytes:
+        slim = [{key: value for key, value in message.items() if key not in SESSION_FIELDS} for message in messages]
+        return zstandard.ZstdCompressor(level=self.level).compress(bson.encode({"messages": slim}))
+
+    @staticmethod
+    def _decode(payload: bytes) -> List[Dict[str, Any]]:
+        return bson.decode(zstandard.ZstdDecompressor().decompress(payload))["messages"]
+
+    async def archive_session(self, session: Dict[str, Any]) -> bool:
+        """Move one session's messages into its archive; False if it became active meanwhile"""
+        started = time.monotonic()
+        session_id = session["id"]
+        messages = await self.db.chat_messages.find(
+            {"session_id": session_id},
+            {"_id": 0}
+        ).sort([("created_at", 1), ("id", 1)]).to_list(None)
+
+        role_counts: Dict[str, int] = {}
+        for message in messages:
+            role_counts[message.get("role")] = role_counts.get(message.get("role"), 0) + 1
+        raw = bson.encode({"messages": messages})
+        payload = self._encode(messages)
+
+        await self.collection.replace_one(
+            {"session_id": session_id},
+            {
+                "session_id": session_id,
+                "user_id": session["user_id"],
+                "message_count": len(messages),
+                "role_counts": role_counts,
+                "last_created_at": messages[-1]["created_at"] if messages else None,
+                "archived_at": datetime.now(timezone.utc),
+                "raw_bytes": len(raw),
+                "stored_bytes": len(payload),
+                "payload": payload
+            },
+            upsert=True
+        )
+
+        # Only if nothing was written to the session since it was picked
+        marked = await self.db.chat_sessions.update_one(
+            {"id": session_id, "updated_at": session["updated_at"], "archived_at": {"$exists": False}},
+            {"$set": {"archived_at": datetime.now(timezone.utc)}}
+        )
+        if marked.matched_count == 0:
+            await self.collection.delete_one({"session_id": session_id})
+            self._metrics["skipped_active"] += 1
+            return False
+
+        if messages:
+            await self.db.chat_messages.delete_many(
+                {"session_id": session_id, "created_at": {"$lte": messages[-1]["created_at"]}}
+            )
+
+        self._metrics["sessions_archived"] += 1
+        self._metrics["messages_archived"] += len(messages)
+        self._metrics["raw_bytes"] += len(raw)
+        self._metrics["stored_bytes"] += len(payload)
+        self._metrics["archive_seconds"] += time.monotonic() - started
+        return True
+
+    async def archive_idle(self, limit: Optional[int] = None) -> Dict[str, int]:
+        """Archive every session idle for longer than ``idle_days``"""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.idle_days)
+        archived = skipped = failed = 0
+        while limit is None or archived < limit:
+            batch_size = self.batch_size if limit is None else min(self.batch_size, limit - archived)
+            sessions = await self.db.chat_sessions.find(
+                {"updated_at": {"$lt": cutoff}, "archived_at": {"$exists": False}},
+                {"_id": 0, "id": 1, "user_id": 1, "updated_at": 1}
+            ).sort("updated_at", 1).limit(batch_size).to_list(batch_size)
+            if not sessions:
+                break
+
+            for session in sessions:
+                try:
+                    if await self.archive_session(session):
+                        archived += 1
+                    else:
+                        skipped += 1
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"Error archiving chat session {session['id']}: {str(e)}")
+            if failed and failed >= len(sessions):
+                # The same sessions would be picked again; try on the next run
+                break
+
+        self.last_run = datetime.now(timezone.utc)
+        if archived or skipped or failed:
+            logger.info(f"Chat archival: {archived} sessions archived, {skipped} became active, {failed} failed")
+        return {"archived": archived, "skipped_active": skipped, "failed": failed}
+
+    def _messages(self, session_id: str, archive: Dict[str, Any]) -> List[Dict[str, Any]]:
+        messages = self._decode(archive["payload"])
+        for message in messages:
+            message["session_id"] = session_id
+            message["user_id"] = archive["user_id"]
+        return messages
+
+    async def _load_archived(self, session_id: str):
+        archive = await self.collection.find_one(
+            {"session_id": session_id},
+            {"_id": 0, "user_id": 1, "last_created_at": 1, "payload": 1}
+        )
+        if not archive:
+            return None, []
+        return archive, self._messages(session_id, archive)
+
+    def _newer_filter(self, session_id: str, archive: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        query = {"session_id": session_id}
+        if archive and archive.get("last_created_at") is not None:
+            query["created_at"] = {"$gt": archive["last_created_at"]}
+        return query
+
+    async def load(self, session_id: str) -> List[Dict[str, Any]]:
+        """Messages of an archived session, in chronological order, as stored in chat_messages"""
+        started = time.monotonic()
+        archive, messages = await self._load_archived(session_id)
+        # Turns saved while the session was being archived are still hot
+        messages += await self.db.chat_messages.find(
+            self._newer_filter(session_id, archive),
+            {"_id": 0}
+        ).sort([("created_at", 1), ("id", 1)]).to_list(None)
+        self._metrics["archived_reads"] += 1
+        self._metrics["read_seconds"] += time.monotonic() - started
+        return messages
+
+    async def restore(self, session_id: str) -> int:
+        """Move an archived session back into chat_messages so it can take new turns"""
+        return await self._restores.do(session_id, lambda: self._restore(session_id))
+
+    async def _restore(self, session_id: str) -> int:
+        started = time.monotonic()
+        now = datetime.now(timezone.utc)
+        archive = await self.collection.find_one_and_update(
+            {
+                "session_id": session_id,
+                "$or": [
+                    {"restoring_at": {"$exists": False}},
+                    {"restoring_at": {"$lt": now - timedelta(seconds=self.restore_claim_seconds)}}
+                ]
+            },
+            {"$set": {"restoring_at": now}},
+            projection={"_id": 0, "user_id": 1, "last_created_at": 1, "payload": 1}
+        )
+        if archive is None:
+            # Another worker is restoring it, or already has
+            if not await self._wait_restored(session_id):
+                raise RuntimeError(f"Chat session {session_id} is still being restored")
+            await self.db.chat_sessions.update_one({"id": session_id}, {"$unset": {"archived_at": ""}})
+            return 0
+
+        try:
+            messages = self._messages(session_id, archive)
+            if archive.get("last_created_at") is not None:
+                # Leftovers of an interrupted archive run (or restore) would otherwise be
+                # duplicated; anything newer was written after the archive and is kept
+                await self.db.chat_messages.delete_many(
+                    {"session_id": session_id, "created_at": {"$lte": archive["last_created_at"]}}
+                )
+            if messages:
+                await self.db.chat_messages.insert_many(messages, ordered=False)
+            await self.db.chat_sessions.update_one({"id": session_id}, {"$unset": {"archived_at": ""}})
+            await self.collection.delete_one({"session_id": session_id})
+        except BaseException:
+            # Let the next turn retry right away instead of waiting for the claim to expire
+            asyncio.ensure_future(self.collection.update_one({"session_id": session_id}, {"$unset": {"restoring_at": ""}}))
+            raise
+
+        self._metrics["sessions_restored"] += 1
+        self._metrics["messages_restored"] += len(messages)
+        self._metrics["restore_seconds"] += time.monotonic() - started
+        logger.info(f"Restored {len(messages)} archived messages of chat session {session_id}")
+        return len(messages)
+
+    async def _wait_restored(self, session_id: str, poll_seconds: float = 0.1) -> bool:
+        """Wait for another worker's restore to remove the archive; False if it does not within the claim time"""
+        deadline = time.monotonic() + self.restore_claim_seconds
+        while await self.collection.count_documents({"session_id": session_id}, limit=1):
+            if time.monotonic() > deadline:
+                logger.warning(f"Restore of chat session {session_id} by another worker did not finish")
+                return False
+            await asyncio.sleep(poll_seconds)
+        return True
+
+    async def delete(self, session_id: str) -> Dict[str, int]:
+        """Drop a session's archive, returning how many messages of each role it held"""
+        archive = await self.collection.find_one_and_delete({"session_id": session_id}, {"_id": 0, "role_counts": 1})
+        return archive.get("role_counts", {}) if archive else {}
+
+    async def role_counts_for_user(self, user_id: str) -> Dict[str, int]:
+        """Archived messages of a user, per role (for the chat stats reconciliation)"""
+        totals: Dict[str, int] = {}
+        async for archive in self.collection.find({"user_id": user_id}, {"_id": 0, "role_counts": 1}):
+            for role, count in archive.get("role_counts", {}).items():
+                totals[role] = totals.get(role, 0) + count
+        return totals
+
+    def stats(self) -> Dict[str, Any]:
+        m = self._metrics
+        return {
+            "idle_days": self.idle_days,
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            "sessions_archived": m["sessions_archived"],
+            "messages_archived": m["messages_archived"],
+            "skipped_active": m["skipped_active"],
+            "compression_ratio": round(m["raw_bytes"] / m["stored_bytes"], 2) if m["stored_bytes"] else None,
+            "archive_messages_per_second": round(m["messages_archived"] / m["archive_seconds"], 1) if m["archive_seconds"] else None,
+            "sessions_restored": m["sessions_restored"],
+            "messages_restored": m["messages_restored"],
+            "restore_messages_per_second": round(m["messages_restored"] / m["restore_seconds"], 1) if m["restore_seconds"] else None,
+            "archived_reads": m["archived_reads"],
+            "avg_archived_read_ms": round(m["read_seconds"] / m["archived_reads"] * 1000, 2) if m["archived_reads"] else None
+        }
+
+    async def _run(self):
+        while True:
+            try:
+                await self.archive_idle()
+            except Exception as e:
+                logger.error(f"Error in chat archival: {str(e)}")
+            await asyncio.sleep(self.interval_hours * 3600)
+
+    def start(self):
+        """Start the periodic archival job"""
+        if self._task is None and self.interval_hours > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+class ChatPersistence:
+    """Writes a chat turn with one insert_many plus a concurrent session update
+
+    With ``write_behind`` enabled, turns are queued and written by a background
+    worker so the response can be returned right after generation. The queue is
+    bounded; when it is full the turn is written inline instead. Pending writes
+    are flushed on shutdown, and readers can wait for a session's pending
+    writes with ``wait_for_session``.
+    """
+
+    def __init__(self, db, write_behind: bool = False, max_queue_size: int = 1000, max_retries: int = 3,
+                 user_stats=None):
+        self.db = db
+        self.user_stats = user_stats
+        self.write_behind = write_behind
+        self.max_queue_size = max_queue_size
+        self.max_retries = max_retries
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._pending: Dict[str, int] = {}
+        self._drained: Dict[str, asyncio.Event] = {}
+        self.turns_written = 0
+        self.turns_queued = 0
+        self.inline_fallbacks = 0
+        self.failures = 0
+
+    async def _write(self, session_id: str, messages: List[Dict[str, Any]], updated_at: datetime):
+        await asyncio.gather(
+            self.db.chat_messages.insert_many(messages, ordered=True),
+            self.db.chat_sessions.update_one(
+                {"id": session_id},
+                {
+                    "$set": {"updated_at": updated_at},
+                    "$inc": {"message_count": len(messages)}
+                }
+            )
+        )
+        if self.user_stats is not None:
+            await self.user_stats.record_messages(messages, updated_at)
+        self.turns_written += 1
+
+    async def persist_turn(self, session_id: str, messages: List[Dict[str, Any]], updated_at: datetime):
+        """Persist the messages of one turn and bump the session"""
+        if self._worker is None or self._worker.done():
+            await self._write(session_id, messages, updated_at)
+            return
+
+        try:
+            self._queue.put_nowait((session_id, messages, updated_at))
+        except asyncio.QueueFull:
+            self.inline_fallbacks += 1
+            await self._write(session_id, messages, updated_at)
+            return
+
+        self.turns_queued += 1
+        self._pending[session_id] = self._pending.get(session_id, 0) + 1
+        self._drained.setdefault(session_id, asyncio.Event()).clear()
+
+    def _mark_done(self, session_id: str):
+        remaining = self._pending.get(session_id, 1) - 1
+        if remaining > 0:
+            self._pending[session_id] = remaining
+            return
+        self._pending.pop(session_id, None)
+        event = self._drained.pop(session_id, None)
+        if event:
+            event.set()
+
+    async def wait_for_session(self, session_id: str):
+        """Wait until queued writes for a session have reached the database"""
+        event = self._drained.get(session_id)
+        if event and self._pending.get(session_id):
+            await event.wait()
+
+    async def _run(self):
+        while True:
+            session_id, messages, updated_at = await self._queue.get()
+            try:
+                for attempt in range(1, self.max_retries + 1):
+                    try:
+                        await self._write(session_id, messages, updated_at)
+                        break
+                    except Exception as e:
+                        if attempt == self.max_retries:
+                            self.failures += 1
+                            logger.error(f"Dropping chat turn for session {session_id} after {attempt} attempts: {str(e)}")
+                        else:
+                            await asyncio.sleep(0.5 * attempt)
+            finally:
+                self._mark_done(session_id)
+                self._queue.task_done()
+
+    def start(self):
+        """Start the background writer if write-behind is enabled"""
+        if not self.write_behind or self._worker is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._worker = asyncio.create_task(self._run())
+        logger.info(f"Chat write-behind enabled (queue size {self.max_queue_size})")
+
+    async def stop(self):
+        """Flush pending writes and stop the background writer"""
+        if self._worker is None:
+            return
+        if not self._queue.empty():
+            logger.info(f"Flushing {self._queue.qsize()} pending chat turns")
+        await self._queue.join()
+        self._worker.cancel()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "write_behind": self.write_behind,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "turns_written": self.turns_written,
+            "turns_queued": self.turns_queued,
+            "inline_fallbacks": self.inline_fallbacks,
+            "failures": self.failures
+        }
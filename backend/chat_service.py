@@ -1,11 +1,25 @@
 import os
 import uuid
-import re
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timezone
+import asyncio
+import hashlib
+import time
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple, Callable
+from datetime import datetime, timezone, timedelta
 import logging
-from emergentintegrations.llm.chat import LlmChat, UserMessage
-from document_manager import document_manager
+from llm_client import llm_pool, PRIORITY_INTERACTIVE
+from answer_cache import answer_cache
+from chat_persistence import ChatPersistence
+from chat_stats import ChatStatsStore
+from chat_archive import ChatArchive
+from single_flight import SingleFlight
+from model_router import model_router, EXTRACTIVE, STANDARD
+from context_packer import context_packer, count_tokens
+from conversation_memory import create_conversation_memory
+from markdown_stripper import MarkdownStripper, strip_markdown
+from pagination import encode_cursor, before_filter, page_before
+from session_retrieval import create_session_retrieval_cache
+from suggestion_index import SuggestionIndex
+from document_manager import document_manager, category_router
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 
@@ -13,11 +27,68 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Regulations plus fresh news and repository summaries
+RETRIEVAL_SOURCES = ["regulation", "news", "repository"]
+
+# Fields returned by the history and session list endpoints
+MESSAGE_PROJECTION = {"_id": 0, "id": 1, "session_id": 1, "role": 1, "content": 1, "created_at": 1, "metadata": 1}
+SESSION_LIST_PROJECTION = {"_id": 0, "id": 1, "title": 1, "created_at": 1, "updated_at": 1, "message_count": 1, "archived_at": 1}
+
 class ChatService:
     def __init__(self, db_client: AsyncIOMotorClient):
         self.db = db_client[os.environ['DB_NAME']]
         self.emergent_key = os.getenv('EMERGENT_LLM_KEY')
         
+        # Idle sessions are moved to compressed per-session archives
+        self.archive = ChatArchive(
+            self.db,
+            idle_days=float(os.getenv('CHAT_ARCHIVE_IDLE_DAYS', '30')),
+            interval_hours=float(os.getenv('CHAT_ARCHIVE_INTERVAL_HOURS', '6')),
+            batch_size=int(os.getenv('CHAT_ARCHIVE_BATCH_SIZE', '200'))
+        )
+        
+        # Per-user counters maintained on the write path
+        self.stats = ChatStatsStore(
+            self.db,
+            reconcile_interval_hours=float(os.getenv('CHAT_STATS_RECONCILE_HOURS', '24')),
+            archive=self.archive
+        )
+        
+        # Batched (and optionally write-behind) storage of chat turns
+        self.persistence = ChatPersistence(
+            self.db,
+            write_behind=os.getenv('CHAT_WRITE_BEHIND', 'false').lower() == 'true',
+            max_queue_size=int(os.getenv('CHAT_WRITE_BEHIND_QUEUE_SIZE', '1000')),
+            user_stats=self.stats
+        )
+        
+        # Last turns verbatim plus a rolling summary of older ones
+        self.memory = create_conversation_memory(self.db)
+        self._background_tasks = set()
+        
+        # Type-ahead over popular questions and article titles
+        self.suggestions = SuggestionIndex(
+            self.db,
+            document_manager,
+            min_users=int(os.getenv('CHAT_SUGGEST_MIN_USERS', '2')),
+            refresh_seconds=float(os.getenv('CHAT_SUGGEST_REFRESH_SECONDS', '60'))
+        )
+        
+        # Last candidate pool per session, re-ranked for follow-up questions
+        self.session_retrieval = create_session_retrieval_cache(document_manager.rank_score)
+        
+        # Concurrent identical generations share one LLM call; each user's turn is still saved separately
+        self.generation_flight = SingleFlight("generation")
+        
+        # What to keep when the client goes away mid-answer: "discard", "partial" or "complete"
+        self.disconnect_policy = os.getenv('CHAT_DISCONNECT_POLICY', 'discard').lower()
+        self.cancellations = {
+            "abandoned_turns": 0,
+            "cancelled_llm_calls": 0,
+            "estimated_completion_tokens_saved": 0,
+            "partial_turns_saved": 0
+        }
+        
         # Initialize LLM chat with system message
         self.system_message = """Eres un asistente especializado en cumplimiento normativo para startups de salud digital e insurtech en España. Tu función es ayudar con consultas sobre:
 
@@ -53,41 +124,7 @@ INSTRUCCIONES IMPORTANTES:
     
     def clean_markdown_response(self, text: str) -> str:
         """Elimina formato markdown de las respuestas del AI"""
-        if not text:
-            return text
-            
-        # Eliminar títulos con # (convertir a texto normal)
-        text = re.sub(r'^#{1,6}\s*(.+)$', r'\1', text, flags=re.MULTILINE)
-        
-        # Eliminar negritas y cursivas (** y *)
-        text = re.sub(r'\*\*(.+?)\*\*', r'\1', text)  # Negritas
-        text = re.sub(r'\*(.+?)\*', r'\1', text)      # Cursivas
-        
-        # Convertir listas con guiones a numeradas
-        lines = text.split('\n')
-        cleaned_lines = []
-        list_counter = 1
-        
-        for line in lines:
-            # Convertir listas con - a numeradas
-            if re.match(r'^-\s+(.+)', line):
-                content = re.sub(r'^-\s+(.+)', r'\1', line)
-                cleaned_lines.append(f"{list_counter}. {content}")
-                list_counter += 1
-            else:
-                cleaned_lines.append(line)
-                # Reset counter si no es una lista
-                if line.strip() and not re.match(r'^-\s+(.+)', line):
-                    list_counter = 1
-        
-        text = '\n'.join(cleaned_lines)
-        
-        # Eliminar otros caracteres markdown comunes
-        text = re.sub(r'`(.+?)`', r'\1', text)        # Código inline
-        text = re.sub(r'```[\s\S]*?```', '', text)    # Bloques de código
-        text = re.sub(r'\[(.+?)\]\(.+?\)', r'\1', text)  # Enlaces
-        
-        return text.strip()
+        return strip_markdown(text)
     
     async def create_chat_session(self, user_id: str, title: Optional[str] = None) -> str:
         """Create a new chat session"""
@@ -103,73 +140,144 @@ INSTRUCCIONES IMPORTANTES:
         }
         
         await self.db.chat_sessions.insert_one(chat_session)
+        await self.stats.record_session_created(user_id, chat_session["created_at"])
         logger.info(f"Created chat session {session_id} for user {user_id}")
         
         return session_id
     
-    async def get_chat_sessions(self, user_id: str) -> List[Dict[str, Any]]:
-        """Get all chat sessions for a user"""
+    async def get_chat_sessions(self, user_id: str, limit: int = 20, before: Optional[str] = None) -> Dict[str, Any]:
+        """Get a page of chat sessions for a user, most recently updated first
+        
+        ``before`` is the ``next_cursor`` of the previous page.
+        """
+        query = {"user_id": user_id, **before_filter("updated_at", before)}
         sessions = await self.db.chat_sessions.find(
-            {"user_id": user_id},
-            {"_id": 0}  # Exclude MongoDB ObjectId
-        ).sort("updated_at", -1).to_list(100)
+            query,
+            SESSION_LIST_PROJECTION
+        ).sort([("updated_at", -1), ("id", -1)]).limit(limit + 1).to_list(limit + 1)
         
-        return sessions
+        next_cursor = None
+        if len(sessions) > limit:
+            sessions = sessions[:limit]
+            next_cursor = encode_cursor(sessions[-1]["updated_at"], sessions[-1]["id"])
+        
+        return {"sessions": sessions, "next_cursor": next_cursor}
     
-    async def get_chat_messages(self, session_id: str, user_id: str) -> List[Dict[str, Any]]:
-        """Get all messages in a chat session"""
+    async def get_chat_messages(self, session_id: str, user_id: str, limit: int = 50,
+                                before: Optional[str] = None) -> Dict[str, Any]:
+        """Get a page of messages in a chat session
+        
+        Returns the newest ``limit`` messages older than ``before`` in chronological
+        order, plus a cursor for the page before them (None when there is none).
+        Archived sessions are read from their archive.
+        """
         # Verify session belongs to user
-        session = await self.db.chat_sessions.find_one({
-            "id": session_id,
-            "user_id": user_id
-        })
+        session = await self.db.chat_sessions.find_one(
+            {"id": session_id, "user_id": user_id},
+            {"_id": 0, "id": 1, "archived_at": 1}
+        )
         
         if not session:
             raise ValueError("Chat session not found or access denied")
         
-        messages = await self.db.chat_messages.find(
-            {"session_id": session_id},
-            {"_id": 0}  # Exclude MongoDB ObjectId
-        ).sort("created_at", 1).to_list(1000)
+        if session.get("archived_at"):
+            messages = self._archived_page(await self.archive.load(session_id), limit, before)
+        else:
+            # Make sure turns still queued for write-behind are visible
+            await self.persistence.wait_for_session(session_id)
+            
+            query = {"session_id": session_id, **before_filter("created_at", before)}
+            messages = await self.db.chat_messages.find(
+                query,
+                MESSAGE_PROJECTION
+            ).sort([("created_at", -1), ("id", -1)]).limit(limit + 1).to_list(limit + 1)
+        
+        next_cursor = None
+        if len(messages) > limit:
+            messages = messages[:limit]
+            next_cursor = encode_cursor(messages[-1]["created_at"], messages[-1]["id"])
         
-        return messages
+        messages.reverse()
+        return {"messages": messages, "next_cursor": next_cursor}
+    
+    def _archived_page(self, messages: List[Dict[str, Any]], limit: int,
+                       before: Optional[str]) -> List[Dict[str, Any]]:
+        """The same page as the chat_messages query, taken from an archive's messages"""
+        page = page_before(messages, "created_at", limit, before)
+        return [{field: m.get(field) for field in MESSAGE_PROJECTION if field != "_id"} for m in page]
     
-    async def search_relevant_documents(self, query: str, category: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Search for relevant documents to answer the query"""
+    async def search_relevant_documents(self, query: str, category: Optional[str] = None,
+                                        query_embedding: Optional[List[float]] = None,
+                                        session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Search for relevant documents to answer the query
+        
+        With a ``session_id``, follow-ups are first re-ranked against the
+        candidates of the session's previous search.
+        """
         try:
-            # Use document manager to search
-            results = document_manager.search_documents(
-                query=query,
-                k=5,
-                category_filter=category
-            )
+            generation = document_manager.index_generation
+            if session_id:
+                if query_embedding is None:
+                    query_embedding = await document_manager.embed_query_async(query)
+                local_results = self.session_retrieval.lookup(session_id, category, generation, query_embedding)
+                if local_results is not None:
+                    logger.info(f"Reused session retrieval for {session_id} (best score {local_results[0]['score']:.3f})")
+                    return local_results
+            
+            async def search(category_filter):
+                if session_id:
+                    # A wider pool with vectors, kept for the session's follow-ups
+                    return await document_manager.search_with_vectors_async(
+                        query, query_embedding, self.session_retrieval.pool_size, category_filter, RETRIEVAL_SOURCES
+                    )
+                return await document_manager.search_documents_async(
+                    query=query,
+                    k=5,
+                    category_filter=category_filter,
+                    query_embedding=query_embedding,
+                    sources=RETRIEVAL_SOURCES
+                )
             
+            started = time.monotonic()
+            results = None
+            if category:
+                results = await search(category)
+            else:
+                # No category chosen: let the router narrow the search when it is confident
+                if query_embedding is None:
+                    query_embedding = await document_manager.embed_query_async(query)
+                routed_categories = category_router.route(query, query_embedding)
+                if routed_categories:
+                    results = await search(routed_categories)
+                    if results:
+                        logger.info(f"Routed query to categories {routed_categories}")
+                if not results:
+                    results = await search(None)
+            
+            if session_id:
+                self.session_retrieval.record_full_search(time.monotonic() - started)
+                self.session_retrieval.store(session_id, category, generation, results)
+                results = [{key: value for key, value in doc.items() if key != "embedding"} for doc in results[:5]]
             return results
             
         except Exception as e:
             logger.error(f"Error searching documents: {str(e)}")
             return []
     
-    async def generate_response(self, session_id: str, user_id: str, message: str, category: Optional[str] = None) -> Dict[str, Any]:
-        """Generate AI response to user message"""
-        try:
-            # Search for relevant documents
-            relevant_docs = await self.search_relevant_documents(message, category)
-            
-            # Build context from relevant documents
-            context = ""
-            if relevant_docs:
-                context = "\n\nDOCUMENTACION RELEVANTE:\n"
-                for i, doc in enumerate(relevant_docs[:3], 1):
-                    context += f"\n{i}. {doc['metadata'].get('title', 'Documento')} (Categoría: {doc['metadata'].get('category', 'N/A')}):\n"
-                    context += f"{doc['content'][:500]}...\n"
-            
-            # Create enhanced prompt with context (reduce cost by limiting context)
-            enhanced_message = f"""
+    def build_prompt(self, message: str, relevant_docs: List[Dict[str, Any]],
+                     history: str = "") -> Tuple[str, Dict[str, Any]]:
+        """Build the user prompt with conversation memory and retrieved context packed into the token budget
+        
+        Returns the prompt and its token usage.
+        """
+        packed = context_packer.pack(relevant_docs)
+        
+        prompt = f"""
+{history}
 CONSULTA DEL USUARIO:
 {message}
 
-{context[:1000] if context else ""}
+{packed["context"]}
 
 INSTRUCCIONES:
 - Responde de forma concisa y específica para startups de salud digital e insurtech
@@ -179,97 +287,383 @@ INSTRUCCIONES:
 - NO uses formato markdown (sin *, #, -, etc.)
 - Usa texto plano con numeración simple
 """
-
-            # Initialize LLM chat for this session with cheaper model temporarily
-            chat = LlmChat(
-                api_key=self.emergent_key,
-                session_id=session_id,
-                system_message=self.system_message
-            ).with_model("openai", "gpt-4o-mini")  # Using cheaper model for testing
-            
-            # Create user message
-            user_message = UserMessage(text=enhanced_message)
-            
-            # Get AI response
-            ai_response = await chat.send_message(user_message)
-            
-            # Clean markdown from AI response
-            cleaned_ai_response = self.clean_markdown_response(ai_response)
-            
-            # Save user message
-            user_msg_for_db = {
-                "id": str(uuid.uuid4()),
+        usage = {
+            "prompt_tokens": count_tokens(self.system_message) + count_tokens(prompt),
+            "history_tokens": count_tokens(history),
+            "context_tokens": packed["context_tokens"],
+            "context_documents": len(packed["documents"]),
+            "context_truncated": packed["truncated"]
+        }
+        return prompt, usage
+    
+    async def ask_llm(self, session_id: str, prompt: str, model: str = "gpt-4o-mini",
+                      priority: int = PRIORITY_INTERACTIVE, fairness_key: Optional[str] = None) -> str:
+        """Send the prompt to the chat model and return the raw answer"""
+        # Model chosen by the tier router, through the shared client pool. History is sent
+        # explicitly via ConversationMemory, so each call gets its own LLM session.
+        return await llm_pool.complete(
+            "openai", model,
+            prompt=prompt,
+            system_message=self.system_message,
+            session_id=f"{session_id}_{uuid.uuid4().hex}",
+            priority=priority,
+            fairness_key=fairness_key or session_id
+        )
+    
+    def stream_llm(self, session_id: str, prompt: str, model: str = "gpt-4o-mini",
+                   priority: int = PRIORITY_INTERACTIVE, fairness_key: Optional[str] = None) -> AsyncIterator[str]:
+        """Like ask_llm, yielding the raw answer as the model writes it"""
+        return llm_pool.stream(
+            "openai", model,
+            prompt=prompt,
+            system_message=self.system_message,
+            session_id=f"{session_id}_{uuid.uuid4().hex}",
+            priority=priority,
+            fairness_key=fairness_key or session_id
+        )
+    
+    async def save_turn(self, session_id: str, user_id: str, message: str, answer: str,
+                        category: Optional[str] = None,
+                        answer_metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Persist the user message and the assistant answer, and return both as API objects"""
+        created_at = datetime.now(timezone.utc)
+        
+        # Save user message
+        user_msg_for_db = {
+            "id": str(uuid.uuid4()),
+            "session_id": session_id,
+            "user_id": user_id,
+            "role": "user",
+            "content": message,
+            "created_at": created_at,
+            "metadata": {
+                "category": category or "general"
+            }
+        }
+        
+        # Save AI response (cleaned)
+        ai_msg_for_db = {
+            "id": str(uuid.uuid4()),
+            "session_id": session_id,
+            "user_id": user_id,
+            "role": "assistant",
+            "content": answer,  # Using cleaned response
+            # Written together with the user message: keep it strictly later at Mongo's millisecond precision
+            "created_at": created_at + timedelta(milliseconds=1),
+            "metadata": {
+                "category": category or "general",
+                **(answer_metadata or {})
+            }
+        }
+        
+        # Both messages in one insert_many, concurrently with the session update
+        await self.persistence.persist_turn(
+            session_id,
+            [user_msg_for_db, ai_msg_for_db],
+            updated_at=ai_msg_for_db["created_at"]
+        )
+        self.suggestions.record_question(user_id, message)
+        
+        # Create completely separate response objects
+        current_time = datetime.now(timezone.utc).isoformat()
+        
+        return {
+            "user_message": {
+                "id": user_msg_for_db["id"],
                 "session_id": session_id,
                 "user_id": user_id,
                 "role": "user",
                 "content": message,
-                "created_at": datetime.now(timezone.utc),
+                "created_at": current_time,
                 "metadata": {
                     "category": category or "general"
                 }
+            },
+            "ai_response": {
+                "id": ai_msg_for_db["id"],
+                "session_id": session_id,
+                "user_id": user_id,
+                "role": "assistant",
+                "content": answer,  # Using cleaned response
+                "created_at": current_time,
+                "metadata": ai_msg_for_db["metadata"]
             }
-            
-            await self.db.chat_messages.insert_one(user_msg_for_db)
-            
-            # Save AI response (cleaned)
-            ai_msg_for_db = {
+        }
+    
+    async def save_partial_turn(self, session_id: str, user_id: str, message: str, partial_answer: str = "",
+                                category: Optional[str] = None):
+        """Persist the question of an abandoned turn, plus the part of the answer already delivered"""
+        created_at = datetime.now(timezone.utc)
+        messages = [{
+            "id": str(uuid.uuid4()),
+            "session_id": session_id,
+            "user_id": user_id,
+            "role": "user",
+            "content": message,
+            "created_at": created_at,
+            "metadata": {"category": category or "general"}
+        }]
+        if partial_answer.strip():
+            messages.append({
                 "id": str(uuid.uuid4()),
                 "session_id": session_id,
                 "user_id": user_id,
                 "role": "assistant",
-                "content": cleaned_ai_response,  # Using cleaned response
-                "created_at": datetime.now(timezone.utc),
-                "metadata": {
-                    "model": "gpt-4o-mini",
-                    "category": category or "general"
-                }
+                "content": partial_answer.strip(),
+                "created_at": created_at + timedelta(milliseconds=1),
+                "metadata": {"category": category or "general", "cancelled": True, "partial": True}
+            })
+        await self.persistence.persist_turn(session_id, messages, updated_at=messages[-1]["created_at"])
+    
+    def handle_cancelled_turn(self, session_id: str, user_id: str, message: str,
+                              category: Optional[str] = None, partial_answer: str = "",
+                              generation: Optional[asyncio.Future] = None):
+        """Account for a turn abandoned by the client and apply the disconnect policy
+        
+        "discard" keeps nothing, "partial" saves the question and whatever part
+        of the answer was delivered, "complete" lets a running generation finish
+        in the background and saves the full turn. Saves run as background tasks:
+        the caller is being cancelled, and under Starlette that cancellation would
+        hit any write awaited here again.
+        """
+        self.cancellations["abandoned_turns"] += 1
+        logger.info(f"Chat turn in session {session_id} cancelled by client disconnect")
+        
+        if self.disconnect_policy == "complete" and generation is not None and not generation.cancelled():
+            async def finish():
+                try:
+                    result = await generation
+                    await self.save_turn(session_id, user_id, message, result["answer"], category, result["metadata"])
+                    self.refresh_memory(session_id)
+                except Exception as e:
+                    logger.error(f"Error completing abandoned turn: {str(e)}")
+        elif self.disconnect_policy == "partial":
+            async def finish():
+                try:
+                    await self.save_partial_turn(session_id, user_id, message, partial_answer, category)
+                    self.cancellations["partial_turns_saved"] += 1
+                except Exception as e:
+                    logger.error(f"Error saving partial turn: {str(e)}")
+        else:
+            return
+        
+        task = asyncio.create_task(finish())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+    
+    def finish_in_background(self, task: asyncio.Future):
+        """Let a turn whose client disconnected run to completion (the "complete" policy)"""
+        self.cancellations["abandoned_turns"] += 1
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+    
+    def cancellation_stats(self) -> Dict[str, Any]:
+        return {"policy": self.disconnect_policy, **self.cancellations}
+    
+    async def retrieve_context(self, message: str, category: Optional[str] = None,
+                               use_cache: bool = True, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Find the documents for a question, or a cached answer to an equivalent question"""
+        query_embedding = await document_manager.embed_query_async(message)
+        generation = document_manager.index_generation
+        
+        cached = answer_cache.lookup(query_embedding, category, generation) if use_cache else None
+        if cached:
+            logger.info(f"Answer cache hit (similarity {cached['similarity']})")
+            candidates = cached["relevant_documents"]
+        else:
+            candidates = await self.search_relevant_documents(message, category, query_embedding, session_id)
+        
+        return {
+            "query_embedding": query_embedding,
+            "generation": generation,
+            "cached": cached,
+            "use_cache": use_cache,
+            "candidates": candidates,
+            "relevant_documents": candidates[:3]
+        }
+    
+    async def complete_answer(self, session_id: str, message: str, category: Optional[str],
+                              context: Dict[str, Any], history: str = "",
+                              priority: int = PRIORITY_INTERACTIVE, fairness_key: Optional[str] = None,
+                              on_text: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Produce the cleaned answer for a retrieved context
+        
+        ``priority`` and ``fairness_key`` are passed to the LLM scheduler; chat
+        turns are interactive, offline jobs use a lower class. With ``on_text``,
+        the model's answer is streamed and each piece of cleaned text is passed
+        to it as soon as it is final; answers that are not generated here
+        (cached, extractive, or shared with an identical prompt) are only returned.
+        """
+        cached = context["cached"]
+        if cached:
+            return {
+                "answer": cached["answer"],
+                "metadata": {"cached": True, "cache_similarity": cached["similarity"]}
             }
+        
+        tier, reason = model_router.classify(message, context["candidates"], history)
+        if tier == EXTRACTIVE:
+            started = time.monotonic()
+            extract = model_router.extract_answer(message, context["candidates"])
+            if extract:
+                model_router.record("chat", EXTRACTIVE, None, time.monotonic() - started)
+                logger.info(f"Answered extractively ({reason})")
+                return {"answer": extract, "metadata": {"model": None, "tier": EXTRACTIVE}}
+            tier, reason = STANDARD, "no extractable sentence"
+        model = model_router.model_for(tier)
+        logger.info(f"Routing chat turn to {tier} tier ({model}): {reason}")
+        
+        prompt, usage = self.build_prompt(message, context["candidates"], history)
+        logger.info(f"Prompt uses {usage['prompt_tokens']} tokens ({usage['context_tokens']} of context "
+                    f"from {usage['context_documents']} documents)")
+        
+        async def call_llm() -> str:
+            if on_text is None:
+                return await self.ask_llm(session_id, prompt, model, priority, fairness_key)
+            stripper = MarkdownStripper()
+            parts = []
+            deltas = self.stream_llm(session_id, prompt, model, priority, fairness_key)
+            try:
+                async for delta in deltas:
+                    parts.append(delta)
+                    text = stripper.feed(delta)
+                    if text:
+                        on_text(text)
+            finally:
+                await deltas.aclose()
+            text = stripper.flush()
+            if text:
+                on_text(text)
+            return "".join(parts)
+        
+        async def generate():
+            # Get AI response and clean markdown from it
+            try:
+                ai_response = await model_router.timed(
+                    "chat", tier, model, self.system_message + prompt, call_llm()
+                )
+            except asyncio.CancelledError:
+                # Only reached when no other request is waiting for this generation
+                self.cancellations["cancelled_llm_calls"] += 1
+                self.cancellations["estimated_completion_tokens_saved"] += model_router.average_completion_tokens("chat", tier)
+                raise
+            cleaned_ai_response = self.clean_markdown_response(ai_response)
             
-            await self.db.chat_messages.insert_one(ai_msg_for_db)
-            
-            # Update session
-            await self.db.chat_sessions.update_one(
-                {"id": session_id},
-                {
-                    "$set": {"updated_at": datetime.now(timezone.utc)},
-                    "$inc": {"message_count": 2}
-                }
-            )
+            if context["use_cache"]:
+                answer_cache.store(
+                    context["query_embedding"], category, context["generation"],
+                    message, cleaned_ai_response, context["relevant_documents"]
+                )
+            return cleaned_ai_response
+        
+        # Identical prompts in flight at the same time (e.g. a question shared in a webinar) share one call
+        # (per priority class, so a live user never waits behind a batch call's queue position)
+        prompt_key = (model, priority, hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+        cleaned_ai_response = await self.generation_flight.do(prompt_key, generate)
+        return {"answer": cleaned_ai_response, "metadata": {"model": model, "tier": tier, "usage": usage}}
+    
+    async def load_history(self, session_id: str) -> str:
+        """Bounded conversation memory for the prompt (empty for the first turn)"""
+        await self.persistence.wait_for_session(session_id)
+        # A new turn in an archived session brings its messages back first
+        if await self.db.chat_sessions.count_documents({"id": session_id, "archived_at": {"$exists": True}}, limit=1):
+            await self.archive.restore(session_id)
+        return self.memory.render(await self.memory.load(session_id))
+    
+    def refresh_memory(self, session_id: str):
+        """Update the rolling summary in the background, off the response path"""
+        async def run():
+            await self.persistence.wait_for_session(session_id)
+            await self.memory.update(session_id)
+        
+        task = asyncio.create_task(run())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+    
+    async def generate_response(self, session_id: str, user_id: str, message: str, category: Optional[str] = None) -> Dict[str, Any]:
+        """Generate AI response to user message"""
+        try:
+            history = await self.load_history(session_id)
             
-            # Create completely separate response objects
-            current_time = datetime.now(timezone.utc).isoformat()
+            # Follow-ups depend on the conversation, so only opening questions use the answer cache
+            context = await self.retrieve_context(message, category, use_cache=not history, session_id=session_id)
+            result = await self.complete_answer(session_id, message, category, context, history)
             
-            return {
-                "user_message": {
-                    "id": user_msg_for_db["id"],
-                    "session_id": session_id,
-                    "user_id": user_id,
-                    "role": "user",
-                    "content": message,
-                    "created_at": current_time,
-                    "metadata": {
-                        "category": category or "general"
-                    }
-                },
-                "ai_response": {
-                    "id": ai_msg_for_db["id"],
-                    "session_id": session_id,
-                    "user_id": user_id,
-                    "role": "assistant",
-                    "content": cleaned_ai_response,  # Using cleaned response
-                    "created_at": current_time,
-                    "metadata": {
-                        "model": "gpt-4o-mini",
-                        "category": category or "general"
-                    }
-                },
-                "relevant_documents": relevant_docs[:3]
-            }
+            response = await self.save_turn(session_id, user_id, message, result["answer"], category, result["metadata"])
+            response["relevant_documents"] = context["relevant_documents"]
+            self.refresh_memory(session_id)
+            return response
             
+        except asyncio.CancelledError:
+            self.handle_cancelled_turn(session_id, user_id, message, category)
+            raise
         except Exception as e:
             logger.error(f"Error generating response: {str(e)}")
             raise
     
+    async def stream_response(self, session_id: str, user_id: str, message: str,
+                              category: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Generate an answer as a sequence of events: sources, answer tokens, then the saved turn
+        
+        Sources are emitted as soon as retrieval finishes, and answer text as
+        the model writes it (already cleaned of markdown); the turn is persisted
+        only once the whole answer has been produced. If the client disconnects,
+        the pending work is cancelled and the disconnect policy decides what is kept.
+        """
+        delivered = []
+        generation = None
+        saved = False
+        try:
+            history = await self.load_history(session_id)
+            context = await self.retrieve_context(message, category, use_cache=not history, session_id=session_id)
+            yield {"event": "sources", "data": {"relevant_documents": context["relevant_documents"]}}
+            
+            # Cleaned text arrives here while the model is still writing; None marks the end
+            pieces = asyncio.Queue()
+            generation = asyncio.ensure_future(self.complete_answer(
+                session_id, message, category, context, history, on_text=pieces.put_nowait
+            ))
+            generation.add_done_callback(lambda _: pieces.put_nowait(None))
+            while True:
+                text = await pieces.get()
+                if text is None:
+                    break
+                delivered.append(text)
+                yield {"event": "token", "data": {"text": text}}
+            result = generation.result()
+            
+            # Cached, extractive and shared answers arrive in one piece
+            rest = result["answer"][len("".join(delivered)):]
+            if rest:
+                delivered.append(rest)
+                yield {"event": "token", "data": {"text": rest}}
+            
+            response = await self.save_turn(session_id, user_id, message, result["answer"], category, result["metadata"])
+            saved = True
+            response["relevant_documents"] = context["relevant_documents"]
+            self.refresh_memory(session_id)
+            yield {"event": "done", "data": response}
+            
+        except (asyncio.CancelledError, GeneratorExit):
+            if not saved:
+                # With the "complete" policy the generation outlives a disconnect
+                if generation is not None and self.disconnect_policy != "complete":
+                    generation.cancel()
+                self.handle_cancelled_turn(session_id, user_id, message, category, "".join(delivered), generation)
+            raise
+        except Exception as e:
+            logger.error(f"Error streaming response: {str(e)}")
+            yield {"event": "error", "data": {"detail": "Error generating response"}}
+    
+    async def verify_session(self, session_id: str, user_id: str):
+        """Raise ValueError unless the session exists and belongs to the user"""
+        session = await self.db.chat_sessions.find_one(
+            {"id": session_id, "user_id": user_id},
+            {"_id": 0, "id": 1}
+        )
+        if not session:
+            raise ValueError("Chat session not found or access denied")
+    
     async def delete_chat_session(self, session_id: str, user_id: str):
         """Delete a chat session and all its messages"""
         # Verify session belongs to user
@@ -281,11 +675,23 @@ INSTRUCCIONES:
         if not session:
             raise ValueError("Chat session not found or access denied")
         
-        # Delete messages
+        # Count what is about to go, including turns still queued for writing
+        await self.persistence.wait_for_session(session_id)
+        role_counts = await self.db.chat_messages.aggregate([
+            {"$match": {"session_id": session_id}},
+            {"$group": {"_id": "$role", "count": {"$sum": 1}}}
+        ]).to_list(10)
+        role_counts = {stat["_id"]: stat["count"] for stat in role_counts}
+        
+        # Delete messages, hot and archived
         await self.db.chat_messages.delete_many({"session_id": session_id})
+        for role, count in (await self.archive.delete(session_id)).items():
+            role_counts[role] = role_counts.get(role, 0) + count
         
         # Delete session
         await self.db.chat_sessions.delete_one({"id": session_id})
+        self.session_retrieval.forget(session_id)
+        await self.stats.record_session_deleted(user_id, role_counts)
         
         logger.info(f"Deleted chat session {session_id}")
     
@@ -310,34 +716,7 @@ INSTRUCCIONES:
     async def get_chat_statistics(self, user_id: str) -> Dict[str, Any]:
         """Get chat statistics for a user"""
         try:
-            # Count sessions
-            session_count = await self.db.chat_sessions.count_documents({"user_id": user_id})
-            
-            # Count messages
-            pipeline = [
-                {"$match": {"user_id": user_id}},
-                {"$group": {
-                    "_id": "$role",
-                    "count": {"$sum": 1}
-                }}
-            ]
-            
-            message_stats = await self.db.chat_messages.aggregate(pipeline).to_list(10)
-            message_counts = {stat["_id"]: stat["count"] for stat in message_stats}
-            
-            # Get most recent session
-            recent_session = await self.db.chat_sessions.find_one(
-                {"user_id": user_id},
-                sort=[("updated_at", -1)]
-            )
-            
-            return {
-                "total_sessions": session_count,
-                "total_messages": sum(message_counts.values()),
-                "user_messages": message_counts.get("user", 0),
-                "assistant_messages": message_counts.get("assistant", 0),
-                "last_chat_date": recent_session["updated_at"].isoformat() if recent_session else None
-            }
+            return await self.stats.get(user_id)
             
         except Exception as e:
             logger.error(f"Error getting chat statistics: {str(e)}")
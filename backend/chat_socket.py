@@ -0,0 +1,240 @@
+import json
+import asyncio
+import logging
+from typing import Dict, Any, Optional, Set, Callable, Awaitable
+from fastapi import WebSocket, WebSocketDisconnect
+
+logger = logging.getLogger(__name__)
+
+class ChatConnection:
+    """One authenticated WebSocket carrying any number of chat sessions
+
+    Client frames are JSON objects with a ``type``:
+
+    - ``send``: {session_id, message, category?, request_id?} streams the answer as
+      ``sources``, ``token`` and ``done`` (or ``error``) frames tagged with the
+      session_id and request_id; turns of different sessions run concurrently
+    - ``cancel``: {session_id} stops that session's turn (the disconnect policy applies)
+    - ``create_session`` {title?}, ``delete_session`` {session_id},
+      ``list_sessions`` {limit?, before?}, ``history`` {session_id, limit?, before?}
+    - ``ping``
+
+    Session list changes are pushed to every connection of the user as
+    ``sessions_updated``.
+    """
+
+    def __init__(self, hub: "ChatSocketHub", websocket: WebSocket, user_id: str):
+        self.hub = hub
+        self.websocket = websocket
+        self.user_id = user_id
+        self.chat_service = hub.chat_service
+        self._send_lock = asyncio.Lock()
+        self._turns: Dict[str, asyncio.Task] = {}
+        self._verified: Set[str] = set()
+
+    async def send(self, frame: Dict[str, Any]):
+        # Turns of several sessions write to the same socket
+        async with self._send_lock:
+            await self.websocket.send_json(frame)
+
+    async def _verify(self, session_id: str):
+        # Ownership is checked once per session and connection, not per message
+        if session_id not in self._verified:
+            await self.chat_service.verify_session(session_id, self.user_id)
+            self._verified.add(session_id)
+
+    async def _stream_turn(self, frame: Dict[str, Any]):
+        session_id = frame["session_id"]
+        tag = {"session_id": session_id, "request_id": frame.get("request_id")}
+        try:
+            async for event in self.chat_service.stream_response(
+                session_id=session_id,
+                user_id=self.user_id,
+                message=frame["message"],
+                category=frame.get("category")
+            ):
+                await self.send({"type": event["event"], **tag, "data": event["data"]})
+            self.hub.turns_streamed += 1
+            await self.hub.push_sessions(self.user_id)
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
+            logger.error(f"Error streaming chat turn over WebSocket: {str(e)}")
+        finally:
+            self._turns.pop(session_id, None)
+
+    def forget(self, session_id: str):
+        self._verified.discard(session_id)
+
+    async def _start_turn(self, frame: Dict[str, Any]):
+        session_id = frame.get("session_id")
+        if not session_id or not frame.get("message"):
+            raise ValueError("session_id and message are required")
+        if session_id in self._turns:
+            raise ValueError("A message is already being answered in this session")
+        if len(self._turns) >= self.hub.max_active_turns:
+            raise ValueError("Too many concurrent messages on this connection")
+        await self._verify(session_id)
+        self._turns[session_id] = asyncio.create_task(self._stream_turn(frame))
+        self.hub.peak_sessions_per_connection = max(self.hub.peak_sessions_per_connection, len(self._turns))
+
+    async def handle(self, frame: Dict[str, Any]):
+        kind = frame.get("type")
+        if kind == "send":
+            await self._start_turn(frame)
+        elif kind == "cancel":
+            task = self._turns.get(frame.get("session_id"))
+            if task:
+                task.cancel()
+        elif kind == "create_session":
+            session_id = await self.chat_service.create_chat_session(self.user_id, frame.get("title"))
+            self._verified.add(session_id)
+            await self.send({"type": "session_created", "request_id": frame.get("request_id"), "session_id": session_id})
+            await self.hub.push_sessions(self.user_id)
+        elif kind == "delete_session":
+            session_id = frame.get("session_id")
+            await self.chat_service.delete_chat_session(session_id, self.user_id)
+            self.hub.forget_session(self.user_id, session_id)
+            await self.hub.push_sessions(self.user_id)
+        elif kind == "list_sessions":
+            sessions = await self.chat_service.get_chat_sessions(
+                self.user_id, limit=min(int(frame.get("limit", 20)), 100), before=frame.get("before")
+            )
+            await self.send({"type": "sessions", "request_id": frame.get("request_id"), "data": sessions})
+        elif kind == "history":
+            session_id = frame.get("session_id")
+            messages = await self.chat_service.get_chat_messages(
+                session_id, self.user_id, limit=min(int(frame.get("limit", 50)), 200), before=frame.get("before")
+            )
+            self._verified.add(session_id)
+            await self.send({"type": "messages", "request_id": frame.get("request_id"),
+                             "session_id": session_id, "data": messages})
+        elif kind == "ping":
+            await self.send({"type": "pong"})
+        else:
+            raise ValueError(f"Unknown frame type: {kind}")
+
+    async def run(self):
+        """Read frames until the client goes away, then cancel its unfinished turns"""
+        try:
+            while True:
+                text = await self.websocket.receive_text()
+                self.hub.frames_received += 1
+                try:
+                    frame = json.loads(text)
+                except json.JSONDecodeError:
+                    frame = None
+                if not isinstance(frame, dict):
+                    await self.send({"type": "error", "data": {"detail": "Frames must be JSON objects"}})
+                    continue
+                try:
+                    await self.handle(frame)
+                except WebSocketDisconnect:
+                    raise
+                except Exception as e:
+                    if not isinstance(e, (ValueError, TypeError, KeyError)):
+                        logger.error(f"Error handling {frame.get('type')} frame: {str(e)}")
+                        e = "Error processing request"
+                    await self.send({"type": "error", "request_id": frame.get("request_id"),
+                                     "session_id": frame.get("session_id"), "data": {"detail": str(e)}})
+        except WebSocketDisconnect:
+            pass
+        finally:
+            turns = list(self._turns.values())
+            for task in turns:
+                task.cancel()
+            await asyncio.gather(*turns, return_exceptions=True)
+
+class ChatSocketHub:
+    """Tracks open chat sockets per user so session list changes reach all of them"""
+
+    def __init__(self, chat_service, authenticate: Callable[[str], Awaitable[Any]], max_active_turns: int = 4,
+                 auth_timeout: float = 10):
+        self.chat_service = chat_service
+        self.authenticate = authenticate
+        self.max_active_turns = max_active_turns
+        self.auth_timeout = auth_timeout
+        self._connections: Dict[str, Set[ChatConnection]] = {}
+        self.connections_opened = 0
+        self.peak_connections = 0
+        self.auth_failures = 0
+        self.frames_received = 0
+        self.turns_streamed = 0
+        self.peak_sessions_per_connection = 0
+
+    async def _accept(self, websocket: WebSocket) -> Optional[str]:
+        """Authenticate with ?token= or a first {"type": "auth", "token"} frame"""
+        await websocket.accept()
+        token = websocket.query_params.get("token")
+        if not token:
+            try:
+                frame = json.loads(await asyncio.wait_for(websocket.receive_text(), self.auth_timeout))
+                if isinstance(frame, dict) and frame.get("type") == "auth":
+                    token = frame.get("token")
+            except (asyncio.TimeoutError, json.JSONDecodeError):
+                pass
+        try:
+            user = await self.authenticate(token or "")
+        except Exception:
+            self.auth_failures += 1
+            await websocket.send_json({"type": "error", "data": {"detail": "Invalid authentication credentials"}})
+            await websocket.close(code=4401)
+            return None
+        await websocket.send_json({"type": "ready", "user_id": user.id})
+        return user.id
+
+    async def serve(self, websocket: WebSocket):
+        try:
+            user_id = await self._accept(websocket)
+        except WebSocketDisconnect:
+            return
+        if user_id is None:
+            return
+
+        connection = ChatConnection(self, websocket, user_id)
+        self._connections.setdefault(user_id, set()).add(connection)
+        self.connections_opened += 1
+        self.peak_connections = max(self.peak_connections, self.open_connections())
+        try:
+            await connection.run()
+        finally:
+            connections = self._connections.get(user_id)
+            if connections is not None:
+                connections.discard(connection)
+                if not connections:
+                    del self._connections[user_id]
+
+    def open_connections(self) -> int:
+        return sum(len(connections) for connections in self._connections.values())
+
+    def forget_session(self, user_id: str, session_id: str):
+        for connection in self._connections.get(user_id, ()):
+            connection.forget(session_id)
+
+    async def push_sessions(self, user_id: str):
+        """Send the user's first page of sessions to each of their open connections"""
+        connections = list(self._connections.get(user_id, ()))
+        if not connections:
+            return
+        try:
+            sessions = await self.chat_service.get_chat_sessions(user_id)
+        except Exception as e:
+            logger.error(f"Error loading sessions to push: {str(e)}")
+            return
+        frame = {"type": "sessions_updated", "data": sessions}
+        results = await asyncio.gather(*(connection.send(frame) for connection in connections), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(f"Could not push session list: {str(result)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "open_connections": self.open_connections(),
+            "connected_users": len(self._connections),
+            "peak_connections": self.peak_connections,
+            "connections_opened": self.connections_opened,
+            "auth_failures": self.auth_failures,
+            "frames_received": self.frames_received,
+            "turns_streamed": self.turns_streamed,
+            "peak_sessions_per_connection": self.peak_sessions_per_connection
+        }
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+ROLE_FIELDS = {"user": "user_messages", "assistant": "assistant_messages"}
+
+class ChatStatsStore:
+    """Per-user chat counters kept in ``chat_user_stats``
+
+    Counters are updated atomically with ``$inc`` on the write path (session
+    created, turn written, session deleted), so reading the stats is a single
+    fetch by ``user_id``. Increments are applied after the underlying write, so
+    a user without a stats document is simply reconciled at that point (or on
+    first read). A periodic reconciliation recomputes every user's counters
+    from ``chat_sessions``, ``chat_messages`` and the archived sessions to
+    repair any drift.
+    """
+
+    def __init__(self, db, reconcile_interval_hours: float = 24, archive=None):
+        self.db = db
+        self.archive = archive
+        self.collection = db.chat_user_stats
+        self.reconcile_interval_hours = reconcile_interval_hours
+        self._task: Optional[asyncio.Task] = None
+        self.last_reconciled: Optional[datetime] = None
+        self.users_corrected = 0
+
+    async def _increment(self, user_id: str, counters: Dict[str, int], last_chat_date: Optional[datetime] = None):
+        update = {"$inc": counters}
+        if last_chat_date:
+            update["$max"] = {"last_chat_date": last_chat_date}
+        result = await self.collection.update_one({"user_id": user_id}, update)
+        if result.matched_count == 0:
+            # First write for this user: count everything, including what was just written
+            await self.reconcile(user_id)
+
+    async def record_session_created(self, user_id: str, created_at: datetime):
+        await self._increment(user_id, {"total_sessions": 1}, created_at)
+
+    async def record_messages(self, messages: List[Dict[str, Any]], updated_at: datetime):
+        """Count the messages of a persisted turn (they all belong to one user)"""
+        if not messages:
+            return
+        counters = {}
+        for message in messages:
+            field = ROLE_FIELDS.get(message.get("role"))
+            if field:
+                counters[field] = counters.get(field, 0) + 1
+        await self._increment(messages[0]["user_id"], counters, updated_at)
+
+    async def record_session_deleted(self, user_id: str, role_counts: Dict[str, int]):
+        counters = {"total_sessions": -1}
+        for role, count in role_counts.items():
+            field = ROLE_FIELDS.get(role)
+            if field:
+                counters[field] = -count
+        result = await self.collection.update_one({"user_id": user_id}, {"$inc": counters})
+        if result.matched_count == 0:
+            await self.reconcile(user_id)
+            return
+
+        # The deleted session may have been the latest one
+        recent_session = await self.db.chat_sessions.find_one(
+            {"user_id": user_id},
+            {"_id": 0, "updated_at": 1},
+            sort=[("updated_at", -1)]
+        )
+        await self.collection.update_one(
+            {"user_id": user_id},
+            {"$set": {"last_chat_date": recent_session["updated_at"] if recent_session else None}}
+        )
+
+    async def compute(self, user_id: str) -> Dict[str, Any]:
+        """Recompute a user's counters from the chat collections"""
+        session_count = await self.db.chat_sessions.count_documents({"user_id": user_id})
+
+        pipeline = [
+            {"$match": {"user_id": user_id}},
+            {"$group": {"_id": "$role", "count": {"$sum": 1}}}
+        ]
+        message_stats = await self.db.chat_messages.aggregate(pipeline).to_list(10)
+        message_counts = {stat["_id"]: stat["count"] for stat in message_stats}
+        if self.archive is not None:
+            for role, count in (await self.archive.role_counts_for_user(user_id)).items():
+                message_counts[role] = message_counts.get(role, 0) + count
+
+        recent_session = await self.db.chat_sessions.find_one(
+            {"user_id": user_id},
+            {"_id": 0, "updated_at": 1},
+            sort=[("updated_at", -1)]
+        )
+
+        return {
+            "total_sessions": session_count,
+            "user_messages": message_counts.get("user", 0),
+            "assistant_messages": message_counts.get("assistant", 0),
+            "last_chat_date": recent_session["updated_at"] if recent_session else None
+        }
+
+    async def reconcile(self, user_id: str) -> Dict[str, Any]:
+        """Overwrite a user's counters with freshly computed values"""
+        computed = await self.compute(user_id)
+        previous = await self.collection.find_one_and_update(
+            {"user_id": user_id},
+            {"$set": {**computed, "reconciled_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+        if previous and any(previous.get(field) != value for field, value in computed.items()
+                            if field != "last_chat_date"):
+            self.users_corrected += 1
+            logger.warning(f"Corrected drifted chat stats for user {user_id}")
+        return computed
+
+    async def reconcile_all(self):
+        """Reconcile every user that has chat sessions or a stats document"""
+        user_ids = set(await self.db.chat_sessions.distinct("user_id"))
+        user_ids.update(await self.collection.distinct("user_id"))
+        for user_id in user_ids:
+            try:
+                await self.reconcile(user_id)
+            except Exception as e:
+                logger.error(f"Error reconciling chat stats for user {user_id}: {str(e)}")
+        self.last_reconciled = datetime.now(timezone.utc)
+        logger.info(f"Reconciled chat stats for {len(user_ids)} users")
+
+    async def get(self, user_id: str) -> Dict[str, Any]:
+        """Stats for the API: one indexed read, or a reconciliation for unknown users"""
+        stats = await self.collection.find_one({"user_id": user_id}, {"_id": 0})
+        if stats is None:
+            stats = await self.reconcile(user_id)
+
+        user_messages = max(stats.get("user_messages", 0), 0)
+        assistant_messages = max(stats.get("assistant_messages", 0), 0)
+        last_chat_date = stats.get("last_chat_date")
+        return {
+            "total_sessions": max(stats.get("total_sessions", 0), 0),
+            "total_messages": user_messages + assistant_messages,
+            "user_messages": user_messages,
+            "assistant_messages": assistant_messages,
+            "last_chat_date": last_chat_date.isoformat() if last_chat_date else None
+        }
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.reconcile_interval_hours * 3600)
+            try:
+                await self.reconcile_all()
+            except Exception as e:
+                logger.error(f"Error in chat stats reconciliation: {str(e)}")
+
+    def start(self):
+        """Start the periodic reconciliation job"""
+        if self._task is None and self.reconcile_interval_hours > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,106 @@
+import os
+import re
+import math
+import logging
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+_encoding = None
+_encoding_loaded = False
+
+def _get_encoding():
+    """Load the tokenizer used by the gpt-4o family once, or None if unavailable"""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            logger.warning(f"tiktoken unavailable, approximating token counts: {str(e)}")
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    """Count tokens with the model tokenizer (roughly 4 characters per token as a fallback)"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return math.ceil(len(text) / 4)
+    return len(encoding.encode(text))
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?;:])\s+|\n+")
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in _SENTENCE_BOUNDARY.split(text) if sentence and sentence.strip()]
+
+class ContextPacker:
+    """Fills a token budget with retrieved passages, most relevant first
+
+    Each passage gets a short header; passages that do not fit whole are trimmed
+    at a sentence boundary, and the packer stops once what is left of the
+    budget could not hold a meaningful excerpt.
+    """
+
+    PREAMBLE = "DOCUMENTACION RELEVANTE:\n"
+
+    def __init__(self, token_budget: int = 600, min_excerpt_tokens: int = 40):
+        self.token_budget = token_budget
+        self.min_excerpt_tokens = min_excerpt_tokens
+
+    def _fit_sentences(self, text: str, budget: int) -> str:
+        excerpt = []
+        used = 0
+        for sentence in split_sentences(text):
+            tokens = count_tokens(sentence) + 1
+            if used + tokens > budget:
+                break
+            excerpt.append(sentence)
+            used += tokens
+        return " ".join(excerpt)
+
+    def pack(self, documents: List[Dict[str, Any]], token_budget: Optional[int] = None) -> Dict[str, Any]:
+        """Build the context block; returns the text, its token count and the passages used"""
+        budget = token_budget if token_budget is not None else self.token_budget
+        ranked = sorted(documents, key=lambda doc: doc.get("score") or 0.0, reverse=True)
+
+        parts = []
+        used_documents = []
+        remaining = budget - count_tokens(self.PREAMBLE)
+        truncated = False
+
+        for doc in ranked:
+            metadata = doc.get("metadata", {})
+            header = f"\n{len(used_documents) + 1}. {metadata.get('title', 'Documento')} (Categoría: {metadata.get('category', 'N/A')}):\n"
+            available = remaining - count_tokens(header)
+            if available < self.min_excerpt_tokens:
+                truncated = True
+                break
+
+            content = doc.get("content", "").strip()
+            if count_tokens(content) <= available:
+                excerpt = content
+            else:
+                excerpt = self._fit_sentences(content, available)
+                truncated = True
+                if count_tokens(excerpt) < self.min_excerpt_tokens:
+                    continue
+
+            block = header + excerpt + "\n"
+            parts.append(block)
+            used_documents.append(doc)
+            remaining -= count_tokens(block)
+
+        context = self.PREAMBLE + "".join(parts) if parts else ""
+        return {
+            "context": context,
+            "context_tokens": count_tokens(context),
+            "documents": used_documents,
+            "truncated": truncated
+        }
+
+context_packer = ContextPacker(
+    token_budget=int(os.getenv('CHAT_CONTEXT_TOKEN_BUDGET', '600')),
+    min_excerpt_tokens=int(os.getenv('CHAT_CONTEXT_MIN_EXCERPT_TOKENS', '40'))
+)
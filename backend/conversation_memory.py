@@ -0,0 +1,158 @@
+import os
+import uuid
+import logging
+from typing import Dict, Any
+from llm_client import llm_pool, PRIORITY_BACKGROUND
+from context_packer import count_tokens, split_sentences
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_SYSTEM_MESSAGE = (
+    "Eres un asistente que resume conversaciones de asesoría sobre cumplimiento normativo. "
+    "Conserva datos de la empresa, normativas, clasificaciones, decisiones y preguntas abiertas. "
+    "Responde en español, en texto plano y sin markdown."
+)
+
+class ConversationMemory:
+    """Bounded per-session memory: the last N turns verbatim plus a rolling summary
+
+    The summary of older turns lives on the ``chat_sessions`` document
+    (``memory_summary`` and ``memory_summarized_until``), so what is sent to the
+    model stays under ``token_ceiling`` however long the consultation runs.
+    """
+
+    def __init__(self, db, recent_turns: int = 3, token_ceiling: int = 1200,
+                 summarize_every_turns: int = 2, summary_max_tokens: int = 350):
+        self.db = db
+        self.recent_turns = recent_turns
+        self.token_ceiling = token_ceiling
+        self.summarize_every_turns = summarize_every_turns
+        self.summary_max_tokens = summary_max_tokens
+        self._summarizing = set()
+
+    async def load(self, session_id: str) -> Dict[str, Any]:
+        """Get the rolling summary and the messages it does not cover yet"""
+        session = await self.db.chat_sessions.find_one(
+            {"id": session_id},
+            {"_id": 0, "memory_summary": 1, "memory_summarized_until": 1}
+        ) or {}
+
+        query = {"session_id": session_id}
+        if session.get("memory_summarized_until"):
+            query["created_at"] = {"$gt": session["memory_summarized_until"]}
+        # Normally at most the verbatim window plus one summarization batch
+        window = (self.recent_turns + self.summarize_every_turns) * 2
+        recent = await self.db.chat_messages.find(
+            query,
+            {"_id": 0, "role": 1, "content": 1, "created_at": 1}
+        ).sort("created_at", -1).limit(window).to_list(window)
+        recent.reverse()
+
+        return {
+            "summary": session.get("memory_summary") or "",
+            "recent": recent
+        }
+
+    def render(self, memory: Dict[str, Any]) -> str:
+        """Format the memory for the prompt, newest turns first to go when over the ceiling"""
+        budget = self.token_ceiling
+        header = ""
+        if memory["summary"]:
+            header = f"RESUMEN DE LA CONVERSACION ANTERIOR:\n{memory['summary']}\n"
+            budget -= count_tokens(header)
+
+        lines = []
+        for message in reversed(memory["recent"]):
+            speaker = "Usuario" if message["role"] == "user" else "Asistente"
+            line = f"{speaker}: {message['content']}"
+            tokens = count_tokens(line)
+            if tokens > budget:
+                break
+            lines.insert(0, line)
+            budget -= tokens
+
+        if not lines:
+            return header
+        return header + "\nULTIMOS MENSAJES:\n" + "\n".join(lines) + "\n"
+
+    def _trim_summary(self, summary: str) -> str:
+        if count_tokens(summary) <= self.summary_max_tokens:
+            return summary
+        kept, used = [], 0
+        for sentence in split_sentences(summary):
+            tokens = count_tokens(sentence) + 1
+            if used + tokens > self.summary_max_tokens:
+                break
+            kept.append(sentence)
+            used += tokens
+        return " ".join(kept)
+
+    async def update(self, session_id: str):
+        """Fold turns that fell out of the verbatim window into the rolling summary"""
+        if session_id in self._summarizing:
+            return
+        self._summarizing.add(session_id)
+        try:
+            session = await self.db.chat_sessions.find_one(
+                {"id": session_id},
+                {"_id": 0, "memory_summary": 1, "memory_summarized_until": 1}
+            )
+            if not session:
+                return
+
+            query = {"session_id": session_id}
+            if session.get("memory_summarized_until"):
+                query["created_at"] = {"$gt": session["memory_summarized_until"]}
+            pending = await self.db.chat_messages.find(
+                query,
+                {"_id": 0, "role": 1, "content": 1, "created_at": 1}
+            ).sort("created_at", 1).to_list(None)
+
+            older = pending[:-self.recent_turns * 2] if len(pending) > self.recent_turns * 2 else []
+            if len(older) < self.summarize_every_turns * 2:
+                return
+
+            transcript = "\n".join(
+                f"{'Usuario' if m['role'] == 'user' else 'Asistente'}: {m['content']}" for m in older
+            )
+            prompt = f"""
+RESUMEN ACTUAL:
+{session.get('memory_summary') or '(vacío)'}
+
+NUEVOS MENSAJES:
+{transcript}
+
+Actualiza el resumen incorporando los nuevos mensajes. Máximo 200 palabras.
+"""
+            summary = await llm_pool.complete(
+                "openai", "gpt-4o-mini",
+                prompt=prompt,
+                system_message=SUMMARY_SYSTEM_MESSAGE,
+                session_id=f"memory_{session_id}_{uuid.uuid4().hex}",
+                priority=PRIORITY_BACKGROUND,
+                fairness_key="memory"
+            )
+
+            await self.db.chat_sessions.update_one(
+                {"id": session_id},
+                {"$set": {
+                    "memory_summary": self._trim_summary(summary.strip()),
+                    "memory_summarized_until": older[-1]["created_at"]
+                }}
+            )
+            logger.info(f"Summarized {len(older)} older messages of session {session_id}")
+
+        except Exception as e:
+            logger.error(f"Error updating conversation memory for {session_id}: {str(e)}")
+        finally:
+            self._summarizing.discard(session_id)
+
+def create_conversation_memory(db) -> ConversationMemory:
+    """Build the memory component using environment settings"""
+    return ConversationMemory(
+        db,
+        recent_turns=int(os.getenv('CHAT_MEMORY_RECENT_TURNS', '3')),
+        token_ceiling=int(os.getenv('CHAT_MEMORY_TOKEN_CEILING', '1200')),
+        summarize_every_turns=int(os.getenv('CHAT_MEMORY_SUMMARIZE_EVERY_TURNS', '2')),
+        summary_max_tokens=int(os.getenv('CHAT_MEMORY_SUMMARY_MAX_TOKENS', '350'))
+    )
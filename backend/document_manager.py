@@ -2,10 +2,11 @@ import os
 import requests
 import asyncio
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union, Tuple
 import logging
 from datetime import datetime, timezone
 import hashlib
+import io
 import schedule
 import time
 from threading import Thread
@@ -19,6 +20,11 @@ from langchain_chroma import Chroma
 from langchain_openai import OpenAIEmbeddings
 from emergentintegrations.llm.chat import LlmChat, UserMessage
 from dotenv import load_dotenv
+from ingestion_registry import IngestionRegistry
+from blob_store import BlobStore
+from category_router import create_category_router, keyword_scores
+from single_flight import SingleFlight, normalize_query
+from suggestion_index import extract_article_headings
 
 load_dotenv()
 
@@ -26,6 +32,8 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class DocumentManager:
+    LOCAL_PREFIX = "local_"
+    
     def __init__(self):
         self.docs_path = Path("/app/docs")
         self.normativas_path = self.docs_path / "normativas"
@@ -43,12 +51,14 @@ class DocumentManager:
                 model_name="sentence-transformers/all-MiniLM-L6-v2",
                 model_kwargs={'device': 'cpu'}
             )
+            self.embedding_model = "sentence-transformers/all-MiniLM-L6-v2"
             logger.info("Using HuggingFace embeddings for ChromaDB")
         except Exception as e:
             logger.warning(f"Failed to initialize HuggingFace embeddings: {str(e)}")
             # Fallback to a simple embedding
             from langchain_community.embeddings import FakeEmbeddings
             self.embeddings = FakeEmbeddings(size=384)
+            self.embedding_model = "fake-384"
             logger.info("Using fake embeddings as fallback")
         
         self.vectorstore = Chroma(
@@ -57,6 +67,22 @@ class DocumentManager:
             persist_directory=str(self.knowledge_base_path / "chroma_db")
         )
         
+        # News items and repository summaries, kept apart so they never force a rebuild of the regulations
+        self.updates_store = Chroma(
+            collection_name="knowledge_updates",
+            embedding_function=self.embeddings,
+            persist_directory=str(self.knowledge_base_path / "chroma_db")
+        )
+        
+        # Bumped whenever chunks are added or removed, so derived caches know to refresh;
+        # regulations and updates are counted apart (see index_generation)
+        self.regulation_generation = 0
+        self.updates_generation = 0
+        
+        # Concurrent identical queries share one embedding / vector search
+        self.embedding_flight = SingleFlight("embedding")
+        self.search_flight = SingleFlight("search")
+        
         # Initialize text splitter
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
@@ -110,30 +136,160 @@ class DocumentManager:
                 "description": "Spanish General Health Law - consolidated text"
             }
         }
+        
+        # Compressed, content-addressed storage for downloaded sources and extracted text
+        self.blob_store = BlobStore(self.knowledge_base_path / "objects")
+        
+        # Persistent ingestion state, so restarts do not re-download or re-embed
+        self.registry = IngestionRegistry(self.knowledge_base_path / "ingestion_registry.db")
+        self._restore_ingestion_state()
+        
+        # Documents dropped into docs/normativas or docs/updates by hand
+        self.local_documents = {}
+        self._restore_local_documents()
+    
+    def _restore_ingestion_state(self):
+        """Load last known download/ingest state of each source from the registry"""
+        for doc_id, state in self.registry.all().items():
+            source_info = self.document_sources.get(doc_id)
+            if not source_info:
+                continue
+            source_info["last_updated"] = state.get("last_ingested")
+            source_info["last_checked"] = state.get("last_checked")
+            for field in ("local_path", "checksum", "etag", "last_modified"):
+                if state.get(field):
+                    source_info[field] = state[field]
+        logger.info(f"Restored ingestion state for {sum(1 for s in self.document_sources.values() if s.get('checksum'))} documents")
+    
+    def _restore_local_documents(self):
+        """Rebuild the local document catalogue from the registry"""
+        for doc_id, state in self.registry.all().items():
+            if not doc_id.startswith(self.LOCAL_PREFIX) or not state.get("local_path"):
+                continue
+            _, info = self.describe_local_file(Path(state["local_path"]))
+            info["last_updated"] = state.get("last_ingested")
+            info["checksum"] = state.get("checksum")
+            self.local_documents[doc_id] = info
+    
+    def describe_local_file(self, file_path: Path) -> tuple:
+        """Work out doc_id and metadata for a PDF found in a watched folder
+        
+        Files following the download naming ``{doc_id}_{category}.pdf`` of a known
+        source are attached to that source, so a local copy avoids the network fetch.
+        Otherwise trailing lowercase name parts are taken as the category, e.g.
+        ``LEY_SEGUROS_insurance_law.pdf`` -> ``insurance_law``.
+        """
+        stem = file_path.stem
+        for doc_id, source_info in self.document_sources.items():
+            if stem == f"{doc_id}_{source_info['category']}":
+                return doc_id, source_info
+        
+        parts = stem.split("_")
+        category_parts = []
+        while len(parts) > 1 and parts[-1] and parts[-1].islower():
+            category_parts.insert(0, parts.pop())
+        category = "_".join(category_parts) or "local"
+        title = " ".join(parts) if category_parts else stem.replace("_", " ")
+        
+        return f"{self.LOCAL_PREFIX}{stem}", {
+            "url": file_path.resolve().as_uri(),
+            "title": title,
+            "category": category,
+            "last_updated": None,
+            "description": f"Documento local cargado desde {file_path.parent.name}"
+        }
+    
+    async def ingest_local_file(self, file_path: Path) -> bool:
+        """Index a PDF from a watched folder if it is new or changed"""
+        doc_id, info = self.describe_local_file(file_path)
+        checksum = await asyncio.to_thread(self._file_checksum, file_path)
+        
+        if info.get("checksum") == checksum and await asyncio.to_thread(self._is_indexed, doc_id, checksum):
+            return False
+        
+        info["checksum"] = checksum
+        info["local_path"] = str(file_path)
+        info["last_updated"] = datetime.now(timezone.utc)
+        info["last_checked"] = info["last_updated"]
+        if doc_id.startswith(self.LOCAL_PREFIX):
+            self.local_documents[doc_id] = info
+        
+        logger.info(f"Ingesting local document {file_path.name} as {doc_id} ({info['category']})")
+        return await self.ingest_if_changed(doc_id, str(file_path), info)
+    
+    @staticmethod
+    def _file_checksum(file_path: Path) -> str:
+        sha256 = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha256.update(block)
+        return sha256.hexdigest()
+    
+    def remove_local_document(self, doc_id: str):
+        """De-index a local document whose file was deleted"""
+        self.remove_document_chunks(doc_id)
+        self.registry.delete(doc_id)
+        self.local_documents.pop(doc_id, None)
+        logger.info(f"Removed local document {doc_id} from the index")
+    
+    def _is_indexed(self, doc_id: str, checksum: Optional[str]) -> bool:
+        """Check whether the vector store already holds this exact content with the current embeddings"""
+        state = self.registry.get(doc_id)
+        if not state or not checksum:
+            return False
+        if state.get("checksum") != checksum or state.get("embedding_model") != self.embedding_model:
+            return False
+        if not state.get("chunk_count"):
+            return False
+        try:
+            return bool(self.vectorstore.get(where={"source": doc_id}, limit=1, include=[])["ids"])
+        except Exception as e:
+            logger.warning(f"Could not verify chunks for {doc_id}: {str(e)}")
+            return False
+    
+    async def ingest_if_changed(self, doc_id: str, file_path: str, source_info: Dict[str, Any]) -> bool:
+        """Embed a downloaded document unless identical content is already indexed"""
+        if await asyncio.to_thread(self._is_indexed, doc_id, source_info.get("checksum")):
+            logger.info(f"Document {doc_id} unchanged (checksum {source_info['checksum'][:12]}), skipping re-embedding")
+            state = self.registry.get(doc_id) or {}
+            source_info["last_updated"] = state.get("last_ingested") or source_info.get("last_updated")
+            self.registry.upsert(
+                doc_id,
+                local_path=file_path,
+                etag=source_info.get("etag"),
+                last_modified=source_info.get("last_modified"),
+                last_checked=datetime.now(timezone.utc)
+            )
+            return False
+        
+        await asyncio.to_thread(self.remove_document_chunks, doc_id)
+        await self.process_document(doc_id, file_path, source_info)
+        return True
     
     async def download_document(self, doc_id: str, source_info: Dict[str, Any]) -> Optional[str]:
         """Download a document from its source URL"""
         try:
             url = source_info["url"]
             title = source_info["title"]
-            category = source_info["category"]
             
             logger.info(f"Downloading document: {title}")
             
-            response = requests.get(url, headers={'User-Agent': 'Mozilla/5.0 (compatible; ComplianceBot/1.0)'})
+            response = await asyncio.to_thread(
+                requests.get, url, headers={'User-Agent': 'Mozilla/5.0 (compatible; ComplianceBot/1.0)'}, timeout=120
+            )
             response.raise_for_status()
             
-            # Create filename
-            filename = f"{doc_id}_{category}.pdf"
-            file_path = self.normativas_path / filename
-            
-            # Save file
-            with open(file_path, 'wb') as f:
-                f.write(response.content)
+            # Save compressed, keyed by content hash
+            checksum = await asyncio.to_thread(self.blob_store.put, response.content, kind="sources")
+            file_path = self.blob_store.path_for(checksum, kind="sources")
             
             # Update metadata
             source_info["last_updated"] = datetime.now(timezone.utc)
+            source_info["last_checked"] = source_info["last_updated"]
             source_info["local_path"] = str(file_path)
+            source_info["checksum"] = checksum
+            source_info["etag"] = response.headers.get("ETag")
+            source_info["last_modified"] = response.headers.get("Last-Modified")
             
             logger.info(f"Successfully downloaded: {title} to {file_path}")
             return str(file_path)
@@ -142,16 +298,31 @@ class DocumentManager:
             logger.error(f"Error downloading document {doc_id}: {str(e)}")
             return None
     
-    async def extract_text_from_pdf(self, file_path: str) -> str:
-        """Extract text from PDF file"""
+    async def extract_text_from_pdf(self, file_path: str, checksum: Optional[str] = None) -> str:
+        """Extract text from PDF file, reusing previously extracted text for the same content"""
+        # pdfplumber is CPU bound: keep it off the event loop
+        return await asyncio.to_thread(self._extract_text, file_path, checksum)
+    
+    def _extract_text(self, file_path: str, checksum: Optional[str] = None) -> str:
         try:
+            data = self.blob_store.read_path(file_path)
+            checksum = checksum or hashlib.sha256(data).hexdigest()
+            
+            cached_text = self.blob_store.get_text(checksum)
+            if cached_text is not None:
+                logger.info(f"Using stored text for {file_path} ({len(cached_text)} characters)")
+                return cached_text
+            
             text = ""
-            with pdfplumber.open(file_path) as pdf:
+            with pdfplumber.open(io.BytesIO(data)) as pdf:
                 for page in pdf.pages:
                     page_text = page.extract_text()
                     if page_text:
                         text += page_text + "\n"
             
+            if text:
+                self.blob_store.put_text(checksum, text)
+            
             logger.info(f"Extracted {len(text)} characters from {file_path}")
             return text
             
@@ -160,10 +331,17 @@ class DocumentManager:
             return ""
     
     async def process_document(self, doc_id: str, file_path: str, metadata: Dict[str, Any]):
-        """Process document and add to vector store"""
+        """Process document and add to vector store
+        
+        Extraction and embedding block for seconds on large regulations, so
+        they run in a worker thread and only the result is awaited.
+        """
+        await asyncio.to_thread(self._process_document, doc_id, file_path, metadata)
+    
+    def _process_document(self, doc_id: str, file_path: str, metadata: Dict[str, Any]):
         try:
             # Extract text
-            text = await self.extract_text_from_pdf(file_path)
+            text = self._extract_text(file_path, metadata.get("checksum"))
             if not text:
                 logger.warning(f"No text extracted from {file_path}")
                 return
@@ -195,6 +373,21 @@ class DocumentManager:
                 metadatas=metadatas,
                 ids=[f"{doc_id}_chunk_{i}" for i in range(len(texts))]
             )
+            self.regulation_generation += 1
+            
+            self.registry.upsert(
+                doc_id,
+                url=metadata.get("url"),
+                local_path=file_path,
+                checksum=metadata.get("checksum"),
+                etag=metadata.get("etag"),
+                last_modified=metadata.get("last_modified"),
+                chunk_count=len(chunks),
+                embedding_model=self.embedding_model,
+                last_ingested=metadata["last_updated"] or datetime.now(timezone.utc),
+                last_checked=datetime.now(timezone.utc)
+            )
+            self.registry.set_headings(doc_id, extract_article_headings(text))
             
             logger.info(f"Added {len(chunks)} chunks from {metadata['title']} to vector store")
             
@@ -206,9 +399,13 @@ class DocumentManager:
         logger.info("Starting download of all regulatory documents")
         
         for doc_id, source_info in self.document_sources.items():
+            local_path = source_info.get("local_path")
+            if local_path and Path(local_path).exists() and await asyncio.to_thread(self._is_indexed, doc_id, source_info.get("checksum")):
+                logger.info(f"Document {doc_id} already downloaded and indexed")
+                continue
             file_path = await self.download_document(doc_id, source_info)
             if file_path:
-                await self.process_document(doc_id, file_path, source_info)
+                await self.ingest_if_changed(doc_id, file_path, source_info)
         
         logger.info("Completed downloading and processing all documents")
     
@@ -223,27 +420,43 @@ class DocumentManager:
                     logger.info(f"Document {doc_id} not found locally, downloading...")
                     file_path = await self.download_document(doc_id, source_info)
                     if file_path:
-                        await self.process_document(doc_id, file_path, source_info)
+                        await self.ingest_if_changed(doc_id, file_path, source_info)
                     continue
                 
                 # Check if document needs updating (weekly check)
-                last_updated = source_info.get("last_updated")
-                if last_updated:
-                    days_since_update = (datetime.now(timezone.utc) - last_updated).days
-                    if days_since_update < 7:
+                last_checked = source_info.get("last_checked") or source_info.get("last_updated")
+                if last_checked and await asyncio.to_thread(self._is_indexed, doc_id, source_info.get("checksum")):
+                    days_since_check = (datetime.now(timezone.utc) - last_checked).days
+                    if days_since_check < 7:
                         logger.info(f"Document {doc_id} is up to date")
                         continue
                 
-                # Try to detect if remote document has changed
-                response = requests.head(source_info["url"])
-                if response.status_code == 200:
-                    # Re-download and process if needed
-                    logger.info(f"Re-downloading document {doc_id} for updates")
-                    file_path = await self.download_document(doc_id, source_info)
-                    if file_path:
-                        # Remove old chunks from vector store
-                        self.remove_document_chunks(doc_id)
-                        await self.process_document(doc_id, file_path, source_info)
+                # Ask the server whether the remote document has changed
+                headers = {'User-Agent': 'Mozilla/5.0 (compatible; ComplianceBot/1.0)'}
+                if source_info.get("etag"):
+                    headers["If-None-Match"] = source_info["etag"]
+                if source_info.get("last_modified"):
+                    headers["If-Modified-Since"] = source_info["last_modified"]
+                response = await asyncio.to_thread(
+                    requests.head, source_info["url"], headers=headers, timeout=30, allow_redirects=True
+                )
+                
+                not_modified = response.status_code == 304 or (
+                    response.status_code == 200
+                    and source_info.get("etag")
+                    and response.headers.get("ETag") == source_info["etag"]
+                )
+                if not_modified and await asyncio.to_thread(self._is_indexed, doc_id, source_info.get("checksum")):
+                    logger.info(f"Document {doc_id} not modified upstream")
+                    source_info["last_checked"] = datetime.now(timezone.utc)
+                    self.registry.mark_checked(doc_id)
+                    continue
+                
+                # Re-download and re-embed only if the content actually changed
+                logger.info(f"Re-downloading document {doc_id} for updates")
+                file_path = await self.download_document(doc_id, source_info)
+                if file_path:
+                    await self.ingest_if_changed(doc_id, file_path, source_info)
                 
             except Exception as e:
                 logger.error(f"Error updating document {doc_id}: {str(e)}")
@@ -255,40 +468,331 @@ class DocumentManager:
             results = self.vectorstore.get(where={"source": doc_id})
             if results["ids"]:
                 self.vectorstore.delete(ids=results["ids"])
+                self.regulation_generation += 1
                 logger.info(f"Removed {len(results['ids'])} chunks for document {doc_id}")
         except Exception as e:
             logger.error(f"Error removing chunks for document {doc_id}: {str(e)}")
     
-    def search_documents(self, query: str, k: int = 5, category_filter: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Search documents in vector store"""
+    @property
+    def index_generation(self) -> int:
+        """Changes whenever any chunk is added or removed, regulation or update"""
+        return self.regulation_generation + self.updates_generation
+    
+    def generation_for(self, sources: Optional[List[str]] = None) -> int:
+        """Generation of the partitions a search over ``sources`` reads"""
+        if set(sources or ["regulation"]) == {"regulation"}:
+            return self.regulation_generation
+        return self.index_generation
+    
+    # Ranking weight per source type, and how fast news loses relevance
+    SOURCE_WEIGHTS = {"regulation": 1.0, "news": 0.85, "repository": 0.75}
+    RECENCY_HALF_LIFE_DAYS = 30
+    # Updates embedded per vector store call when catching up
+    UPDATE_BATCH_SIZE = 256
+    
+    def _update_category(self, text: str) -> str:
+        scores = keyword_scores(text)
+        return max(scores, key=scores.get) if scores else "general"
+    
+    def _index_updates(self, updates: List[Tuple[str, str, Dict[str, Any]]]) -> int:
+        """Embed (id, text, metadata) updates with one vector store call"""
+        if not updates:
+            return 0
         try:
-            where_filter = {}
-            if category_filter:
-                where_filter["category"] = category_filter
-            
-            results = self.vectorstore.similarity_search(
-                query=query,
-                k=k,
-                filter=where_filter if where_filter else None
+            self.updates_store.add_texts(
+                texts=[text for _, text, _ in updates],
+                metadatas=[{key: value for key, value in metadata.items() if value is not None}
+                           for _, _, metadata in updates],
+                ids=[update_id for update_id, _, _ in updates]
             )
+            self.updates_generation += 1
+            return len(updates)
+        except Exception as e:
+            logger.error(f"Error indexing {len(updates)} updates ({updates[0][0]}...): {str(e)}")
+            return 0
+    
+    def _news_update(self, news_item: Dict[str, Any]) -> Tuple[str, str, Dict[str, Any]]:
+        summary = news_item.get("ai_summary") or news_item.get("summary") or ""
+        text = f"{news_item['title']}\n{summary}"
+        published = news_item.get("scraped_at") or datetime.now(timezone.utc)
+        if published.tzinfo is None:
+            published = published.replace(tzinfo=timezone.utc)
+        return f"news_{news_item['id']}", text, {
+            "source_type": "news",
+            "source": news_item.get("source"),
+            "title": news_item["title"],
+            "url": news_item.get("url"),
+            "category": self._update_category(text),
+            "published_ts": published.timestamp(),
+            "last_updated": published.isoformat()
+        }
+    
+    def _repository_update(self, document: Dict[str, Any]) -> Tuple[str, str, Dict[str, Any]]:
+        text = f"{document['title']}\n{document.get('summary_es') or ''}\n{document.get('keywords') or ''}".strip()
+        published = document.get("last_updated")
+        if isinstance(published, str):
+            try:
+                published = datetime.fromisoformat(published)
+            except ValueError:
+                published = None
+        published = published or datetime.now(timezone.utc)
+        if published.tzinfo is None:
+            published = published.replace(tzinfo=timezone.utc)
+        return f"repo_{hashlib.md5(document['url'].encode()).hexdigest()}", text, {
+            "source_type": "repository",
+            "source": document.get("source"),
+            "title": document["title"],
+            "url": document["url"],
+            "category": document.get("category") or self._update_category(text),
+            "published_ts": published.timestamp(),
+            "last_updated": published.isoformat()
+        }
+    
+    def index_news_items(self, news_items: List[Dict[str, Any]]) -> int:
+        """Embed saved news items into the updates partition in one batch; returns how many were indexed"""
+        return self._index_updates([self._news_update(item) for item in news_items])
+    
+    def index_news_item(self, news_item: Dict[str, Any]) -> bool:
+        """Embed a saved news item into the updates partition"""
+        return self.index_news_items([news_item]) == 1
+    
+    def index_repository_document(self, document: Dict[str, Any]) -> bool:
+        """Embed a repository document summary into the updates partition"""
+        return self._index_updates([self._repository_update(document)]) == 1
+    
+    def sync_update_index(self, news_items: List[Dict[str, Any]], repository_documents: List[Dict[str, Any]]) -> int:
+        """Index any news items or repository documents saved before they could be indexed"""
+        candidates = {f"news_{item['id']}": ("news", item) for item in news_items}
+        candidates.update({
+            f"repo_{hashlib.md5(doc['url'].encode()).hexdigest()}": ("repository", doc)
+            for doc in repository_documents
+        })
+        if not candidates:
+            return 0
+        
+        existing = set(self.updates_store.get(ids=list(candidates), include=[])["ids"])
+        updates = [
+            self._news_update(item) if kind == "news" else self._repository_update(item)
+            for update_id, (kind, item) in candidates.items()
+            if update_id not in existing
+        ]
+        indexed = 0
+        for start in range(0, len(updates), self.UPDATE_BATCH_SIZE):
+            indexed += self._index_updates(updates[start:start + self.UPDATE_BATCH_SIZE])
+        
+        logger.info(f"Indexed {indexed} pending news/repository updates")
+        return indexed
+    
+    def _rank_score(self, distance: float, metadata: Dict[str, Any], now_ts: float) -> float:
+        relevance = 1.0 / (1.0 + max(distance, 0.0))
+        source_type = metadata.get("source_type", "regulation")
+        score = relevance * self.SOURCE_WEIGHTS.get(source_type, 0.5)
+        if source_type != "regulation" and metadata.get("published_ts"):
+            age_days = max(0.0, (now_ts - metadata["published_ts"]) / 86400)
+            score *= 0.7 + 0.3 * 0.5 ** (age_days / self.RECENCY_HALF_LIFE_DAYS)
+        return score
+    
+    def rank_score(self, distance: float, metadata: Dict[str, Any]) -> float:
+        """Score a hit the way search results are scored, for distances computed outside Chroma"""
+        return self._rank_score(distance, metadata, datetime.now(timezone.utc).timestamp())
+    
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a query once so it can be reused for routing and search"""
+        return self.embeddings.embed_query(query)
+    
+    async def embed_query_async(self, query: str) -> List[float]:
+        """Embed a query off the event loop, sharing the work with identical concurrent queries"""
+        return await self.embedding_flight.do(
+            normalize_query(query),
+            lambda: asyncio.to_thread(self.embed_query, query)
+        )
+    
+    async def search_documents_async(self, query: str, k: int = 5,
+                                     category_filter: Optional[Union[str, List[str]]] = None,
+                                     query_embedding: Optional[List[float]] = None,
+                                     sources: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """search_documents off the event loop; concurrent identical searches run once"""
+        if isinstance(category_filter, (list, tuple, set)):
+            category_key = tuple(sorted(category_filter))
+        else:
+            category_key = category_filter
+        key = (normalize_query(query), category_key, k, tuple(sorted(sources or ["regulation"])), self.generation_for(sources))
+        return await self.search_flight.do(
+            key,
+            lambda: asyncio.to_thread(self.search_documents, query, k, category_filter, query_embedding, sources)
+        )
+    
+    def _search_filters(self, category_filter: Optional[Union[str, List[str]]],
+                        sources: Optional[List[str]]) -> Tuple[bool, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Chroma filters per partition: (search regulations?, regulation filter, updates filter or None)"""
+        where_filter = {}
+        if isinstance(category_filter, (list, tuple, set)):
+            categories = list(category_filter)
+            if len(categories) == 1:
+                where_filter["category"] = categories[0]
+            elif categories:
+                where_filter["category"] = {"$in": categories}
+        elif category_filter:
+            where_filter["category"] = category_filter
+        
+        sources = sources or ["regulation"]
+        update_types = [source for source in sources if source in ("news", "repository")]
+        update_filter = None
+        if update_types:
+            update_filter = {"source_type": update_types[0]} if len(update_types) == 1 else {"source_type": {"$in": update_types}}
+            if where_filter:
+                update_filter = {"$and": [update_filter, where_filter]}
+        return "regulation" in sources, where_filter or None, update_filter
+    
+    def _rank_results(self, scored: List[Tuple], k: int) -> List[Dict[str, Any]]:
+        """Merge (content, metadata, distance[, embedding]) hits from all partitions into the top k"""
+        now_ts = datetime.now(timezone.utc).timestamp()
+        search_results = []
+        for content, metadata, distance, *vector in scored:
+            metadata = dict(metadata or {})
+            metadata.setdefault("source_type", "regulation")
+            result = {
+                "content": content,
+                "metadata": metadata,
+                "score": self._rank_score(distance, metadata, now_ts)
+            }
+            if vector:
+                result["embedding"] = vector[0]
+            search_results.append(result)
+        
+        search_results.sort(key=lambda item: item["score"], reverse=True)
+        return search_results[:k]
+    
+    def search_documents(self, query: str, k: int = 5, category_filter: Optional[Union[str, List[str]]] = None,
+                         query_embedding: Optional[List[float]] = None,
+                         sources: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Search documents in vector store
+        
+        ``sources`` selects the partitions to search ("regulation", "news",
+        "repository"); by default only regulations are searched. Results from
+        several partitions are merged and ranked by relevance, source type and
+        recency.
+        """
+        try:
+            search_regulations, where_filter, update_filter = self._search_filters(category_filter, sources)
+            if query_embedding is None:
+                query_embedding = self.embed_query(query)
             
-            search_results = []
-            for result in results:
-                search_results.append({
-                    "content": result.page_content,
-                    "metadata": result.metadata,
-                    "score": getattr(result, 'score', None)
-                })
+            scored = []
+            if search_regulations:
+                scored.extend(self.vectorstore.similarity_search_by_vector_with_relevance_scores(
+                    embedding=query_embedding,
+                    k=k,
+                    filter=where_filter
+                ))
             
-            return search_results
+            if update_filter:
+                scored.extend(self.updates_store.similarity_search_by_vector_with_relevance_scores(
+                    embedding=query_embedding,
+                    k=k,
+                    filter=update_filter
+                ))
+            
+            return self._rank_results(
+                [(result.page_content, result.metadata, distance) for result, distance in scored], k
+            )
             
         except Exception as e:
             logger.error(f"Error searching documents: {str(e)}")
             return []
     
+    def _query_by_vectors(self, embeddings: List[List[float]], k: int,
+                          category_filter: Optional[Union[str, List[str]]] = None,
+                          sources: Optional[List[str]] = None,
+                          include_vectors: bool = False) -> List[List[Dict[str, Any]]]:
+        """Ranked results for several query embeddings, with one Chroma query per partition"""
+        search_regulations, where_filter, update_filter = self._search_filters(category_filter, sources)
+        include = ["documents", "metadatas", "distances"] + (["embeddings"] if include_vectors else [])
+        
+        scored: List[List[Tuple]] = [[] for _ in embeddings]
+        partitions = []
+        if search_regulations:
+            partitions.append((self.vectorstore, where_filter))
+        if update_filter:
+            partitions.append((self.updates_store, update_filter))
+        
+        for store, where in partitions:
+            try:
+                response = store._collection.query(
+                    query_embeddings=embeddings,
+                    n_results=k,
+                    where=where,
+                    include=include
+                )
+            except Exception as e:
+                logger.error(f"Error querying vector store: {str(e)}")
+                continue
+            for index in range(len(embeddings)):
+                columns = [response["documents"][index], response["metadatas"][index], response["distances"][index]]
+                if include_vectors:
+                    columns.append(response["embeddings"][index])
+                scored[index].extend(zip(*columns))
+        
+        return [self._rank_results(hits, k) for hits in scored]
+    
+    def batch_search_documents(self, queries: List[str], k: int = 5,
+                               category_filter: Optional[Union[str, List[str]]] = None,
+                               sources: Optional[List[str]] = None) -> Tuple[List[List[float]], List[List[Dict[str, Any]]]]:
+        """Search many queries at once: one batched embedding call and one multi-query per partition
+        
+        Returns the query embeddings and the results for each query, in order.
+        """
+        if not queries:
+            return [], []
+        embeddings = self.embeddings.embed_documents(queries)
+        return embeddings, self._query_by_vectors(embeddings, k, category_filter, sources)
+    
+    def search_with_vectors(self, query_embedding: List[float], k: int = 5,
+                            category_filter: Optional[Union[str, List[str]]] = None,
+                            sources: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Like search_documents, but every result also carries its chunk ``embedding``"""
+        return self._query_by_vectors([query_embedding], k, category_filter, sources, include_vectors=True)[0]
+    
+    async def search_with_vectors_async(self, query: str, query_embedding: List[float], k: int = 5,
+                                        category_filter: Optional[Union[str, List[str]]] = None,
+                                        sources: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """search_with_vectors off the event loop; concurrent identical searches run once"""
+        if isinstance(category_filter, (list, tuple, set)):
+            category_key = tuple(sorted(category_filter))
+        else:
+            category_key = category_filter
+        key = ("vectors", normalize_query(query), category_key, k, tuple(sorted(sources or ["regulation"])), self.generation_for(sources))
+        return await self.search_flight.do(
+            key,
+            lambda: asyncio.to_thread(self.search_with_vectors, query_embedding, k, category_filter, sources)
+        )
+    
+    def article_headings(self) -> List[Tuple[str, str, str]]:
+        """(heading, document title, category) for every article heading of the indexed documents
+        
+        Documents ingested before headings were extracted are read back from the
+        stored text once and backfilled.
+        """
+        sources = {**self.document_sources, **self.local_documents}
+        stored = self.registry.all_headings()
+        for doc_id, state in self.registry.all().items():
+            if doc_id in stored or doc_id not in sources or not state.get("checksum"):
+                continue
+            text = self.blob_store.get_text(state["checksum"])
+            if text is not None:
+                stored[doc_id] = extract_article_headings(text)
+                self.registry.set_headings(doc_id, stored[doc_id])
+        
+        return [
+            (heading, sources[doc_id]["title"], sources[doc_id]["category"])
+            for doc_id, headings in stored.items() if doc_id in sources
+            for heading in headings
+        ]
+    
     def get_document_categories(self) -> List[str]:
         """Get all available document categories"""
-        return list(set(source["category"] for source in self.document_sources.values()))
+        sources = list(self.document_sources.values()) + list(self.local_documents.values())
+        return list(set(source["category"] for source in sources))
     
     def get_document_stats(self) -> Dict[str, Any]:
         """Get statistics about the document collection"""
@@ -302,28 +806,34 @@ class DocumentManager:
             
             # Get last update times
             last_updates = {}
-            for doc_id, source in self.document_sources.items():
+            for doc_id, source in {**self.document_sources, **self.local_documents}.items():
                 if source.get("last_updated"):
                     last_updates[doc_id] = source["last_updated"].isoformat()
             
             return {
                 "total_chunks": total_chunks,
-                "total_documents": len(self.document_sources),
+                "total_documents": len(self.document_sources) + len(self.local_documents),
                 "categories": categories,
-                "last_updates": last_updates
+                "last_updates": last_updates,
+                "storage": self.blob_store.stats(),
+                "coalescing": {
+                    "embedding": self.embedding_flight.stats(),
+                    "search": self.search_flight.stats()
+                }
             }
             
         except Exception as e:
             logger.error(f"Error getting document stats: {str(e)}")
             return {
                 "total_chunks": 0,
-                "total_documents": len(self.document_sources),
+                "total_documents": len(self.document_sources) + len(self.local_documents),
                 "categories": self.get_document_categories(),
                 "last_updates": {}
             }
 
 # Initialize document manager
 document_manager = DocumentManager()
+category_router = create_category_router(document_manager)
 
 def schedule_updates():
     """Schedule weekly document updates"""
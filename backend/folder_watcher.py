@@ -0,0 +1,115 @@
+import os
+import asyncio
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class DropFolderWatcher:
+    """Polls the document drop folders and keeps the vector store in sync with them
+
+    New or changed PDFs are queued for incremental ingestion and processed by a
+    small pool of workers; files that disappear are removed from the index.
+    """
+
+    def __init__(self, manager, folders: List[Path], poll_interval: float = 30.0,
+                 max_queue_size: int = 32, workers: int = 1):
+        self.manager = manager
+        self.folders = folders
+        self.poll_interval = poll_interval
+        self.workers = workers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._snapshot: Dict[Path, Tuple[int, int]] = {}
+        self._pending = set()
+        self._tasks: List[asyncio.Task] = []
+
+    def _list_pdfs(self) -> Dict[Path, Tuple[int, int]]:
+        files = {}
+        for folder in self.folders:
+            if not folder.exists():
+                continue
+            for path in folder.glob("*.pdf"):
+                try:
+                    stat = path.stat()
+                    files[path] = (stat.st_mtime_ns, stat.st_size)
+                except FileNotFoundError:
+                    continue
+        return files
+
+    def _watched(self, local_path: Optional[str]) -> bool:
+        if not local_path:
+            return False
+        parent = Path(local_path).parent
+        return any(parent == folder for folder in self.folders)
+
+    async def scan(self):
+        """Compare the folders with the last snapshot and queue the differences"""
+        current = self._list_pdfs()
+
+        for path, signature in current.items():
+            if self._snapshot.get(path) == signature or path in self._pending:
+                continue
+            self._pending.add(path)
+            await self.queue.put(("ingest", path))
+
+        # Only hand-dropped documents are de-indexed; known sources are re-downloaded by update_documents
+        for doc_id, state in self.manager.registry.all().items():
+            if not doc_id.startswith(self.manager.LOCAL_PREFIX):
+                continue
+            local_path = state.get("local_path")
+            if self._watched(local_path) and Path(local_path) not in current and doc_id not in self._pending:
+                self._pending.add(doc_id)
+                await self.queue.put(("remove", doc_id))
+
+        self._snapshot = current
+
+    async def _worker(self):
+        while True:
+            action, target = await self.queue.get()
+            self._pending.discard(target)
+            try:
+                if action == "ingest":
+                    await self.manager.ingest_local_file(target)
+                elif action == "remove":
+                    await asyncio.to_thread(self.manager.remove_local_document, target)
+            except Exception as e:
+                logger.error(f"Error handling {action} for {target}: {str(e)}")
+                # Forget the snapshot entry so the file is retried on the next scan
+                if action == "ingest":
+                    self._snapshot.pop(target, None)
+            finally:
+                self.queue.task_done()
+
+    async def _poll(self):
+        while True:
+            try:
+                await self.scan()
+            except Exception as e:
+                logger.error(f"Error scanning drop folders: {str(e)}")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        """Start the polling loop and ingestion workers on the running event loop"""
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._poll()))
+        logger.info(f"Watching {', '.join(str(f) for f in self.folders)} for documents every {self.poll_interval:.0f}s")
+
+    async def stop(self):
+        """Stop polling and workers"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+def create_drop_folder_watcher(manager) -> DropFolderWatcher:
+    """Build a watcher for docs/normativas and docs/updates using environment settings"""
+    return DropFolderWatcher(
+        manager,
+        folders=[manager.normativas_path, manager.updates_path],
+        poll_interval=float(os.getenv('DOCS_WATCH_INTERVAL_SECONDS', '30')),
+        max_queue_size=int(os.getenv('DOCS_WATCH_QUEUE_SIZE', '32')),
+        workers=int(os.getenv('DOCS_WATCH_WORKERS', '1'))
+    )
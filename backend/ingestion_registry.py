@@ -0,0 +1,157 @@
+import json
+import sqlite3
+import logging
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+from datetime import datetime, timezone
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+class IngestionRegistry:
+    """Persistent record of what has been downloaded and embedded for each document source"""
+
+    FIELDS = (
+        "url", "local_path", "checksum", "etag", "last_modified",
+        "chunk_count", "embedding_model", "last_ingested", "last_checked"
+    )
+    TIMESTAMP_FIELDS = ("last_ingested", "last_checked")
+
+    def __init__(self, db_path: Path):
+        self.db_path = str(db_path)
+        self._lock = Lock()
+        self.init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def init_database(self):
+        """Create the registry table if needed"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS ingestion_state (
+                    doc_id TEXT PRIMARY KEY,
+                    url TEXT,
+                    local_path TEXT,
+                    checksum TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    chunk_count INTEGER DEFAULT 0,
+                    embedding_model TEXT,
+                    last_ingested TEXT,
+                    last_checked TEXT
+                )
+            ''')
+            # Article headings found in each document's text, for query suggestions
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS document_headings (
+                    doc_id TEXT PRIMARY KEY,
+                    headings TEXT NOT NULL
+                )
+            ''')
+            conn.commit()
+            conn.close()
+
+    def _row_to_state(self, row: sqlite3.Row) -> Dict[str, Any]:
+        state = dict(row)
+        for field in self.TIMESTAMP_FIELDS:
+            if state.get(field):
+                state[field] = datetime.fromisoformat(state[field])
+        return state
+
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Get the stored state for a document, if any"""
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute("SELECT * FROM ingestion_state WHERE doc_id = ?", (doc_id,)).fetchone()
+                conn.close()
+            return self._row_to_state(row) if row else None
+        except Exception as e:
+            logger.error(f"Error reading ingestion state for {doc_id}: {str(e)}")
+            return None
+
+    def all(self) -> Dict[str, Dict[str, Any]]:
+        """Get the stored state for every document"""
+        try:
+            with self._lock:
+                conn = self._connect()
+                rows = conn.execute("SELECT * FROM ingestion_state").fetchall()
+                conn.close()
+            return {row["doc_id"]: self._row_to_state(row) for row in rows}
+        except Exception as e:
+            logger.error(f"Error reading ingestion registry: {str(e)}")
+            return {}
+
+    def upsert(self, doc_id: str, **fields):
+        """Insert or update the given fields for a document"""
+        unknown = set(fields) - set(self.FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown ingestion registry fields: {', '.join(sorted(unknown))}")
+
+        values = {}
+        for key, value in fields.items():
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            values[key] = value
+
+        columns = ["doc_id"] + list(values)
+        placeholders = ", ".join("?" for _ in columns)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in values)
+        sql = f"INSERT INTO ingestion_state ({', '.join(columns)}) VALUES ({placeholders})"
+        sql += f" ON CONFLICT(doc_id) DO UPDATE SET {updates}" if updates else " ON CONFLICT(doc_id) DO NOTHING"
+
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(sql, [doc_id] + list(values.values()))
+                conn.commit()
+                conn.close()
+        except Exception as e:
+            logger.error(f"Error writing ingestion state for {doc_id}: {str(e)}")
+
+    def mark_checked(self, doc_id: str):
+        """Record that a document was checked against its source without changes"""
+        self.upsert(doc_id, last_checked=datetime.now(timezone.utc))
+
+    def set_headings(self, doc_id: str, headings: List[str]):
+        """Store the article headings extracted from a document (an empty list means none were found)"""
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT INTO document_headings (doc_id, headings) VALUES (?, ?) "
+                    "ON CONFLICT(doc_id) DO UPDATE SET headings = excluded.headings",
+                    (doc_id, json.dumps(headings, ensure_ascii=False))
+                )
+                conn.commit()
+                conn.close()
+        except Exception as e:
+            logger.error(f"Error writing headings for {doc_id}: {str(e)}")
+
+    def all_headings(self) -> Dict[str, List[str]]:
+        """Headings per document, for documents whose headings have been extracted"""
+        try:
+            with self._lock:
+                conn = self._connect()
+                rows = conn.execute("SELECT doc_id, headings FROM document_headings").fetchall()
+                conn.close()
+            return {row["doc_id"]: json.loads(row["headings"]) for row in rows}
+        except Exception as e:
+            logger.error(f"Error reading document headings: {str(e)}")
+            return {}
+
+    def delete(self, doc_id: str):
+        """Forget a document"""
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("DELETE FROM ingestion_state WHERE doc_id = ?", (doc_id,))
+                conn.execute("DELETE FROM document_headings WHERE doc_id = ?", (doc_id,))
+                conn.commit()
+                conn.close()
+        except Exception as e:
+            logger.error(f"Error deleting ingestion state for {doc_id}: {str(e)}")
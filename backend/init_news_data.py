@@ -29,7 +29,10 @@ async def init_real_news_data():
         # Clear existing news
         await db.news_items.delete_many({})
         print("   Cleared existing news items")
-        
+
+        # One document per news URL, also if the server's collection runs at the same time
+        await db.news_items.create_index("id", unique=True)
+
         # Initialize news service
         news_service = NewsService(client)
         
@@ -0,0 +1,267 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Dict, Any, Optional, Tuple, AsyncIterator
+from emergentintegrations.llm.chat import LlmChat, UserMessage
+from context_packer import count_tokens
+from llm_scheduler import LLMScheduler, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND, PRIORITY_BATCH
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+class LLMClient:
+    """Shared client for one (provider, model) pair
+
+    ``LlmChat`` objects carry the conversation of a single session, so a fresh one
+    is built per call; what is shared is the pooled HTTP transport and the usage
+    counters. Admission (concurrency and rate limits) is decided by the pool's
+    scheduler.
+
+    Streamed answers go to litellm directly (``LlmChat`` only returns whole
+    answers), over the same pooled transport. That needs an OpenAI-compatible
+    endpoint that accepts ``api_key`` (``LLM_API_BASE``); without one, answers
+    are completed through ``LlmChat`` and yielded in one piece, so the key is
+    never sent to the provider's public endpoint.
+    """
+
+    def __init__(self, provider: str, model: str, api_key: Optional[str], api_base: Optional[str] = None):
+        self.provider = provider
+        self.model = model
+        self.api_key = api_key
+        self.api_base = api_base
+        self.calls = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.streams = 0
+        self.stream_fallbacks = 0
+        self.total_first_token_latency = 0.0
+
+    async def complete(self, prompt: str, system_message: str, session_id: str) -> str:
+        """Send a single prompt and return the answer text"""
+        started = time.monotonic()
+        try:
+            chat = LlmChat(
+                api_key=self.api_key,
+                session_id=session_id,
+                system_message=system_message
+            ).with_model(self.provider, self.model)
+            return await chat.send_message(UserMessage(text=prompt))
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.calls += 1
+            self.total_latency += time.monotonic() - started
+
+    async def stream(self, prompt: str, system_message: str, session_id: str) -> AsyncIterator[str]:
+        """Send a single prompt and yield the answer text as the model produces it
+        
+        Without a streaming endpoint, or if the backend refuses to stream, the
+        answer is fetched with ``complete`` and yielded in one piece.
+        """
+        if not self.api_base:
+            yield await self.complete(prompt, system_message, session_id)
+            return
+        started = time.monotonic()
+        response = None
+        received = False
+        try:
+            import litellm
+            response = await litellm.acompletion(
+                model=f"{self.provider}/{self.model}",
+                messages=[
+                    {"role": "system", "content": system_message},
+                    {"role": "user", "content": prompt}
+                ],
+                api_key=self.api_key,
+                api_base=self.api_base,
+                stream=True
+            )
+            async for chunk in response:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                if not received:
+                    received = True
+                    self.streams += 1
+                    self.total_first_token_latency += time.monotonic() - started
+                yield delta
+            return
+        except Exception as e:
+            if received:
+                self.errors += 1
+                raise
+            error = e
+        finally:
+            if response is not None:
+                self.calls += 1
+                self.total_latency += time.monotonic() - started
+
+        logger.warning(f"Streaming from {self.provider}/{self.model} failed, answering in one piece: {str(error)}")
+        self.stream_fallbacks += 1
+        yield await self.complete(prompt, system_message, session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_latency_seconds": round(self.total_latency / self.calls, 3) if self.calls else None,
+            "streams": self.streams,
+            "stream_fallbacks": self.stream_fallbacks,
+            "avg_first_token_seconds": round(self.total_first_token_latency / self.streams, 3) if self.streams else None
+        }
+
+class LLMClientPool:
+    """Process-wide registry of LLM clients, one per (provider, model)
+
+    All calls run on the application's event loop, where a single keep-alive
+    HTTP connection pool is installed for the LLM backend. Calls made from
+    scheduler threads with their own loops are handed over to that loop. Every
+    call goes through the shared LLMScheduler with a priority class, so chat
+    users are served before news, admin and batch work.
+    """
+
+    def __init__(self, api_key: Optional[str], max_connections: int = 20, max_keepalive_connections: int = 10,
+                 keepalive_expiry: float = 60.0, scheduler: Optional[LLMScheduler] = None,
+                 api_base: Optional[str] = None):
+        self.api_key = api_key
+        self.api_base = api_base
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.scheduler = scheduler or LLMScheduler()
+        self._clients: Dict[Tuple[str, str], LLMClient] = {}
+        self._clients_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._http_client = None
+
+    def attach(self, loop: asyncio.AbstractEventLoop):
+        """Bind the pool to the application event loop and install the shared HTTP connection pool"""
+        self._loop = loop
+        self._loop_thread = threading.current_thread()
+        try:
+            import httpx
+            import litellm
+            # emergentintegrations sends requests through litellm, which reuses this client
+            self._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry
+                ),
+                timeout=httpx.Timeout(120.0, connect=10.0)
+            )
+            litellm.aclient_session = self._http_client
+            logger.info(f"LLM connection pool ready (max {self.max_connections} connections, "
+                        f"{self.max_keepalive_connections} keep-alive)")
+        except Exception as e:
+            logger.warning(f"Could not install shared LLM HTTP client: {str(e)}")
+
+    async def close(self):
+        """Close pooled connections"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+    def client(self, provider: str, model: str) -> LLMClient:
+        """Get the shared client for a provider/model, creating it on first use"""
+        key = (provider, model)
+        with self._clients_lock:
+            if key not in self._clients:
+                self._clients[key] = LLMClient(provider, model, self.api_key, self.api_base)
+            return self._clients[key]
+
+    def _on_home_loop(self) -> bool:
+        try:
+            return self._loop is None or asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    async def _scheduled(self, provider: str, model: str, prompt: str, system_message: str, session_id: str,
+                         priority: int, fairness_key: Optional[str]) -> str:
+        await self.scheduler.acquire(
+            priority,
+            tokens=count_tokens(system_message) + count_tokens(prompt),
+            fairness_key=fairness_key or session_id
+        )
+        answer = None
+        try:
+            answer = await self.client(provider, model).complete(prompt, system_message, session_id)
+            return answer
+        finally:
+            self.scheduler.release(count_tokens(answer) if answer else 0)
+
+    async def complete(self, provider: str, model: str, prompt: str, system_message: str, session_id: str,
+                       priority: int = PRIORITY_INTERACTIVE, fairness_key: Optional[str] = None) -> str:
+        """Complete a prompt with the shared client for the given model
+        
+        ``priority`` is one of PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND or
+        PRIORITY_BATCH; ``fairness_key`` groups calls that take turns within a
+        class (defaults to the session id).
+        """
+        coro = self._scheduled(provider, model, prompt, system_message, session_id, priority, fairness_key)
+        if self._on_home_loop():
+            return await coro
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        return await asyncio.wrap_future(future)
+
+    async def stream(self, provider: str, model: str, prompt: str, system_message: str, session_id: str,
+                     priority: int = PRIORITY_INTERACTIVE, fairness_key: Optional[str] = None) -> AsyncIterator[str]:
+        """Like ``complete``, yielding the answer as it is generated
+        
+        The scheduler slot is held until the stream ends or is closed. Off the
+        application loop the answer is completed there and yielded in one piece.
+        """
+        if not self._on_home_loop():
+            yield await self.complete(provider, model, prompt, system_message, session_id, priority, fairness_key)
+            return
+        await self.scheduler.acquire(
+            priority,
+            tokens=count_tokens(system_message) + count_tokens(prompt),
+            fairness_key=fairness_key or session_id
+        )
+        parts = []
+        deltas = self.client(provider, model).stream(prompt, system_message, session_id)
+        try:
+            async for delta in deltas:
+                parts.append(delta)
+                yield delta
+        finally:
+            await deltas.aclose()
+            self.scheduler.release(count_tokens("".join(parts)) if parts else 0)
+
+    def complete_sync(self, provider: str, model: str, prompt: str, system_message: str, session_id: str,
+                      priority: int = PRIORITY_BACKGROUND, fairness_key: Optional[str] = None,
+                      timeout: float = 180.0) -> str:
+        """Blocking variant for code running in worker threads"""
+        coro = self._scheduled(provider, model, prompt, system_message, session_id, priority, fairness_key)
+        if self._loop is None or not self._loop.is_running():
+            return asyncio.run(coro)
+        if threading.current_thread() is self._loop_thread:
+            coro.close()
+            raise RuntimeError("complete_sync cannot block the event loop thread; use complete() instead")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Usage per provider/model"""
+        return {f"{provider}/{model}": client.stats() for (provider, model), client in self._clients.items()}
+
+llm_pool = LLMClientPool(
+    api_key=os.getenv('EMERGENT_LLM_KEY'),
+    max_connections=int(os.getenv('LLM_MAX_CONNECTIONS', '20')),
+    max_keepalive_connections=int(os.getenv('LLM_MAX_KEEPALIVE_CONNECTIONS', '10')),
+    keepalive_expiry=float(os.getenv('LLM_KEEPALIVE_EXPIRY_SECONDS', '60')),
+    # OpenAI-compatible endpoint for streamed answers; unset means no token streaming
+    api_base=os.getenv('LLM_API_BASE') or None,
+    scheduler=LLMScheduler(
+        max_concurrency=int(os.getenv('LLM_MAX_CONCURRENCY', '16')),
+        requests_per_minute=int(os.getenv('LLM_REQUESTS_PER_MINUTE', '0')),
+        tokens_per_minute=int(os.getenv('LLM_TOKENS_PER_MINUTE', '0')),
+        reserved_interactive=int(os.getenv('LLM_RESERVED_INTERACTIVE_SLOTS', '4'))
+    )
+)
@@ -0,0 +1,190 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Dict, Any, Optional, Deque, Tuple
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+PRIORITY_BATCH = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_BACKGROUND: "background",
+    PRIORITY_BATCH: "batch"
+}
+
+class _Waiter:
+    __slots__ = ("future", "tokens", "enqueued_at")
+
+    def __init__(self, future: asyncio.Future, tokens: int):
+        self.future = future
+        self.tokens = tokens
+        self.enqueued_at = time.monotonic()
+
+class LLMScheduler:
+    """Process-wide admission control for LLM calls
+
+    Every call asks for a slot with a priority class and a fairness key (the
+    session, job or service it belongs to). Slots are granted under a global
+    budget of concurrent calls, requests per minute and tokens per minute:
+
+    - a waiting interactive call is always admitted before any background or
+      batch call, and ``reserved_interactive`` slots are never given to the
+      lower classes, so a news run or batch job cannot starve live users
+    - within a class, fairness keys take turns (round robin), so one large job
+      does not delay every other caller of the same class
+    - queue time is recorded per class
+    """
+
+    def __init__(self, max_concurrency: int = 16, requests_per_minute: int = 0, tokens_per_minute: int = 0,
+                 reserved_interactive: int = 4):
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.reserved_interactive = min(reserved_interactive, max_concurrency - 1)
+        self._queues: Dict[int, "OrderedDict[str, Deque[_Waiter]]"] = {p: OrderedDict() for p in PRIORITY_NAMES}
+        self._running = 0
+        self._requests: Deque[float] = deque()
+        self._tokens: Deque[Tuple[float, int]] = deque()
+        self._tokens_in_window = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._metrics = {
+            p: {"admitted": 0, "cancelled": 0, "queue_times": deque(maxlen=1000), "max_queue_time": 0.0}
+            for p in PRIORITY_NAMES
+        }
+
+    def _limit_for(self, priority: int) -> int:
+        if priority == PRIORITY_INTERACTIVE:
+            return self.max_concurrency
+        return self.max_concurrency - self.reserved_interactive
+
+    def _expire_window(self, now: float):
+        while self._requests and now - self._requests[0] >= 60:
+            self._requests.popleft()
+        while self._tokens and now - self._tokens[0][0] >= 60:
+            self._tokens_in_window -= self._tokens.popleft()[1]
+
+    def _rate_wait(self, tokens: int, now: float) -> float:
+        """Seconds until the rate budget allows another call of this size (0 if it does now)"""
+        wait = 0.0
+        if self.requests_per_minute and len(self._requests) >= self.requests_per_minute:
+            wait = max(wait, 60 - (now - self._requests[0]))
+        if self.tokens_per_minute and self._tokens and self._tokens_in_window + tokens > self.tokens_per_minute:
+            # Free tokens from the oldest calls until this one fits (a single call larger
+            # than the whole budget is admitted once the window is empty)
+            excess = self._tokens_in_window + tokens - self.tokens_per_minute
+            for timestamp, spent in self._tokens:
+                excess -= spent
+                if excess <= 0:
+                    wait = max(wait, 60 - (now - timestamp))
+                    break
+        return wait
+
+    def _record_tokens(self, tokens: int, now: float):
+        if tokens:
+            self._tokens.append((now, tokens))
+            self._tokens_in_window += tokens
+
+    def _next_waiter(self, priority: int) -> Optional[Tuple[str, _Waiter]]:
+        queue = self._queues[priority]
+        while queue:
+            key, waiters = next(iter(queue.items()))
+            waiter = waiters[0]
+            if waiter.future.done():
+                # Caller went away while queued
+                waiters.popleft()
+                if not waiters:
+                    del queue[key]
+                continue
+            return key, waiter
+        return None
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        self._expire_window(now)
+        for priority in sorted(self._queues):
+            while True:
+                head = self._next_waiter(priority)
+                if head is None:
+                    break
+                if self._running >= self._limit_for(priority):
+                    # Lower classes have an even lower limit
+                    return
+                wait = self._rate_wait(head[1].tokens, now)
+                if wait > 0:
+                    # The rate budget is global: nothing else may go first
+                    self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                    return
+
+                key, waiter = head
+                queue = self._queues[priority]
+                waiters = queue.pop(key)
+                waiters.popleft()
+                if waiters:
+                    # Round robin: this key goes to the back of its class
+                    queue[key] = waiters
+
+                self._running += 1
+                self._requests.append(now)
+                self._record_tokens(waiter.tokens, now)
+                queue_time = now - waiter.enqueued_at
+                metrics = self._metrics[priority]
+                metrics["admitted"] += 1
+                metrics["queue_times"].append(queue_time)
+                metrics["max_queue_time"] = max(metrics["max_queue_time"], queue_time)
+                waiter.future.set_result(None)
+            if self._queues[priority]:
+                return
+
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE, tokens: int = 0, fairness_key: str = "default"):
+        """Wait for a slot; must be paired with ``release``"""
+        future = asyncio.get_running_loop().create_future()
+        self._queues[priority].setdefault(fairness_key, deque()).append(_Waiter(future, tokens))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just as the caller was cancelled: give the slot back
+                self.release()
+            else:
+                self._metrics[priority]["cancelled"] += 1
+            raise
+
+    def release(self, completion_tokens: int = 0):
+        """Free a slot, accounting for the tokens the answer used"""
+        self._running -= 1
+        self._record_tokens(completion_tokens, time.monotonic())
+        self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        self._expire_window(now)
+        classes = {}
+        for priority, name in PRIORITY_NAMES.items():
+            metrics = self._metrics[priority]
+            queue_times = sorted(metrics["queue_times"])
+            classes[name] = {
+                "queued": sum(len(waiters) for waiters in self._queues[priority].values()),
+                "admitted": metrics["admitted"],
+                "cancelled_while_queued": metrics["cancelled"],
+                "p50_queue_seconds": round(queue_times[len(queue_times) // 2], 3) if queue_times else None,
+                "p95_queue_seconds": round(queue_times[min(len(queue_times) - 1, int(len(queue_times) * 0.95))], 3) if queue_times else None,
+                "max_queue_seconds": round(metrics["max_queue_time"], 3)
+            }
+        return {
+            "running": self._running,
+            "max_concurrency": self.max_concurrency,
+            "reserved_interactive": self.reserved_interactive,
+            "requests_last_minute": len(self._requests),
+            "requests_per_minute_limit": self.requests_per_minute or None,
+            "tokens_last_minute": self._tokens_in_window,
+            "tokens_per_minute_limit": self.tokens_per_minute or None,
+            "classes": classes
+        }
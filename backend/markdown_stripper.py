@@ -0,0 +1,170 @@
+import re
+
+# Inline rules, applied to each line in this order (same patterns as the old regex cleanup)
+_BOLD = re.compile(r"\*\*(.+?)\*\*")
+_ITALIC = re.compile(r"\*(.+?)\*")
+_CODE = re.compile(r"`(.+?)`")
+_LINK = re.compile(r"\[(.+?)\]\(.+?\)")
+# Characters that can start an inline rule; text before the first one in a line is final
+_MARKER = re.compile(r"[*`\[]")
+
+class MarkdownStripper:
+    """Incremental markdown-to-plain-text normalizer for AI answers
+
+    Works on arbitrary chunks of text, e.g. tokens as they arrive from a model:
+    ``feed`` returns the plain text that is final so far and ``flush`` returns
+    the rest. A line that can no longer become a header, list item or fence is
+    released up to its first ``*``, backtick or ``[`` before it is complete, so
+    plain prose streams word by word. Each line is normalized as soon as it is complete, with the rules
+    of the old regex cleanup:
+
+    - ``#`` headers keep only their text; a header with no text takes the next
+      non-blank line as its text, and a bare ``#`` at the very end is kept
+    - ``**bold**``, ``*italic*`` and ``inline code`` keep only their content
+    - ``[text](url)`` links keep only their text
+    - fenced code blocks are dropped; a fence that is never closed is kept as
+      ordinary text, so its lines are held back until the fence closes or the
+      input ends
+    - ``- item`` lists are renumbered ``1.``, ``2.``...; the count restarts after
+      any non-empty line that is not a list item
+    - leading and trailing whitespace of the whole answer is removed
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._in_code_block = False
+        self._code_lines = []
+        self._header = None
+        self._list_counter = 1
+        self._started = False
+        self._pending = ""
+        self._lines = 0
+        self._partial = 0
+
+    def _process_line(self, line: str, fences: bool = True):
+        """Normalize one complete line; returns None when the line is dropped or held back"""
+        if self._header is not None:
+            # A header without text: blank lines are skipped until its text shows up
+            if not line.strip():
+                self._header += "\n" + line
+                return None
+            self._header = None
+            return self._finish_line(line.lstrip())
+
+        if fences and line.lstrip().startswith("```"):
+            if self._in_code_block:
+                self._code_lines = []
+            else:
+                self._code_lines = [line]
+            self._in_code_block = not self._in_code_block
+            return None
+        if self._in_code_block:
+            self._code_lines.append(line)
+            return None
+
+        # Headers
+        if line.startswith("#"):
+            level = len(line) - len(line.lstrip("#"))
+            if level > 6:
+                line = line[6:]
+            elif line[level:].strip():
+                line = line[level:].lstrip()
+            else:
+                self._header = line[level:]
+                return None
+        return self._finish_line(line)
+
+    def _finish_line(self, line: str) -> str:
+        # Most lines have no markup, so each rule only runs when its marker is present
+        if "*" in line:
+            line = _ITALIC.sub(r"\1", _BOLD.sub(r"\1", line))
+
+        # Dash lists become numbered lists
+        if line.startswith("-") and len(line) > 2 and line[1].isspace():
+            line = f"{self._list_counter}. {line[1:].lstrip() or line[-1]}"
+            self._list_counter += 1
+        elif line.strip():
+            self._list_counter = 1
+
+        if "`" in line:
+            line = _CODE.sub(r"\1", line)
+        if "[" in line:
+            line = _LINK.sub(r"\1", line)
+        return line
+
+    def _write(self, text: str) -> str:
+        # Whitespace after the last visible character is held back until more
+        # content arrives, so the answer never ends with blank lines or spaces
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self._started = True
+        text = self._pending + text
+        body = text.rstrip()
+        self._pending = text[len(body):]
+        return body
+
+    def _start_line(self, text: str) -> str:
+        separator = "\n" if self._lines else ""
+        self._lines += 1
+        return self._write(separator + text)
+
+    def _complete(self, line: str, fences: bool = True) -> str:
+        processed = self._process_line(line, fences)
+        partial, self._partial = self._partial, 0
+        if processed is None:
+            return ""
+        if partial:
+            # The start of the line went out already and the rules never change it
+            return self._write(processed[partial:])
+        return self._start_line(processed)
+
+    def _release_partial(self) -> str:
+        line = self._buffer
+        if self._in_code_block or self._header is not None or line[:1] in ("#", "-"):
+            return ""
+        marker = _MARKER.search(line, self._partial)
+        end = marker.start() if marker else len(line)
+        if end <= self._partial or not line[:end].strip():
+            return ""
+        text = self._write(line[self._partial:end]) if self._partial else self._start_line(line[:end])
+        self._partial = end
+        return text
+
+    def feed(self, chunk: str) -> str:
+        """Add a chunk of markdown and return newly completed plain text"""
+        self._buffer += chunk
+        out = []
+        if "\n" in chunk:
+            *lines, self._buffer = self._buffer.split("\n")
+            for line in lines:
+                out.append(self._complete(line))
+        out.append(self._release_partial())
+        return "".join(out)
+
+    def flush(self) -> str:
+        """Return whatever is left once the input is complete"""
+        line, self._buffer = self._buffer, ""
+        out = [self._complete(line) if line else ""]
+
+        if self._in_code_block:
+            # Never closed: not a code block after all
+            lines, self._code_lines = self._code_lines, []
+            self._in_code_block = False
+            for index, line in enumerate(lines):
+                out.append(self._complete(line, fences=index > 0))
+        if self._header is not None:
+            # An empty header with nothing after it stays a "#", unless it was followed by spaces
+            if not self._header.replace("\n", ""):
+                out.append(self._start_line("#"))
+            self._header = None
+        self._pending = ""
+        return "".join(out)
+
+def strip_markdown(text: str) -> str:
+    """Normalize a complete answer in one call"""
+    if not text:
+        return text
+    stripper = MarkdownStripper()
+    return stripper.feed(text) + stripper.flush()
@@ -0,0 +1,197 @@
+import os
+import re
+import time
+import logging
+from collections import deque
+from threading import Lock
+from typing import List, Dict, Any, Optional, Tuple
+from category_router import normalize_text, keyword_categories
+from context_packer import count_tokens, split_sentences
+
+logger = logging.getLogger(__name__)
+
+EXTRACTIVE = "extractive"
+STANDARD = "standard"
+COMPLEX = "complex"
+
+# USD per million (input, output) tokens, used for cost estimates only
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-5": (1.25, 10.00)
+}
+
+# "What is X" style questions, matched against the normalized text
+DEFINITION_PATTERN = re.compile(
+    r"^(?:que es|que son|que significa|que se entiende por|a que se refiere|define|definicion de|"
+    r"what is|what are|what does .+ mean)\s+(?:el |la |los |las |un |una |an? |the )?(?P<term>.+?)\??$"
+)
+
+# Cues of questions that need reasoning across several rules or scenarios
+REASONING_PATTERN = re.compile(
+    r"\b(?:compar\w*|diferencia\w*|relacion entre|interaccion|ambos|ambas|a la vez|simultaneamente|"
+    r"ademas de|conflicto|prevalece|compatible|como afecta|que pasa si|en que casos|estrategia|"
+    r"plan de cumplimiento|difference|compare|versus|vs|interplay|both)\b"
+)
+
+STOPWORDS = {
+    "de", "del", "la", "el", "los", "las", "un", "una", "y", "o", "en", "para", "por", "con", "que",
+    "a", "al", "se", "su", "sus", "the", "of", "and", "or", "in", "for", "to", "an", "is"
+}
+
+def _terms(text: str) -> List[str]:
+    return [word for word in re.findall(r"\w+", normalize_text(text)) if word not in STOPWORDS and len(word) > 2]
+
+class ModelRouter:
+    """Chooses how much model a chat turn or summary needs
+
+    - extractive: short definitional questions whose answer is a sentence of the
+      best retrieved passage; answered from the passage without an LLM call
+    - standard: the default chat model
+    - complex: questions spanning several regulations or asking for comparison
+      and reasoning; sent to the stronger model
+
+    Latency and estimated cost are recorded per task and tier so the thresholds
+    can be tuned from real traffic.
+    """
+
+    def __init__(self, standard_model: str = "gpt-4o-mini", complex_model: str = "gpt-4o",
+                 extractive_min_score: float = 0.55, extractive_max_words: int = 12,
+                 extractive_min_overlap: float = 0.6, complex_min_categories: int = 2,
+                 news_complex_model: str = "gpt-5", news_complex_relevance: float = 6.0):
+        self.standard_model = standard_model
+        self.complex_model = complex_model
+        self.extractive_min_score = extractive_min_score
+        self.extractive_max_words = extractive_max_words
+        self.extractive_min_overlap = extractive_min_overlap
+        self.complex_min_categories = complex_min_categories
+        self.news_complex_model = news_complex_model
+        self.news_complex_relevance = news_complex_relevance
+        self._metrics: Dict[str, Dict[str, Any]] = {}
+        self._lock = Lock()
+
+    def model_for(self, tier: str) -> Optional[str]:
+        if tier == COMPLEX:
+            return self.complex_model
+        if tier == STANDARD:
+            return self.standard_model
+        return None
+
+    def classify(self, message: str, candidates: List[Dict[str, Any]], history: str = "") -> Tuple[str, str]:
+        """Pick the tier for a chat question; returns (tier, reason)"""
+        normalized = normalize_text(message)
+        matched_categories = keyword_categories(message)
+        if len(matched_categories) >= self.complex_min_categories:
+            return COMPLEX, f"spans {', '.join(sorted(matched_categories))}"
+        if REASONING_PATTERN.search(normalized) and len(normalized.split()) > self.extractive_max_words:
+            return COMPLEX, "reasoning question"
+
+        # Follow-ups depend on the conversation, which an extract cannot take into account
+        if not history.strip() and candidates and DEFINITION_PATTERN.match(normalized.strip(" ¿?")):
+            if len(normalized.split()) <= self.extractive_max_words:
+                top_score = candidates[0].get("score") or 0.0
+                if top_score >= self.extractive_min_score:
+                    return EXTRACTIVE, f"definition (top score {top_score:.2f})"
+
+        return STANDARD, "default"
+
+    def extract_answer(self, message: str, candidates: List[Dict[str, Any]]) -> Optional[str]:
+        """Answer a definitional question with the best matching sentences of the top passage"""
+        match = DEFINITION_PATTERN.match(normalize_text(message).strip(" ¿?"))
+        if not match or not candidates:
+            return None
+        terms = set(_terms(match.group("term")))
+        if not terms:
+            return None
+
+        top = candidates[0]
+        sentences = split_sentences(top.get("content", ""))
+        best_index, best_overlap = None, 0.0
+        for index, sentence in enumerate(sentences):
+            overlap = len(terms & set(_terms(sentence))) / len(terms)
+            if overlap > best_overlap:
+                best_index, best_overlap = index, overlap
+        if best_index is None or best_overlap < self.extractive_min_overlap:
+            return None
+
+        excerpt = " ".join(sentences[best_index:best_index + 2])
+        title = top.get("metadata", {}).get("title", "la documentación")
+        return f"Según {title}: {excerpt}"
+
+    def news_model(self, relevance_score: float) -> Tuple[str, str]:
+        """Model for a news summary: the strong one only for highly relevant items"""
+        if relevance_score >= self.news_complex_relevance:
+            return COMPLEX, self.news_complex_model
+        return STANDARD, self.standard_model
+
+    @staticmethod
+    def estimate_cost(model: Optional[str], prompt_tokens: int, completion_tokens: int) -> float:
+        prices = MODEL_PRICES.get(model or "")
+        if not prices:
+            return 0.0
+        return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+
+    def record(self, task: str, tier: str, model: Optional[str], latency: float,
+               prompt_tokens: int = 0, completion_tokens: int = 0):
+        """Record one routed request"""
+        key = f"{task}/{tier}"
+        with self._lock:
+            metrics = self._metrics.setdefault(key, {
+                "model": model,
+                "calls": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "cost_usd": 0.0,
+                "latencies": deque(maxlen=500)
+            })
+            metrics["model"] = model
+            metrics["calls"] += 1
+            metrics["prompt_tokens"] += prompt_tokens
+            metrics["completion_tokens"] += completion_tokens
+            metrics["cost_usd"] += self.estimate_cost(model, prompt_tokens, completion_tokens)
+            metrics["latencies"].append(latency)
+
+    def average_completion_tokens(self, task: str, tier: str) -> int:
+        """Typical answer length for a task/tier, 0 until something was recorded"""
+        with self._lock:
+            metrics = self._metrics.get(f"{task}/{tier}")
+            if not metrics or not metrics["calls"]:
+                return 0
+            return metrics["completion_tokens"] // metrics["calls"]
+
+    async def timed(self, task: str, tier: str, model: Optional[str], prompt: str, call) -> str:
+        """Await an LLM call and record its latency, tokens and cost"""
+        started = time.monotonic()
+        answer = await call
+        self.record(task, tier, model, time.monotonic() - started,
+                    count_tokens(prompt), count_tokens(answer))
+        return answer
+
+    def stats(self) -> Dict[str, Any]:
+        """Per task/tier calls, latency percentiles and estimated cost"""
+        with self._lock:
+            result = {}
+            for key, metrics in self._metrics.items():
+                latencies = sorted(metrics["latencies"])
+                result[key] = {
+                    "model": metrics["model"],
+                    "calls": metrics["calls"],
+                    "prompt_tokens": metrics["prompt_tokens"],
+                    "completion_tokens": metrics["completion_tokens"],
+                    "estimated_cost_usd": round(metrics["cost_usd"], 6),
+                    "p50_latency_seconds": round(latencies[len(latencies) // 2], 3) if latencies else None,
+                    "p95_latency_seconds": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3) if latencies else None
+                }
+            return result
+
+model_router = ModelRouter(
+    standard_model=os.getenv('MODEL_ROUTER_STANDARD_MODEL', 'gpt-4o-mini'),
+    complex_model=os.getenv('MODEL_ROUTER_COMPLEX_MODEL', 'gpt-4o'),
+    extractive_min_score=float(os.getenv('MODEL_ROUTER_EXTRACTIVE_MIN_SCORE', '0.55')),
+    extractive_max_words=int(os.getenv('MODEL_ROUTER_EXTRACTIVE_MAX_WORDS', '12')),
+    extractive_min_overlap=float(os.getenv('MODEL_ROUTER_EXTRACTIVE_MIN_OVERLAP', '0.6')),
+    complex_min_categories=int(os.getenv('MODEL_ROUTER_COMPLEX_MIN_CATEGORIES', '2')),
+    news_complex_model=os.getenv('MODEL_ROUTER_NEWS_COMPLEX_MODEL', 'gpt-5'),
+    news_complex_relevance=float(os.getenv('MODEL_ROUTER_NEWS_COMPLEX_RELEVANCE', '6'))
+)
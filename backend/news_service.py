@@ -1,5 +1,4 @@
 import os
-import requests
 import asyncio
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timezone, timedelta
@@ -9,24 +8,92 @@ from urllib.parse import urljoin, urlparse
 import hashlib
 import schedule
 import time
+import aiohttp
+from contextlib import asynccontextmanager
 from threading import Thread
 from motor.motor_asyncio import AsyncIOMotorClient
-from emergentintegrations.llm.chat import LlmChat, UserMessage
+from pymongo.errors import BulkWriteError
+from llm_client import llm_pool, PRIORITY_BACKGROUND
+from model_router import model_router
+from document_manager import document_manager
 from dotenv import load_dotenv
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+DUPLICATE_KEY_ERROR = 11000
+
+class NewsFetcher:
+    """One HTTP session shared by every scraper of a collection run
+    
+    At most ``concurrency`` requests are in flight; each request's timeout
+    starts once it gets its turn, so waiting for a slot does not count against
+    the source's timeout. Failed fetches are logged and skipped.
+    """
+    
+    def __init__(self, concurrency: int = 8, connect_timeout: float = 10):
+        self.concurrency = concurrency
+        self.connect_timeout = connect_timeout
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.fetches = 0
+        self.failures = 0
+        self.slowest = 0.0
+    
+    async def __aenter__(self) -> "NewsFetcher":
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self.session = aiohttp.ClientSession(
+            headers={'User-Agent': 'Mozilla/5.0 (compatible; ComplianceNewsBot/1.0)'},
+            connector=aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300)
+        )
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+    
+    async def fetch(self, url: str, timeout: float, headers: Optional[Dict[str, str]] = None) -> Optional[bytes]:
+        """Body of a page, or None if it failed or took longer than ``timeout`` seconds"""
+        async with self._semaphore:
+            started = time.monotonic()
+            self.fetches += 1
+            try:
+                async with self.session.get(
+                    url,
+                    headers=headers,
+                    timeout=aiohttp.ClientTimeout(total=timeout, connect=min(self.connect_timeout, timeout))
+                ) as response:
+                    if response.status != 200:
+                        self.failures += 1
+                        logger.warning(f"Got HTTP {response.status} from {url}")
+                        return None
+                    return await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.failures += 1
+                logger.warning(f"Error fetching {url}: {str(e) or type(e).__name__}")
+                return None
+            finally:
+                self.slowest = max(self.slowest, time.monotonic() - started)
+    
+    async def fetch_all(self, urls: List[str], timeout: float,
+                        headers: Optional[Dict[str, str]] = None) -> List[tuple]:
+        """(url, body) for every page that could be fetched, all requested concurrently"""
+        bodies = await asyncio.gather(*(self.fetch(url, timeout, headers) for url in urls))
+        return [(url, body) for url, body in zip(urls, bodies) if body is not None]
+
 class NewsService:
     def __init__(self, db_client: AsyncIOMotorClient):
         self.db = db_client[os.environ['DB_NAME']]
         self.emergent_key = os.getenv('EMERGENT_LLM_KEY')
         
-        # News sources for regulatory updates
+        # Pages fetched at the same time during a collection run
+        self.fetch_concurrency = int(os.getenv('NEWS_FETCH_CONCURRENCY', '8'))
+        
+        # News sources for regulatory updates (timeout: seconds allowed per page)
         self.news_sources = {
             "EUR_LEX": {
                 "name": "EUR-Lex",
+                "timeout": float(os.getenv('NEWS_EUR_LEX_TIMEOUT', '30')),
                 "base_url": "https://eur-lex.europa.eu",
                 "search_params": {
                     "artificial intelligence": "inteligencia artificial",
@@ -37,6 +104,7 @@ class NewsService:
             },
             "BOE": {
                 "name": "Boletín Oficial del Estado",
+                "timeout": float(os.getenv('NEWS_BOE_TIMEOUT', '30')),
                 "base_url": "https://www.boe.es",
                 "search_params": {
                     "inteligencia artificial": "artificial intelligence",
@@ -47,17 +115,69 @@ class NewsService:
             },
             "AEMPS": {
                 "name": "Agencia Española de Medicamentos",
+                "timeout": float(os.getenv('NEWS_AEMPS_TIMEOUT', '30')),
                 "base_url": "https://www.aemps.gob.es",
                 "topics": ["dispositivos médicos", "IA médica", "regulación sanitaria"]
             },
             "DGSFP": {
                 "name": "Dirección General de Seguros",
+                "timeout": float(os.getenv('NEWS_DGSFP_TIMEOUT', '30')),
                 "base_url": "https://www.dgsfp.mineco.gob.es",
                 "topics": ["seguros", "insurtech", "normativa seguros"]
             }
         }
     
-    async def scrape_eur_lex_news(self) -> List[Dict[str, Any]]:
+    @asynccontextmanager
+    async def _fetcher(self, fetcher: Optional["NewsFetcher"]):
+        """Use the run's shared fetcher, or open one for a single scraper call"""
+        if fetcher is not None:
+            yield fetcher
+            return
+        async with NewsFetcher(self.fetch_concurrency) as own_fetcher:
+            yield own_fetcher
+    
+    def _parse_eur_lex(self, content: bytes) -> List[Dict[str, Any]]:
+        news_items = []
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        # Look for actual legislation items
+        results = soup.find_all('div', class_='SearchResult')[:3]  # Top 3 per search
+        
+        for result in results:
+            try:
+                title_elem = result.find('a', class_='title')
+                if not title_elem:
+                    continue
+                
+                title = title_elem.get_text(strip=True)
+                link = urljoin("https://eur-lex.europa.eu", title_elem.get('href', ''))
+                
+                # Get date if available
+                date_elem = result.find('span', class_='date')
+                date_str = date_elem.get_text(strip=True) if date_elem else None
+                
+                # Get summary
+                summary_elem = result.find('div', class_='summary')
+                summary = summary_elem.get_text(strip=True)[:300] if summary_elem else ""
+                
+                news_items.append({
+                    "title": title,
+                    "url": link,
+                    "summary": summary,
+                    "source": "EUR-Lex",
+                    "category": "regulation",
+                    "date_str": date_str,
+                    "language": "en",
+                    "scraped_from": "official_source"
+                })
+                
+            except Exception as e:
+                logger.warning(f"Error parsing EUR-Lex result: {str(e)}")
+                continue
+        
+        return news_items
+    
+    async def scrape_eur_lex_news(self, fetcher: Optional["NewsFetcher"] = None) -> List[Dict[str, Any]]:
         """Scrape real news from EUR-Lex"""
         news_items = []
         try:
@@ -68,52 +188,12 @@ class NewsService:
                 "https://eur-lex.europa.eu/search.html?scope=EURLEX&text=medical%20devices%20AI&lang=en&type=quick"
             ]
             
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (compatible; ComplianceNewsBot/1.0)'
-            }
+            async with self._fetcher(fetcher) as fetcher:
+                pages = await fetcher.fetch_all(search_urls, self.news_sources["EUR_LEX"]["timeout"])
             
-            for search_url in search_urls:
+            for search_url, content in pages:
                 try:
-                    response = requests.get(search_url, headers=headers, timeout=30)
-                    response.raise_for_status()
-                    
-                    soup = BeautifulSoup(response.content, 'html.parser')
-                    
-                    # Look for actual legislation items
-                    results = soup.find_all('div', class_='SearchResult')[:3]  # Top 3 per search
-                    
-                    for result in results:
-                        try:
-                            title_elem = result.find('a', class_='title')
-                            if not title_elem:
-                                continue
-                            
-                            title = title_elem.get_text(strip=True)
-                            link = urljoin("https://eur-lex.europa.eu", title_elem.get('href', ''))
-                            
-                            # Get date if available
-                            date_elem = result.find('span', class_='date')
-                            date_str = date_elem.get_text(strip=True) if date_elem else None
-                            
-                            # Get summary
-                            summary_elem = result.find('div', class_='summary')
-                            summary = summary_elem.get_text(strip=True)[:300] if summary_elem else ""
-                            
-                            news_items.append({
-                                "title": title,
-                                "url": link,
-                                "summary": summary,
-                                "source": "EUR-Lex",
-                                "category": "regulation",
-                                "date_str": date_str,
-                                "language": "en",
-                                "scraped_from": "official_source"
-                            })
-                            
-                        except Exception as e:
-                            logger.warning(f"Error parsing EUR-Lex result: {str(e)}")
-                            continue
-                
+                    news_items.extend(await asyncio.to_thread(self._parse_eur_lex, content))
                 except Exception as e:
                     logger.warning(f"Error with search URL {search_url}: {str(e)}")
                     continue
@@ -125,7 +205,53 @@ class NewsService:
         
         return news_items
     
-    async def scrape_boe_news(self) -> List[Dict[str, Any]]:
+    def _parse_boe(self, content: bytes, term: str) -> List[Dict[str, Any]]:
+        news_items = []
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        # Look for recent documents in BOE structure
+        results = soup.find_all('div', class_='resultado_busqueda')[:2]  # Top 2 per term
+        
+        for result in results:
+            try:
+                title_elem = result.find('h3')
+                if not title_elem:
+                    continue
+                
+                link_elem = title_elem.find('a')
+                if not link_elem:
+                    continue
+                
+                title = link_elem.get_text(strip=True)
+                link = urljoin("https://www.boe.es", link_elem.get('href', ''))
+                
+                # Get summary/description
+                summary_elem = result.find('p')
+                summary = summary_elem.get_text(strip=True)[:300] if summary_elem else ""
+                
+                # Extract date from BOE format if available
+                date_elem = result.find('span', class_='fecha')
+                date_str = date_elem.get_text(strip=True) if date_elem else None
+                
+                news_items.append({
+                    "title": title,
+                    "url": link,
+                    "summary": summary,
+                    "source": "BOE",
+                    "category": "regulation",
+                    "search_term": term,
+                    "language": "es",
+                    "date_str": date_str,
+                    "scraped_from": "official_source"
+                })
+                
+            except Exception as e:
+                logger.warning(f"Error parsing BOE result: {str(e)}")
+                continue
+        
+        return news_items
+    
+    async def scrape_boe_news(self, fetcher: Optional["NewsFetcher"] = None) -> List[Dict[str, Any]]:
         """Scrape real news from BOE (Boletín Oficial del Estado)"""
         news_items = []
         try:
@@ -138,62 +264,19 @@ class NewsService:
                 "telemedicina"
             ]
             
-            for term in search_terms:
+            # Real BOE search URL
+            search_urls = {f"https://www.boe.es/buscar/doc.php?texto={term.replace(' ', '+')}": term for term in search_terms}
+            
+            async with self._fetcher(fetcher) as fetcher:
+                pages = await fetcher.fetch_all(
+                    list(search_urls), self.news_sources["BOE"]["timeout"],
+                    headers={'Accept-Language': 'es-ES,es;q=0.9'}
+                )
+            
+            for search_url, content in pages:
+                term = search_urls[search_url]
                 try:
-                    # Real BOE search URL
-                    search_url = f"https://www.boe.es/buscar/doc.php?texto={term.replace(' ', '+')}"
-                    
-                    headers = {
-                        'User-Agent': 'Mozilla/5.0 (compatible; ComplianceNewsBot/1.0)',
-                        'Accept-Language': 'es-ES,es;q=0.9'
-                    }
-                    
-                    response = requests.get(search_url, headers=headers, timeout=30)
-                    if response.status_code != 200:
-                        continue
-                    
-                    soup = BeautifulSoup(response.content, 'html.parser')
-                    
-                    # Look for recent documents in BOE structure
-                    results = soup.find_all('div', class_='resultado_busqueda')[:2]  # Top 2 per term
-                    
-                    for result in results:
-                        try:
-                            title_elem = result.find('h3')
-                            if not title_elem:
-                                continue
-                            
-                            link_elem = title_elem.find('a')
-                            if not link_elem:
-                                continue
-                            
-                            title = link_elem.get_text(strip=True)
-                            link = urljoin("https://www.boe.es", link_elem.get('href', ''))
-                            
-                            # Get summary/description
-                            summary_elem = result.find('p')
-                            summary = summary_elem.get_text(strip=True)[:300] if summary_elem else ""
-                            
-                            # Extract date from BOE format if available
-                            date_elem = result.find('span', class_='fecha')
-                            date_str = date_elem.get_text(strip=True) if date_elem else None
-                            
-                            news_items.append({
-                                "title": title,
-                                "url": link,
-                                "summary": summary,
-                                "source": "BOE",
-                                "category": "regulation",
-                                "search_term": term,
-                                "language": "es",
-                                "date_str": date_str,
-                                "scraped_from": "official_source"
-                            })
-                            
-                        except Exception as e:
-                            logger.warning(f"Error parsing BOE result: {str(e)}")
-                            continue
-                
+                    news_items.extend(await asyncio.to_thread(self._parse_boe, content, term))
                 except Exception as e:
                     logger.warning(f"Error with BOE search term {term}: {str(e)}")
                     continue
@@ -205,7 +288,60 @@ class NewsService:
         
         return news_items
     
-    async def scrape_aemps_news(self) -> List[Dict[str, Any]]:
+    def _parse_aemps(self, content: bytes, url: str) -> List[Dict[str, Any]]:
+        news_items = []
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        # Look for news items, updates, or announcements
+        # AEMPS typically has news in article or list formats
+        articles = soup.find_all(['article', 'div'], class_=['noticia', 'news-item', 'listado-item'])[:3]
+        
+        for article in articles:
+            try:
+                # Find title
+                title_elem = article.find(['h2', 'h3', 'h4', 'a'])
+                if not title_elem:
+                    continue
+                
+                title = title_elem.get_text(strip=True)
+                
+                # Find link
+                link_elem = article.find('a')
+                if link_elem:
+                    link = urljoin("https://www.aemps.gob.es", link_elem.get('href', ''))
+                else:
+                    link = url
+                
+                # Find summary/content
+                summary_elem = article.find(['p', 'div'], class_=['resumen', 'summary', 'content'])
+                summary = summary_elem.get_text(strip=True)[:300] if summary_elem else title[:200]
+                
+                # Find date
+                date_elem = article.find(['span', 'time', 'div'], class_=['fecha', 'date'])
+                date_str = date_elem.get_text(strip=True) if date_elem else None
+                
+                # Filter for AI/tech related content
+                if any(keyword in title.lower() or keyword in summary.lower() 
+                      for keyword in ['inteligencia artificial', 'digital', 'software', 'algoritmo', 'tecnolog']):
+                    
+                    news_items.append({
+                        "title": title,
+                        "url": link,
+                        "summary": summary,
+                        "source": "AEMPS",
+                        "category": "regulation",
+                        "language": "es",
+                        "date_str": date_str,
+                        "scraped_from": "official_source"
+                    })
+                
+            except Exception as e:
+                logger.warning(f"Error parsing AEMPS article: {str(e)}")
+                continue
+        
+        return news_items
+    
+    async def scrape_aemps_news(self, fetcher: Optional["NewsFetcher"] = None) -> List[Dict[str, Any]]:
         """Scrape real news from AEMPS (Spanish Medicines Agency)"""
         news_items = []
         try:
@@ -216,65 +352,15 @@ class NewsService:
                 "https://www.aemps.gob.es/informa/novedades/"
             ]
             
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (compatible; ComplianceNewsBot/1.0)',
-                'Accept-Language': 'es-ES,es;q=0.9'
-            }
+            async with self._fetcher(fetcher) as fetcher:
+                pages = await fetcher.fetch_all(
+                    aemps_urls, self.news_sources["AEMPS"]["timeout"],
+                    headers={'Accept-Language': 'es-ES,es;q=0.9'}
+                )
             
-            for url in aemps_urls:
+            for url, content in pages:
                 try:
-                    response = requests.get(url, headers=headers, timeout=30)
-                    response.raise_for_status()
-                    
-                    soup = BeautifulSoup(response.content, 'html.parser')
-                    
-                    # Look for news items, updates, or announcements
-                    # AEMPS typically has news in article or list formats
-                    articles = soup.find_all(['article', 'div'], class_=['noticia', 'news-item', 'listado-item'])[:3]
-                    
-                    for article in articles:
-                        try:
-                            # Find title
-                            title_elem = article.find(['h2', 'h3', 'h4', 'a'])
-                            if not title_elem:
-                                continue
-                            
-                            title = title_elem.get_text(strip=True)
-                            
-                            # Find link
-                            link_elem = article.find('a')
-                            if link_elem:
-                                link = urljoin("https://www.aemps.gob.es", link_elem.get('href', ''))
-                            else:
-                                link = url
-                            
-                            # Find summary/content
-                            summary_elem = article.find(['p', 'div'], class_=['resumen', 'summary', 'content'])
-                            summary = summary_elem.get_text(strip=True)[:300] if summary_elem else title[:200]
-                            
-                            # Find date
-                            date_elem = article.find(['span', 'time', 'div'], class_=['fecha', 'date'])
-                            date_str = date_elem.get_text(strip=True) if date_elem else None
-                            
-                            # Filter for AI/tech related content
-                            if any(keyword in title.lower() or keyword in summary.lower() 
-                                  for keyword in ['inteligencia artificial', 'digital', 'software', 'algoritmo', 'tecnolog']):
-                                
-                                news_items.append({
-                                    "title": title,
-                                    "url": link,
-                                    "summary": summary,
-                                    "source": "AEMPS",
-                                    "category": "regulation",
-                                    "language": "es",
-                                    "date_str": date_str,
-                                    "scraped_from": "official_source"
-                                })
-                            
-                        except Exception as e:
-                            logger.warning(f"Error parsing AEMPS article: {str(e)}")
-                            continue
-                
+                    news_items.extend(await asyncio.to_thread(self._parse_aemps, content, url))
                 except Exception as e:
                     logger.warning(f"Error with AEMPS URL {url}: {str(e)}")
                     continue
@@ -286,14 +372,13 @@ class NewsService:
         
         return news_items
     
-    async def generate_news_summary(self, news_item: Dict[str, Any]) -> str:
+    async def generate_news_summary(self, news_item: Dict[str, Any], relevance_score: Optional[float] = None) -> str:
         """Generate AI summary for news item"""
         try:
-            chat = LlmChat(
-                api_key=self.emergent_key,
-                session_id=f"news_summary_{hashlib.md5(news_item['url'].encode()).hexdigest()}",
-                system_message="Eres un asistente especializado en resumir noticias normativas para startups de salud digital e insurtech. Crea resúmenes concisos y relevantes."
-            ).with_model("openai", "gpt-5")
+            if relevance_score is None:
+                relevance_score = self.calculate_relevance_score(news_item)
+            # The strongest model only for highly relevant items
+            tier, model = model_router.news_model(relevance_score)
             
             prompt = f"""
 Título: {news_item['title']}
@@ -308,8 +393,18 @@ Genera un resumen de 2-3 frases que explique:
 Responde en español y sé conciso pero informativo.
 """
             
-            user_message = UserMessage(text=prompt)
-            ai_summary = await chat.send_message(user_message)
+            system_message = "Eres un asistente especializado en resumir noticias normativas para startups de salud digital e insurtech. Crea resúmenes concisos y relevantes."
+            ai_summary = await model_router.timed(
+                "news_summary", tier, model, system_message + prompt,
+                llm_pool.complete(
+                    "openai", model,
+                    prompt=prompt,
+                    system_message=system_message,
+                    session_id=f"news_summary_{hashlib.md5(news_item['url'].encode()).hexdigest()}",
+                    priority=PRIORITY_BACKGROUND,
+                    fairness_key="news"
+                )
+            )
             
             return ai_summary
             
@@ -318,40 +413,90 @@ Responde en español y sé conciso pero informativo.
             return news_item.get('summary', 'Resumen no disponible')
     
     async def process_and_save_news(self, news_items: List[Dict[str, Any]]):
-        """Process news items and save to database"""
+        """Process news items and save to database
+        
+        Known items are filtered out with one ``$in`` query and the new ones are
+        written with one unordered insert_many. The unique index on ``id`` makes
+        overlapping runs harmless: an item the other run saved first is skipped.
+        """
+        # Generate unique ID based on URL (a URL found by two searches is processed once)
+        items_by_id = {}
         for item in news_items:
             try:
-                # Generate unique ID based on URL
-                item_id = hashlib.md5(item['url'].encode()).hexdigest()
-                
-                # Check if already exists
-                existing = await self.db.news_items.find_one({"id": item_id})
-                if existing:
-                    continue
-                
-                # Generate AI summary
-                ai_summary = await self.generate_news_summary(item)
-                
-                # Create news item
-                news_item = {
-                    "id": item_id,
-                    "title": item['title'],
-                    "url": item['url'],
-                    "summary": item.get('summary', ''),
-                    "ai_summary": ai_summary,
-                    "source": item['source'],
-                    "category": item.get('category', 'regulation'),
-                    "language": item.get('language', 'es'),
-                    "scraped_at": datetime.now(timezone.utc),
-                    "relevance_score": self.calculate_relevance_score(item),
-                    "tags": self.extract_tags(item)
-                }
-                
-                await self.db.news_items.insert_one(news_item)
-                logger.info(f"Saved news item: {item['title'][:50]}...")
-                
+                items_by_id.setdefault(hashlib.md5(item['url'].encode()).hexdigest(), item)
             except Exception as e:
                 logger.error(f"Error processing news item: {str(e)}")
+        if not items_by_id:
+            return
+        
+        # Check which already exist
+        try:
+            existing = {
+                doc["id"] async for doc in self.db.news_items.find(
+                    {"id": {"$in": list(items_by_id)}},
+                    {"_id": 0, "id": 1}
+                )
+            }
+        except Exception as e:
+            logger.error(f"Error checking existing news items: {str(e)}")
+            return
+        new_items = {item_id: item for item_id, item in items_by_id.items() if item_id not in existing}
+        if not new_items:
+            logger.info(f"No new news items ({len(existing)} already saved)")
+            return
+        
+        async def build(item_id: str, item: Dict[str, Any]) -> Dict[str, Any]:
+            # Generate AI summary
+            relevance_score = self.calculate_relevance_score(item)
+            ai_summary = await self.generate_news_summary(item, relevance_score)
+            
+            # Create news item
+            return {
+                "id": item_id,
+                "title": item['title'],
+                "url": item['url'],
+                "summary": item.get('summary', ''),
+                "ai_summary": ai_summary,
+                "source": item['source'],
+                "category": item.get('category', 'regulation'),
+                "language": item.get('language', 'es'),
+                "scraped_at": datetime.now(timezone.utc),
+                "relevance_score": relevance_score,
+                "tags": self.extract_tags(item)
+            }
+        
+        # Summaries are queued on the LLM scheduler as background work
+        built = await asyncio.gather(*(build(item_id, item) for item_id, item in new_items.items()), return_exceptions=True)
+        documents = []
+        for document in built:
+            if isinstance(document, Exception):
+                logger.error(f"Error processing news item: {str(document)}")
+            else:
+                documents.append(document)
+        if not documents:
+            return
+        
+        saved = documents
+        try:
+            await self.db.news_items.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            failed = {error["index"] for error in e.details.get("writeErrors", [])}
+            unexpected = [error for error in e.details.get("writeErrors", []) if error.get("code") != DUPLICATE_KEY_ERROR]
+            for error in unexpected:
+                logger.error(f"Error saving news item: {error.get('errmsg')}")
+            saved = [document for index, document in enumerate(documents) if index not in failed]
+            logger.info(f"{len(failed) - len(unexpected)} news items were saved by another run")
+        except Exception as e:
+            logger.error(f"Error saving news items: {str(e)}")
+            return
+        
+        for news_item in saved:
+            logger.info(f"Saved news item: {news_item['title'][:50]}...")
+        # Make them available to chat retrieval right away, embedded in one batch off the event loop
+        try:
+            await asyncio.to_thread(document_manager.index_news_items, saved)
+        except Exception as e:
+            logger.error(f"Error indexing {len(saved)} news items: {str(e)}")
     
     def calculate_relevance_score(self, item: Dict[str, Any]) -> float:
         """Calculate relevance score for news item"""
@@ -404,18 +549,25 @@ Responde en español y sé conciso pero informativo.
         logger.info("Starting real news collection from official sources")
         
         all_news = []
+        started = time.monotonic()
         
-        # Collect from EUR-Lex (real)
-        eur_lex_news = await self.scrape_eur_lex_news()
-        all_news.extend(eur_lex_news)
-        
-        # Collect from BOE (real)
-        boe_news = await self.scrape_boe_news()
-        all_news.extend(boe_news)
-        
-        # Collect from AEMPS (real)
-        aemps_news = await self.scrape_aemps_news()
-        all_news.extend(aemps_news)
+        # EUR-Lex, BOE and AEMPS (real) at the same time, over one HTTP session
+        async with NewsFetcher(self.fetch_concurrency) as fetcher:
+            results = await asyncio.gather(
+                self.scrape_eur_lex_news(fetcher),
+                self.scrape_boe_news(fetcher),
+                self.scrape_aemps_news(fetcher),
+                return_exceptions=True
+            )
+        for source, result in zip(["EUR-Lex", "BOE", "AEMPS"], results):
+            if isinstance(result, Exception):
+                logger.error(f"Error collecting news from {source}: {str(result)}")
+                continue
+            all_news.extend(result)
+        logger.info(
+            f"Fetched {fetcher.fetches} pages in {time.monotonic() - started:.1f}s "
+            f"(slowest {fetcher.slowest:.1f}s, {fetcher.failures} failed)"
+        )
         
         # Process and save all real news
         await self.process_and_save_news(all_news)
@@ -0,0 +1,41 @@
+import json
+import base64
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+
+def encode_cursor(timestamp: datetime, item_id: str) -> str:
+    """Opaque keyset cursor for the (timestamp, id) position of an item"""
+    raw = json.dumps([timestamp.isoformat(), item_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, item_id = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        return datetime.fromisoformat(timestamp), item_id
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+def before_filter(field: str, cursor: Optional[str]) -> Dict[str, Any]:
+    """Mongo filter for the items strictly before a cursor in (field, id) order"""
+    if not cursor:
+        return {}
+    timestamp, item_id = decode_cursor(cursor)
+    return {"$or": [
+        {field: {"$lt": timestamp}},
+        {field: timestamp, "id": {"$lt": item_id}}
+    ]}
+
+def page_before(items: List[Dict[str, Any]], field: str, limit: int,
+                cursor: Optional[str]) -> List[Dict[str, Any]]:
+    """In-memory equivalent of a before_filter query sorted newest first with limit + 1
+
+    ``items`` must be in (field, id) order, oldest first.
+    """
+    if cursor:
+        position = decode_cursor(cursor)
+        items = [item for item in items if (item[field], item["id"]) < position]
+    page = items[-(limit + 1):]
+    page.reverse()
+    return page
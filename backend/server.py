@@ -1,9 +1,12 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, UploadFile, File, Form, Request, Response, WebSocket
+from fastapi.responses import StreamingResponse, FileResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import json
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
@@ -16,7 +19,13 @@ from passlib.context import CryptContext
 
 # Import our new services
 from document_manager import document_manager, initialize_documents, start_scheduler
+from folder_watcher import create_drop_folder_watcher
+from llm_client import llm_pool
 from chat_service import ChatService
+from chat_socket import ChatSocketHub
+from batch_qa import BatchQAManager
+from answer_cache import answer_cache
+from model_router import model_router
 from news_service import NewsService, start_news_scheduler
 from admin_service import admin_service
 from icu_vesos_service import get_icu_vesos_service, VESOSInput, VESOSResult
@@ -42,6 +51,20 @@ api_router = APIRouter(prefix="/api")
 # Initialize services
 chat_service = ChatService(client)
 news_service = NewsService(client)
+drop_folder_watcher = create_drop_folder_watcher(document_manager)
+chat_socket_hub = ChatSocketHub(
+    chat_service,
+    authenticate=lambda token: authenticate_token(token),
+    max_active_turns=int(os.getenv('CHAT_WS_MAX_ACTIVE_TURNS', '4'))
+)
+batch_qa_manager = BatchQAManager(
+    chat_service,
+    Path(os.getenv('BATCH_QA_DIR', str(ROOT_DIR / "batch_qa"))),
+    concurrency=int(os.getenv('BATCH_QA_CONCURRENCY', '8')),
+    max_retries=int(os.getenv('BATCH_QA_MAX_RETRIES', '3'))
+)
+# Highest concurrency a batch QA upload may ask for
+BATCH_QA_MAX_CONCURRENCY = int(os.getenv('BATCH_QA_MAX_CONCURRENCY', '32'))
 
 # Models
 class User(BaseModel):
@@ -154,8 +177,12 @@ def create_access_token(data: dict):
     return encoded_jwt
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return await authenticate_token(credentials.credentials)
+
+async def authenticate_token(token: str) -> User:
+    """Resolve a bearer token to its user (raises HTTPException 401)"""
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
@@ -393,28 +420,92 @@ async def create_chat_session(session_data: ChatSessionCreate, current_user: Use
     return {"session_id": session_id}
 
 @api_router.get("/chat/sessions")
-async def get_chat_sessions(current_user: User = Depends(get_current_user)):
-    sessions = await chat_service.get_chat_sessions(current_user.id)
-    return {"sessions": sessions}
+async def get_chat_sessions(
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    try:
+        return await chat_service.get_chat_sessions(current_user.id, limit=limit, before=before)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @api_router.get("/chat/sessions/{session_id}/messages")
-async def get_chat_messages(session_id: str, current_user: User = Depends(get_current_user)):
-    messages = await chat_service.get_chat_messages(session_id, current_user.id)
-    return {"messages": messages}
+async def get_chat_messages(
+    session_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    try:
+        return await chat_service.get_chat_messages(session_id, current_user.id, limit=limit, before=before)
+    except ValueError as e:
+        status_code = 400 if "cursor" in str(e) else 404
+        raise HTTPException(status_code=status_code, detail=str(e))
+
+DISCONNECT_POLL_SECONDS = float(os.getenv('CHAT_DISCONNECT_POLL_SECONDS', '0.5'))
+
+async def run_while_connected(request: Request, coro):
+    """Run a request's work, cancelling it if the client disconnects first
+    
+    Returns None when the client went away. With the "complete" disconnect
+    policy the work is left to finish (and be saved) in the background.
+    """
+    task = asyncio.ensure_future(coro)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+        if done:
+            return task.result()
+        if await request.is_disconnected():
+            break
+    
+    if chat_service.disconnect_policy == "complete":
+        chat_service.finish_in_background(task)
+    else:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    return None
 
 @api_router.post("/chat/sessions/{session_id}/messages")
-async def send_chat_message(session_id: str, message_data: ChatMessageCreate, current_user: User = Depends(get_current_user)):
+async def send_chat_message(session_id: str, message_data: ChatMessageCreate, request: Request,
+                            current_user: User = Depends(get_current_user)):
     try:
-        response = await chat_service.generate_response(
+        response = await run_while_connected(request, chat_service.generate_response(
             session_id=session_id,
             user_id=current_user.id,
             message=message_data.message,
             category=message_data.category
-        )
+        ))
+        if response is None:
+            # Nobody is listening any more (nginx's "client closed request")
+            return Response(status_code=499)
         return response
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
+@api_router.post("/chat/sessions/{session_id}/messages/stream")
+async def stream_chat_message(session_id: str, message_data: ChatMessageCreate, current_user: User = Depends(get_current_user)):
+    """Same as sending a message, but streams sources and answer chunks as Server-Sent Events"""
+    try:
+        await chat_service.verify_session(session_id, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    async def event_stream():
+        async for event in chat_service.stream_response(
+            session_id=session_id,
+            user_id=current_user.id,
+            message=message_data.message,
+            category=message_data.category
+        ):
+            yield f"event: {event['event']}\ndata: {json.dumps(event['data'], default=str, ensure_ascii=False)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @api_router.delete("/chat/sessions/{session_id}")
 async def delete_chat_session(session_id: str, current_user: User = Depends(get_current_user)):
     try:
@@ -423,15 +514,52 @@ async def delete_chat_session(session_id: str, current_user: User = Depends(get_
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
+@api_router.get("/chat/suggest")
+async def suggest_questions(
+    q: str,
+    limit: int = Query(8, ge=1, le=16),
+    current_user: User = Depends(get_current_user)
+):
+    """Popular questions and article titles starting with what the user has typed"""
+    return {"suggestions": chat_service.suggestions.suggest(q, limit)}
+
+@api_router.get("/chat/suggest/stats")
+async def get_suggestion_stats(current_user: User = Depends(get_current_user)):
+    return chat_service.suggestions.stats()
+
+@api_router.websocket("/chat/ws")
+async def chat_websocket(websocket: WebSocket):
+    """Chat over one WebSocket: authenticated once, any number of sessions (see ChatConnection)"""
+    await chat_socket_hub.serve(websocket)
+
+@api_router.get("/chat/ws/stats")
+async def get_chat_websocket_stats(current_user: User = Depends(get_current_user)):
+    return chat_socket_hub.stats()
+
 @api_router.get("/chat/stats")
 async def get_chat_stats(current_user: User = Depends(get_current_user)):
     stats = await chat_service.get_chat_statistics(current_user.id)
     return stats
 
+@api_router.get("/chat/cache/stats")
+async def get_answer_cache_stats(current_user: User = Depends(get_current_user)):
+    return {**answer_cache.stats(), "session_retrieval": chat_service.session_retrieval.stats()}
+
+@api_router.get("/chat/routing/stats")
+async def get_model_routing_stats(current_user: User = Depends(get_current_user)):
+    """Calls, latency and estimated cost per task and model tier"""
+    return {
+        "tiers": model_router.stats(),
+        "models": llm_pool.stats(),
+        "scheduler": llm_pool.scheduler.stats(),
+        "cancellations": chat_service.cancellation_stats()
+    }
+
 # Document endpoints
 @api_router.get("/documents/search")
-async def search_documents(query: str, category: Optional[str] = None, k: int = 5):
-    results = document_manager.search_documents(query, k=k, category_filter=category)
+async def search_documents(query: str, category: Optional[str] = None, k: int = 5, sources: Optional[str] = None):
+    source_list = [source.strip() for source in sources.split(",") if source.strip()] if sources else None
+    results = document_manager.search_documents(query, k=k, category_filter=category, sources=source_list)
     return {"results": results}
 
 @api_router.get("/documents/categories")
@@ -509,6 +637,16 @@ logger = logging.getLogger(__name__)
 # ADMIN ROUTES
 # =============================================================================
 
+async def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
+    """Exigir un token de administrador (emitido por /api/admin/login)"""
+    try:
+        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+    if payload.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    return payload
+
 @app.post("/api/admin/login")
 async def admin_login(credentials: AdminLogin):
     """Autenticación de administrador"""
@@ -565,7 +703,8 @@ async def admin_dashboard():
 async def manual_update(request: AdminUpdateRequest):
     """Ejecutar actualización manual"""
     try:
-        result = admin_service.manual_update(request.update_type)
+        # Run in a worker thread: the update blocks on scraping and LLM summaries
+        result = await asyncio.to_thread(admin_service.manual_update, request.update_type)
         return {
             "message": "Manual update completed",
             "result": result
@@ -594,6 +733,66 @@ async def get_documents_admin(limit: int = 100, category: str = None):
         logger.error(f"Get admin documents error: {str(e)}")
         raise HTTPException(status_code=500, detail="Error retrieving documents")
 
+@app.post("/api/admin/batch-qa")
+async def create_batch_qa_job(
+    file: UploadFile = File(...),
+    category: Optional[str] = Form(None),
+    concurrency: Optional[int] = Form(None, ge=1, le=BATCH_QA_MAX_CONCURRENCY),
+    admin: Dict[str, Any] = Depends(get_current_admin)
+):
+    """Responder en lote un fichero de preguntas (una por línea o NDJSON)"""
+    questions = await file.read()
+    if not questions.strip():
+        raise HTTPException(status_code=400, detail="Empty questions file")
+    job = batch_qa_manager.create_job(questions, category, concurrency)
+    return job.progress()
+
+@app.get("/api/admin/batch-qa/{job_id}")
+async def get_batch_qa_job(job_id: str, admin: Dict[str, Any] = Depends(get_current_admin)):
+    """Estado de un trabajo de preguntas en lote"""
+    try:
+        job = await asyncio.to_thread(batch_qa_manager.get_job, job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if not job:
+        raise HTTPException(status_code=404, detail="Batch QA job not found")
+    return job.progress()
+
+@app.post("/api/admin/batch-qa/{job_id}/resume")
+async def resume_batch_qa_job(job_id: str, admin: Dict[str, Any] = Depends(get_current_admin)):
+    """Reanudar un trabajo desde su checkpoint"""
+    try:
+        return batch_qa_manager.resume_job(job_id).progress()
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/api/admin/batch-qa/{job_id}/results")
+async def get_batch_qa_results(job_id: str, admin: Dict[str, Any] = Depends(get_current_admin)):
+    """Descargar los resultados (NDJSON) de un trabajo"""
+    try:
+        results_path = batch_qa_manager.results_path(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if not results_path.exists():
+        raise HTTPException(status_code=404, detail="No results yet")
+    return FileResponse(results_path, media_type="application/x-ndjson", filename=f"batch_qa_{job_id}.ndjson")
+
+@app.get("/api/admin/chat-archive")
+async def get_chat_archive_stats(admin: Dict[str, Any] = Depends(get_current_admin)):
+    """Estado del archivado de sesiones de chat inactivas"""
+    archived_sessions = await db.chat_archives.count_documents({})
+    return {**chat_service.archive.stats(), "archived_sessions_total": archived_sessions}
+
+@app.post("/api/admin/chat-archive/run")
+async def run_chat_archive(limit: Optional[int] = None, admin: Dict[str, Any] = Depends(get_current_admin)):
+    """Archivar ahora las sesiones inactivas"""
+    try:
+        result = await chat_service.archive.archive_idle(limit)
+        return {**result, "stats": chat_service.archive.stats()}
+    except Exception as e:
+        logger.error(f"Chat archive error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Chat archival failed")
+
 # =============================================================================
 # REPOSITORY ROUTES (Para usuarios finales)
 # =============================================================================
@@ -899,12 +1098,30 @@ async def startup_event():
     """Initialize services on startup"""
     logger.info("Starting AI Compliance SaaS...")
     
+    # Share LLM clients and connections across chat, news and admin services
+    llm_pool.attach(asyncio.get_running_loop())
+    
     # Initialize documents
     await initialize_documents()
     
     # Start document update scheduler
     start_scheduler()
     
+    # Watch docs/normativas and docs/updates for locally added regulations
+    drop_folder_watcher.start()
+    
+    # Background writer for chat turns (when CHAT_WRITE_BEHIND is enabled)
+    chat_service.persistence.start()
+    
+    # Periodically repair drift in the per-user chat counters
+    chat_service.stats.start()
+    
+    # Move idle chat sessions to compressed archives
+    chat_service.archive.start()
+    
+    # Build the type-ahead index from chat history and article headings
+    chat_service.suggestions.start()
+    
     # Start news update scheduler
     start_news_scheduler()
     
@@ -919,14 +1136,41 @@ async def startup_event():
     # Create database indexes
     try:
         await db.news_items.create_index([("title", "text"), ("summary", "text")])
-        await db.chat_messages.create_index([("session_id", 1), ("created_at", 1)])
-        await db.chat_sessions.create_index([("user_id", 1), ("updated_at", -1)])
+        # id is the keyset tie-breaker for history and session pagination
+        await db.chat_messages.create_index([("session_id", 1), ("created_at", 1), ("id", 1)])
+        await db.chat_sessions.create_index([("user_id", 1), ("updated_at", -1), ("id", -1)])
+        await db.chat_messages.create_index([("user_id", 1), ("role", 1)])
+        await db.chat_user_stats.create_index("user_id", unique=True)
+        await db.chat_sessions.create_index([("updated_at", 1)])
+        await db.chat_archives.create_index("session_id", unique=True)
+        await db.chat_archives.create_index("user_id")
         logger.info("Database indexes created")
     except Exception as e:
         logger.warning(f"Error creating indexes: {str(e)}")
     
+    # One document per news URL, so overlapping collection runs cannot duplicate items
+    try:
+        await db.news_items.create_index("id", unique=True)
+    except Exception as e:
+        logger.warning(f"Error creating unique news id index (duplicate ids already stored?): {str(e)}")
+    
+    # Index news and repository summaries saved while the indexer was unavailable
+    try:
+        news_items = await db.news_items.find({}, {"_id": 0}).to_list(None)
+        repository_documents = admin_service.get_documents_metadata(10000)
+        await asyncio.to_thread(document_manager.sync_update_index, news_items, repository_documents)
+    except Exception as e:
+        logger.warning(f"Error syncing update index: {str(e)}")
+    
     logger.info("AI Compliance SaaS initialized successfully")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await drop_folder_watcher.stop()
+    await batch_qa_manager.stop()
+    await chat_service.persistence.stop()
+    await chat_service.stats.stop()
+    await chat_service.archive.stop()
+    await chat_service.suggestions.stop()
+    await llm_pool.close()
     client.close()
\ No newline at end of file
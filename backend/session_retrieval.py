@@ -0,0 +1,123 @@
+import os
+import time
+import logging
+from collections import OrderedDict
+from threading import Lock
+from typing import List, Dict, Any, Optional, Callable
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class SessionRetrievalCache:
+    """Keeps the last retrieval of each chat session for follow-up questions
+
+    After a full search, the session's candidate pool (passages plus their
+    vectors) is kept. A follow-up in the same session, category and index
+    generation is re-ranked against that pool first; only when the best local
+    score is under ``min_score`` does the caller fall back to a full search,
+    which then replaces the pool.
+    """
+
+    def __init__(self, score_fn: Callable[[float, Dict[str, Any]], float], min_score: float = 0.45,
+                 pool_size: int = 12, ttl_seconds: float = 3600, max_sessions: int = 5000):
+        self.score_fn = score_fn
+        self.min_score = min_score
+        self.pool_size = pool_size
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = {"cold": 0, "stale": 0, "low_score": 0}
+        self.local_seconds = 0.0
+        self.full_searches = 0
+        self.full_seconds = 0.0
+
+    def _category_key(self, category) -> Optional[tuple]:
+        if category is None:
+            return None
+        if isinstance(category, (list, tuple, set)):
+            return tuple(sorted(category))
+        return (category,)
+
+    def lookup(self, session_id: str, category, generation: int, query_embedding: List[float],
+               k: int = 5) -> Optional[List[Dict[str, Any]]]:
+        """Re-rank the session's last candidates for this query, or None if a full search is needed"""
+        started = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                self.misses["cold"] += 1
+                return None
+            if (entry["category"] != self._category_key(category) or entry["generation"] != generation
+                    or time.monotonic() - entry["stored"] > self.ttl_seconds):
+                del self._sessions[session_id]
+                self.misses["stale"] += 1
+                return None
+            self._sessions.move_to_end(session_id)
+
+        # Same squared L2 distance Chroma uses, so scores are comparable with a full search
+        query = np.asarray(query_embedding, dtype=np.float32)
+        distances = np.sum((entry["vectors"] - query) ** 2, axis=1)
+        ranked = sorted(
+            (
+                {**doc, "score": self.score_fn(float(distance), doc["metadata"])}
+                for doc, distance in zip(entry["documents"], distances)
+            ),
+            key=lambda doc: doc["score"],
+            reverse=True
+        )[:k]
+
+        if not ranked or ranked[0]["score"] < self.min_score:
+            self.misses["low_score"] += 1
+            return None
+        self.hits += 1
+        self.local_seconds += time.monotonic() - started
+        return ranked
+
+    def store(self, session_id: str, category, generation: int, results: List[Dict[str, Any]]):
+        """Keep a full search's results (with their ``embedding``) as the session's pool"""
+        pool = [doc for doc in results if doc.get("embedding") is not None][:self.pool_size]
+        if not pool:
+            return
+        entry = {
+            "category": self._category_key(category),
+            "generation": generation,
+            "documents": [{key: value for key, value in doc.items() if key != "embedding"} for doc in pool],
+            "vectors": np.asarray([doc["embedding"] for doc in pool], dtype=np.float32),
+            "stored": time.monotonic()
+        }
+        with self._lock:
+            self._sessions[session_id] = entry
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def forget(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def record_full_search(self, seconds: float):
+        self.full_searches += 1
+        self.full_seconds += seconds
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + sum(self.misses.values())
+        return {
+            "sessions": len(self._sessions),
+            "hits": self.hits,
+            "misses": dict(self.misses),
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "avg_local_rerank_ms": round(self.local_seconds / self.hits * 1000, 2) if self.hits else None,
+            "avg_full_search_ms": round(self.full_seconds / self.full_searches * 1000, 2) if self.full_searches else None
+        }
+
+def create_session_retrieval_cache(score_fn) -> SessionRetrievalCache:
+    """Build the cache using environment settings"""
+    return SessionRetrievalCache(
+        score_fn,
+        min_score=float(os.getenv('SESSION_RETRIEVAL_MIN_SCORE', '0.45')),
+        pool_size=int(os.getenv('SESSION_RETRIEVAL_POOL_SIZE', '12')),
+        ttl_seconds=float(os.getenv('SESSION_RETRIEVAL_TTL_SECONDS', '3600')),
+        max_sessions=int(os.getenv('SESSION_RETRIEVAL_MAX_SESSIONS', '5000'))
+    )
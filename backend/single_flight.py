@@ -0,0 +1,59 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+def normalize_query(text: str) -> str:
+    """Key form of a query: case and spacing differences do not make it a different request"""
+    return " ".join(text.lower().split())
+
+class SingleFlight:
+    """Coalesces concurrent identical calls into one in-flight task
+
+    The first caller for a key starts the work; callers arriving while it runs
+    await the same task instead of starting their own. Waiters are counted, so
+    one caller going away (e.g. a client disconnecting) does not cancel work
+    others are still waiting for; the task is only cancelled when the last
+    waiter leaves. Nothing is cached once the task finishes.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, Dict[str, Any]] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: Hashable, work: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            task = asyncio.ensure_future(work())
+            call = {"task": task, "waiters": 0}
+            self._calls[key] = call
+            task.add_done_callback(lambda _, key=key, call=call: self._forget(key, call))
+            self.leaders += 1
+        else:
+            self.followers += 1
+            logger.debug(f"{self.name}: joined in-flight call ({call['waiters']} already waiting)")
+
+        call["waiters"] += 1
+        try:
+            return await asyncio.shield(call["task"])
+        finally:
+            call["waiters"] -= 1
+            if call["waiters"] == 0 and not call["task"].done():
+                self._forget(key, call)
+                call["task"].cancel()
+
+    def _forget(self, key: Hashable, call: Dict[str, Any]):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        calls = self.leaders + self.followers
+        return {
+            "in_flight": len(self._calls),
+            "upstream_calls": self.leaders,
+            "coalesced_calls": self.followers,
+            "coalesced_rate": round(self.followers / calls, 4) if calls else 0.0
+        }
@@ -0,0 +1,236 @@
+import re
+import time
+import heapq
+import asyncio
+import logging
+from bisect import bisect_left
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
+from category_router import normalize_text
+
+logger = logging.getLogger(__name__)
+
+QUESTION = "question"
+ARTICLE = "article"
+
+# "Artículo 5. Prácticas de IA prohibidas", "Article 6 Classification rules..." at the start of a line;
+# the title may also be on the following line (EUR-Lex layout)
+ARTICLE_HEADING = re.compile(
+    r"^(?P<word>Art[íi]culo|ARTÍCULO|ARTICULO|Article|ARTICLE)\s+(?P<number>\d+(?:\s?(?:bis|ter|quater))?)"
+    r"\s*[.:\-–]?\s*(?P<title>.*)$"
+)
+
+def extract_article_headings(text: str, max_title_chars: int = 140) -> List[str]:
+    """Article headings of a regulation's text, first occurrence of each article number"""
+    headings = []
+    seen = set()
+    lines = [line.strip() for line in text.splitlines()]
+    for index, line in enumerate(lines):
+        match = ARTICLE_HEADING.match(line)
+        if not match or match.group("number") in seen:
+            continue
+        title = match.group("title").strip()
+        if not title:
+            following = next((candidate for candidate in lines[index + 1:index + 3] if candidate), "")
+            title = following
+        # Cross-references ("artículo 6, apartado 2, ...") do not start with a capitalised title
+        if not title or not title[0].isupper() or len(title) > max_title_chars or ARTICLE_HEADING.match(title):
+            continue
+        seen.add(match.group("number"))
+        headings.append(f"{match.group('word').capitalize()} {match.group('number')}. {title.rstrip('.')}")
+    return headings
+
+def suggestion_key(text: str) -> str:
+    """Form used for prefix matching: no case, accents, or leading punctuation"""
+    return normalize_text(text).lstrip("¿¡\"'([ ")
+
+class SuggestionIndex:
+    """Type-ahead suggestions from popular questions and regulation article titles
+
+    Entries live in an array sorted by their normalized text, so the matches of
+    a prefix are one ``bisect`` away; the best entries for every short prefix
+    (up to ``precomputed_prefix`` characters) are computed at build time, since
+    those ranges are the largest. The arrays are rebuilt and swapped in as a
+    whole, so lookups never see a half-built index.
+
+    Questions come from ``chat_messages`` at startup and from new turns as they
+    are saved (folded in on the next refresh). Only questions asked by at least
+    ``min_users`` different users are suggested, so nobody's own wording leaks
+    to other users. Article headings come from the document manager and are
+    reloaded when its regulation generation changes.
+    """
+
+    def __init__(self, db, document_manager, limit: int = 8, min_prefix: int = 2, precomputed_prefix: int = 3,
+                 min_users: int = 2, max_questions: int = 20000, max_question_chars: int = 160,
+                 article_weight: float = 3.0, refresh_seconds: float = 60):
+        self.db = db
+        self.document_manager = document_manager
+        self.limit = limit
+        self.min_prefix = min_prefix
+        self.precomputed_prefix = precomputed_prefix
+        self.min_users = min_users
+        self.max_questions = max_questions
+        self.max_question_chars = max_question_chars
+        self.article_weight = article_weight
+        self.refresh_seconds = refresh_seconds
+        # key -> {"text", "count", "users"}; users holds at most min_users ids
+        self._questions: Dict[str, Dict[str, Any]] = {}
+        self._pending: List[Tuple[str, str]] = []
+        self._articles: List[Tuple[str, str, str]] = []
+        self._articles_generation: Optional[int] = None
+        self._keys: List[str] = []
+        self._entries: List[Tuple[float, str, str, Optional[str]]] = []
+        self._top: Dict[str, List[Tuple[float, str, str, Optional[str]]]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.lookups = 0
+        self.lookup_seconds = 0.0
+        self.last_built: Optional[datetime] = None
+
+    def _add_question(self, user_id: str, text: str, count: int = 1):
+        text = " ".join(text.split())
+        if not text or len(text) > self.max_question_chars:
+            return
+        key = suggestion_key(text)
+        if len(key) < self.min_prefix:
+            return
+        entry = self._questions.get(key)
+        if entry is None:
+            if len(self._questions) >= self.max_questions:
+                return
+            entry = self._questions[key] = {"text": text, "count": 0, "users": set()}
+        entry["count"] += count
+        if len(entry["users"]) < self.min_users:
+            entry["users"].add(user_id)
+
+    def record_question(self, user_id: str, text: str):
+        """Count a question just asked; it shows up after the next refresh"""
+        self._pending.append((user_id, text))
+
+    async def load_questions(self):
+        """Count the questions in chat history (case and spacing variants are merged later)"""
+        pipeline = [
+            {"$match": {"role": "user"}},
+            {"$group": {"_id": "$content", "count": {"$sum": 1}, "users": {"$addToSet": "$user_id"}}},
+            {"$project": {"count": 1, "users": {"$slice": ["$users", self.min_users]}}},
+            {"$sort": {"count": -1}},
+            {"$limit": self.max_questions * 2}
+        ]
+        questions = {}
+        async for row in self.db.chat_messages.aggregate(pipeline, allowDiskUse=True):
+            if isinstance(row["_id"], str):
+                questions[row["_id"]] = row
+        self._questions = {}
+        for text, row in questions.items():
+            for position, user_id in enumerate(row["users"]):
+                self._add_question(user_id, text, row["count"] if position == 0 else 0)
+
+    def _load_articles(self):
+        generation = self.document_manager.regulation_generation
+        if generation == self._articles_generation:
+            return False
+        self._articles = self.document_manager.article_headings()
+        self._articles_generation = generation
+        return True
+
+    def rebuild(self):
+        """Rebuild the sorted arrays from the current questions and headings"""
+        items: Dict[str, Tuple[float, str, str, Optional[str]]] = {}
+        for key, entry in self._questions.items():
+            if len(entry["users"]) >= self.min_users:
+                items[key] = (float(entry["count"]), entry["text"], QUESTION, None)
+        for heading, title, _category in self._articles:
+            item = (self.article_weight, heading, ARTICLE, title)
+            # Reachable by "articulo 5..." and by the words of its title; the document
+            # title keeps equal headings of different regulations apart
+            for key in (suggestion_key(heading), suggestion_key(heading.split(". ", 1)[-1])):
+                items[f"{key}\x00{title}"] = item
+
+        keys = sorted(items)
+        entries = [items[key] for key in keys]
+        top: Dict[str, List] = {}
+        for key, entry in sorted(items.items(), key=lambda pair: pair[1][0], reverse=True):
+            for length in range(self.min_prefix, self.precomputed_prefix + 1):
+                if len(key) < length:
+                    break
+                best = top.setdefault(key[:length], [])
+                if len(best) < self.limit * 2:
+                    best.append(entry)
+
+        # Swap everything in at once
+        self._keys, self._entries, self._top = keys, entries, top
+        self.last_built = datetime.now(timezone.utc)
+
+    async def refresh(self):
+        """Fold in questions asked since the last refresh and any new headings"""
+        pending, self._pending = self._pending, []
+        for user_id, text in pending:
+            self._add_question(user_id, text)
+        articles_changed = await asyncio.to_thread(self._load_articles)
+        if pending or articles_changed or self.last_built is None:
+            self.rebuild()
+
+    def suggest(self, prefix: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Best questions and article titles starting with what the user typed"""
+        started = time.perf_counter()
+        limit = min(limit or self.limit, self.limit * 2)
+        key = suggestion_key(prefix)
+        if len(key) < self.min_prefix:
+            return []
+
+        keys, entries = self._keys, self._entries
+        if len(key) <= self.precomputed_prefix:
+            candidates = self._top.get(key, [])
+        else:
+            start = bisect_left(keys, key)
+            end = bisect_left(keys, key + "\uffff", start)
+            candidates = heapq.nlargest(limit * 2, entries[start:end], key=lambda entry: entry[0])
+
+        suggestions, seen = [], set()
+        for weight, text, kind, detail in candidates:
+            if (text, detail) in seen:
+                continue
+            seen.add((text, detail))
+            suggestion = {"text": text, "type": kind}
+            if detail:
+                suggestion["document"] = detail
+            suggestions.append(suggestion)
+            if len(suggestions) == limit:
+                break
+
+        self.lookups += 1
+        self.lookup_seconds += time.perf_counter() - started
+        return suggestions
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._keys),
+            "questions_tracked": len(self._questions),
+            "articles": len(self._articles),
+            "pending_questions": len(self._pending),
+            "lookups": self.lookups,
+            "avg_lookup_us": round(self.lookup_seconds / self.lookups * 1e6, 1) if self.lookups else None,
+            "last_built": self.last_built.isoformat() if self.last_built else None
+        }
+
+    async def _run(self):
+        try:
+            await self.load_questions()
+        except Exception as e:
+            logger.error(f"Error loading chat history for suggestions: {str(e)}")
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing suggestion index: {str(e)}")
+            await asyncio.sleep(self.refresh_seconds)
+
+    def start(self):
+        """Build the index from chat history and keep it refreshed"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
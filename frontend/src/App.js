@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { BrowserRouter, Routes, Route, Navigate } from 'react-router-dom';
 import axios from 'axios';
 import './App.css';
@@ -574,9 +574,16 @@ const ChatComponent = () => {
   const [sessions, setSessions] = useState([]);
   const [currentSession, setCurrentSession] = useState(null);
   const [messages, setMessages] = useState([]);
+  const [olderCursor, setOlderCursor] = useState(null);
+  const [loadingOlder, setLoadingOlder] = useState(false);
   const [newMessage, setNewMessage] = useState('');
   const [chatLoading, setChatLoading] = useState(false);
   const [category, setCategory] = useState('all');
+  const currentSessionRef = useRef(null);
+
+  useEffect(() => {
+    currentSessionRef.current = currentSession;
+  }, [currentSession]);
 
   const isDemo = window.location.pathname === '/demo';
 
@@ -630,6 +637,7 @@ const ChatComponent = () => {
       await fetchSessions();
       setCurrentSession(response.data.session_id);
       setMessages([]);
+      setOlderCursor(null);
     } catch (error) {
       console.error('Error creating session:', error);
     }
@@ -638,13 +646,35 @@ const ChatComponent = () => {
   const loadSession = async (sessionId) => {
     try {
       setCurrentSession(sessionId);
+      setOlderCursor(null);
       const response = await axios.get(`${API}/chat/sessions/${sessionId}/messages`);
       setMessages(response.data.messages);
+      setOlderCursor(response.data.next_cursor);
     } catch (error) {
       console.error('Error loading session:', error);
     }
   };
 
+  // Messages come in pages, newest first; older ones are fetched on demand
+  const loadOlderMessages = async () => {
+    if (!olderCursor || loadingOlder) return;
+    const sessionId = currentSession;
+    setLoadingOlder(true);
+    try {
+      const response = await axios.get(`${API}/chat/sessions/${sessionId}/messages`, {
+        params: { before: olderCursor }
+      });
+      // The user may have switched sessions meanwhile
+      if (currentSessionRef.current !== sessionId) return;
+      setMessages(prev => [...response.data.messages, ...prev]);
+      setOlderCursor(response.data.next_cursor);
+    } catch (error) {
+      console.error('Error loading older messages:', error);
+    } finally {
+      setLoadingOlder(false);
+    }
+  };
+
   const sendMessage = async () => {
     if (!newMessage.trim() || !currentSession) return;
 
@@ -698,6 +728,7 @@ const ChatComponent = () => {
       if (currentSession === sessionId) {
         setCurrentSession(null);
         setMessages([]);
+        setOlderCursor(null);
       }
     } catch (error) {
       console.error('Error deleting session:', error);
@@ -759,6 +790,13 @@ const ChatComponent = () => {
             {/* Messages */}
             <ScrollArea className="flex-1 p-6">
               <div className="space-y-4 max-w-4xl mx-auto">
+                {olderCursor && (
+                  <div className="flex justify-center">
+                    <Button variant="outline" size="sm" onClick={loadOlderMessages} disabled={loadingOlder}>
+                      {loadingOlder ? 'Cargando...' : 'Cargar mensajes anteriores'}
+                    </Button>
+                  </div>
+                )}
                 {messages.map((message) => (
                   <div
                     key={message.id}
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: incremental markdown stripper vs. the previous regex cleanup
+Usage: python markdown_benchmark.py [iterations]
+"""
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from markdown_stripper import MarkdownStripper, strip_markdown
+
+def legacy_clean_markdown(text):
+    """Previous ChatService.clean_markdown_response (several regex passes over the text)"""
+    if not text:
+        return text
+    text = re.sub(r'^#{1,6}\s*(.+)$', r'\1', text, flags=re.MULTILINE)
+    text = re.sub(r'\*\*(.+?)\*\*', r'\1', text)
+    text = re.sub(r'\*(.+?)\*', r'\1', text)
+    lines = text.split('\n')
+    cleaned_lines = []
+    list_counter = 1
+    for line in lines:
+        if re.match(r'^-\s+(.+)', line):
+            content = re.sub(r'^-\s+(.+)', r'\1', line)
+            cleaned_lines.append(f"{list_counter}. {content}")
+            list_counter += 1
+        else:
+            cleaned_lines.append(line)
+            if line.strip() and not re.match(r'^-\s+(.+)', line):
+                list_counter = 1
+    text = '\n'.join(cleaned_lines)
+    text = re.sub(r'`(.+?)`', r'\1', text)
+    text = re.sub(r'```[\s\S]*?```', '', text)
+    text = re.sub(r'\[(.+?)\]\(.+?\)', r'\1', text)
+    return text.strip()
+
+SAMPLE = """
+## Clasificación de su sistema
+
+Según el **Reglamento (UE) 2024/1689** (*AI Act*), su sistema de triaje se considera de **alto riesgo**.
+
+### Obligaciones principales
+- Sistema de gestión de riesgos (artículo 9)
+- Gobernanza de datos de entrenamiento, validación y prueba
+- Documentación técnica según el `Anexo IV`
+- Supervisión humana efectiva
+
+Además, como producto sanitario aplica el [MDR 2017/745](https://eur-lex.europa.eu/eli/reg/2017/745/oj).
+
+- Evaluación clínica
+- Vigilancia poscomercialización
+
+Recomendación: priorice la *documentación técnica* y el **plan de supervisión humana**.
+"""
+
+def stream_strip(text, chunk_size=4):
+    stripper = MarkdownStripper()
+    parts = [stripper.feed(text[i:i + chunk_size]) for i in range(0, len(text), chunk_size)]
+    parts.append(stripper.flush())
+    return "".join(parts)
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    text = SAMPLE * 3
+
+    legacy = legacy_clean_markdown(text)
+    single_pass = strip_markdown(text)
+    streamed = stream_strip(text)
+    print(f"Output identical to legacy: {single_pass == legacy}")
+    print(f"Streamed output identical:  {streamed == single_pass}")
+
+    for name, func in [("legacy regex", lambda: legacy_clean_markdown(text)),
+                       ("single pass", lambda: strip_markdown(text)),
+                       ("streamed (4 char chunks)", lambda: stream_strip(text))]:
+        seconds = timeit.timeit(func, number=iterations)
+        print(f"{name:<26} {seconds / iterations * 1e6:8.1f} µs/answer")
+
+if __name__ == "__main__":
+    main()
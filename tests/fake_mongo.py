@@ -0,0 +1,146 @@
+"""In-memory stand-in for the few Motor collection methods the chat modules use
+
+Every call yields to the event loop once, so concurrent callers interleave the
+way they do against a real server.
+"""
+import asyncio
+import copy
+import types
+
+def matches(document, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(document, option) for option in condition):
+                return False
+            continue
+        value = document.get(key)
+        if not isinstance(condition, dict):
+            if value != condition:
+                return False
+            continue
+        for operator, argument in condition.items():
+            if operator == "$exists":
+                ok = (key in document) == argument
+            elif operator == "$in":
+                ok = value in argument
+            elif value is None:
+                ok = False
+            elif operator == "$lt":
+                ok = value < argument
+            elif operator == "$lte":
+                ok = value <= argument
+            elif operator == "$gt":
+                ok = value > argument
+            else:
+                raise NotImplementedError(operator)
+            if not ok:
+                return False
+    return True
+
+def apply_update(document, update):
+    for key, value in update.get("$set", {}).items():
+        document[key] = value
+    for key, value in update.get("$inc", {}).items():
+        document[key] = document.get(key, 0) + value
+    for key in update.get("$unset", {}):
+        document.pop(key, None)
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, keys, direction=1):
+        if isinstance(keys, str):
+            keys = [(keys, direction)]
+        for key, order in reversed(keys):
+            self.documents.sort(key=lambda document: document.get(key), reverse=order < 0)
+        return self
+
+    def limit(self, count):
+        self.documents = self.documents[:count]
+        return self
+
+    async def to_list(self, length):
+        await asyncio.sleep(0)
+        return self.documents if length is None else self.documents[:length]
+
+    async def _iterate(self):
+        for document in self.documents:
+            yield document
+
+    def __aiter__(self):
+        return self._iterate()
+
+class FakeCollection:
+    def __init__(self):
+        self.documents = []
+
+    def find(self, query=None, projection=None):
+        return FakeCursor([copy.deepcopy(d) for d in self.documents if matches(d, query or {})])
+
+    async def find_one(self, query, projection=None):
+        await asyncio.sleep(0)
+        return next((copy.deepcopy(d) for d in self.documents if matches(d, query)), None)
+
+    async def count_documents(self, query, limit=0):
+        await asyncio.sleep(0)
+        count = sum(1 for d in self.documents if matches(d, query))
+        return min(count, limit) if limit else count
+
+    async def insert_many(self, documents, ordered=True):
+        await asyncio.sleep(0)
+        self.documents.extend(copy.deepcopy(d) for d in documents)
+
+    async def update_one(self, query, update, upsert=False):
+        await asyncio.sleep(0)
+        for document in self.documents:
+            if matches(document, query):
+                apply_update(document, update)
+                return types.SimpleNamespace(matched_count=1)
+        return types.SimpleNamespace(matched_count=0)
+
+    async def replace_one(self, query, replacement, upsert=False):
+        await asyncio.sleep(0)
+        self.documents = [d for d in self.documents if not matches(d, query)]
+        self.documents.append(copy.deepcopy(replacement))
+
+    async def find_one_and_update(self, query, update, projection=None):
+        await asyncio.sleep(0)
+        for document in self.documents:
+            if matches(document, query):
+                found = copy.deepcopy(document)
+                apply_update(document, update)
+                return found
+        return None
+
+    async def find_one_and_delete(self, query, projection=None):
+        await asyncio.sleep(0)
+        for index, document in enumerate(self.documents):
+            if matches(document, query):
+                return self.documents.pop(index)
+        return None
+
+    async def delete_one(self, query):
+        await asyncio.sleep(0)
+        for index, document in enumerate(self.documents):
+            if matches(document, query):
+                del self.documents[index]
+                return types.SimpleNamespace(deleted_count=1)
+        return types.SimpleNamespace(deleted_count=0)
+
+    async def delete_many(self, query):
+        await asyncio.sleep(0)
+        before = len(self.documents)
+        self.documents = [d for d in self.documents if not matches(d, query)]
+        return types.SimpleNamespace(deleted_count=before - len(self.documents))
+
+class FakeDB:
+    """Collections are created on first access, like attributes of a Motor database"""
+
+    def __init__(self):
+        self._collections = {}
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self._collections.setdefault(name, FakeCollection())
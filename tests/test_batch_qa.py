@@ -0,0 +1,53 @@
+import json
+import uuid
+
+import pytest
+
+# Needs the backend's dependencies (the chat pipeline it answers through)
+batch_qa = pytest.importorskip("batch_qa")
+
+from batch_qa import BatchQAManager, load_questions
+
+def test_invalid_lines_are_reported_and_skipped(tmp_path):
+    path = tmp_path / "questions.txt"
+    path.write_text('¿Qué es el RGPD?\n# comentario\n{"question": "¿Y el MDR?", "id": "mdr"}\n'
+                    '{"question": \n{"id": "x"}\n', encoding="utf-8")
+    errors = []
+
+    questions = load_questions(path, errors)
+
+    assert [question["question"] for question in questions] == ["¿Qué es el RGPD?", "¿Y el MDR?"]
+    assert questions[1]["id"] == "mdr"
+    assert [error["line"] for error in errors] == [4, 5]
+    assert errors[1]["error"] == "no question"
+
+def test_job_ids_must_be_uuids(tmp_path):
+    manager = BatchQAManager(None, tmp_path)
+    job_id = str(uuid.uuid4())
+
+    assert manager.checked_id(job_id.upper()) == job_id
+    for bad in ("../../etc", "", "1234"):
+        with pytest.raises(ValueError):
+            manager.job_dir(bad)
+
+def test_progress_of_a_job_from_before_a_restart(tmp_path):
+    job_id = str(uuid.uuid4())
+    job_dir = tmp_path / job_id
+    job_dir.mkdir()
+    (job_dir / BatchQAManager.QUESTIONS_FILE).write_text(
+        '{"question": "uno", "id": "q1"}\n{"question": "dos", "id": "q2"}\n{"question": "tres", "id": "q3"}\n',
+        encoding="utf-8"
+    )
+    (job_dir / BatchQAManager.SETTINGS_FILE).write_text(json.dumps({"category": None, "concurrency": 4}))
+    (job_dir / BatchQAManager.RESULTS_FILE).write_text(
+        '{"id": "q1", "status": "error"}\n{"id": "q1", "status": "ok"}\n{"id": "q2", "status": "error"}\n{"id": "q3", "sta',
+        encoding="utf-8"
+    )
+    manager = BatchQAManager(None, tmp_path)
+
+    progress = manager.get_job(job_id.upper()).progress()
+
+    assert progress["job_id"] == job_id
+    assert progress["status"] == "interrupted"
+    assert (progress["total"], progress["completed"], progress["failed"]) == (3, 1, 1)
+    assert manager.get_job(str(uuid.uuid4())) is None
@@ -0,0 +1,56 @@
+import types
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from category_router import CategoryRouter, keyword_categories, keyword_scores
+
+CATEGORIES = ["ai_regulation", "insurance_law", "health_law", "data_protection"]
+
+class FakeStore:
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+    def get(self, where, include):
+        return {"embeddings": self.embeddings.get(where["category"], [])}
+
+def make_router(embeddings=None):
+    manager = types.SimpleNamespace(
+        regulation_generation=1,
+        vectorstore=FakeStore(embeddings or {}),
+        get_document_categories=lambda: CATEGORIES
+    )
+    router = CategoryRouter(manager)
+    if embeddings:
+        router._refreshing.acquire()
+        router._refresh_centroids()
+    return router
+
+# One axis per category, so a query embedding points at the categories it mixes
+AXES = {category: [1.0 if i == index else 0.0 for i in range(len(CATEGORIES))]
+        for index, category in enumerate(CATEGORIES)}
+
+def test_everyday_words_are_not_keywords():
+    assert keyword_scores("Estoy seguro de que mi app de IA necesita evaluación?") == {}
+    assert keyword_scores("¿La prima de riesgo afecta a la sanidad del paciente?") == {}
+    assert keyword_categories("¿Qué cubre un seguro de vida?") == ["insurance_law"]
+
+def test_unambiguous_keyword_routes_without_embedding():
+    router = make_router()
+    assert router.route("¿Qué obligaciones impone el RGPD?") == ["data_protection"]
+
+def test_single_weak_keyword_needs_the_embedding_to_agree():
+    router = make_router({category: [axis] for category, axis in AXES.items()})
+    query = "¿Son seguros los sistemas de recomendación?"
+    assert keyword_scores(query) == {"insurance_law": 1}
+    assert router.route(query) == []
+    assert router.route(query, AXES["ai_regulation"]) == ["ai_regulation", "insurance_law"]
+    assert router.route(query, AXES["insurance_law"]) == ["insurance_law"]
+
+def test_keyword_and_centroid_evidence_are_blended():
+    router = make_router({category: [axis] for category, axis in AXES.items()})
+    categories, confidence = router.predict("¿Cómo afecta el AI Act?", AXES["health_law"])
+    assert set(categories) == {"ai_regulation", "health_law"}
+    assert confidence == pytest.approx(1.0)
+    assert router.predict("Hola", AXES["health_law"]) == (["health_law"], pytest.approx(1.0))
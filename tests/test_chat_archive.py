@@ -0,0 +1,101 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("bson")
+pytest.importorskip("zstandard")
+
+from chat_archive import ChatArchive
+from tests.fake_mongo import FakeDB
+
+# Motor returns naive UTC datetimes, as the archive payload does after a round trip
+START = datetime(2026, 1, 5, 10, 0)
+
+def message(index, role="user"):
+    return {"id": f"m{index}", "session_id": "s1", "user_id": "u1", "role": role,
+            "content": f"mensaje {index}", "created_at": START + timedelta(minutes=index)}
+
+def make_db(count=4):
+    db = FakeDB()
+    db.chat_sessions.documents.append({"id": "s1", "user_id": "u1", "updated_at": START + timedelta(minutes=count)})
+    db.chat_messages.documents.extend(message(i, "user" if i % 2 == 0 else "assistant") for i in range(count))
+    return db
+
+async def archive(chat_archive, db):
+    session = await db.chat_sessions.find_one({"id": "s1"})
+    return await chat_archive.archive_session(session)
+
+def contents(messages):
+    return [m["content"] for m in sorted(messages, key=lambda m: m["created_at"])]
+
+def test_archive_load_restore_round_trip():
+    async def scenario():
+        db = make_db()
+        chat_archive = ChatArchive(db)
+        assert await archive(chat_archive, db)
+        assert db.chat_messages.documents == []
+        assert "archived_at" in db.chat_sessions.documents[0]
+
+        loaded = await chat_archive.load("s1")
+        assert [(m["role"], m["content"], m["session_id"], m["user_id"]) for m in loaded] == [
+            (m["role"], m["content"], "s1", "u1") for m in (message(i, "user" if i % 2 == 0 else "assistant") for i in range(4))
+        ]
+
+        assert await chat_archive.restore("s1") == 4
+        assert contents(db.chat_messages.documents) == [f"mensaje {i}" for i in range(4)]
+        assert "archived_at" not in db.chat_sessions.documents[0]
+        assert db.chat_archives.documents == []
+        assert chat_archive.stats()["sessions_restored"] == 1
+
+    asyncio.run(scenario())
+
+def test_turn_saved_while_archiving_is_kept():
+    async def scenario():
+        db = make_db()
+        chat_archive = ChatArchive(db)
+        store = db.chat_archives.replace_one
+
+        async def replace_one(*args, **kwargs):
+            # The turn's messages land after they were read for the archive
+            await db.chat_messages.insert_many([message(4)])
+            return await store(*args, **kwargs)
+        db.chat_archives.replace_one = replace_one
+
+        assert await archive(chat_archive, db)
+        assert contents(db.chat_messages.documents) == ["mensaje 4"]
+        assert contents(await chat_archive.load("s1")) == [f"mensaje {i}" for i in range(5)]
+
+        await chat_archive.restore("s1")
+        assert contents(db.chat_messages.documents) == [f"mensaje {i}" for i in range(5)]
+
+    asyncio.run(scenario())
+
+def test_concurrent_restores_do_not_duplicate_messages():
+    async def scenario():
+        db = make_db()
+        # Two workers, each with its own archive object, plus two turns in one of them
+        first, second = ChatArchive(db), ChatArchive(db)
+        assert await archive(first, db)
+
+        restored = await asyncio.gather(first.restore("s1"), first.restore("s1"), second.restore("s1"))
+        assert sorted(restored) == [0, 4, 4]
+        assert contents(db.chat_messages.documents) == [f"mensaje {i}" for i in range(4)]
+        assert "archived_at" not in db.chat_sessions.documents[0]
+        assert db.chat_archives.documents == []
+
+    asyncio.run(scenario())
+
+def test_stale_restore_claim_is_taken_over():
+    async def scenario():
+        db = make_db()
+        chat_archive = ChatArchive(db, restore_claim_seconds=60)
+        assert await archive(chat_archive, db)
+        # A worker claimed the restore, put one message back and died
+        db.chat_archives.documents[0]["restoring_at"] = datetime.now(timezone.utc) - timedelta(minutes=5)
+        db.chat_messages.documents.append(message(0))
+
+        assert await chat_archive.restore("s1") == 4
+        assert contents(db.chat_messages.documents) == [f"mensaje {i}" for i in range(4)]
+
+    asyncio.run(scenario())
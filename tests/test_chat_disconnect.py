@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+# Needs the backend's dependencies (motor, the document manager's stack, the LLM client)
+chat_service = pytest.importorskip("chat_service")
+
+class FakePersistence:
+    def __init__(self):
+        self.turns = []
+
+    async def persist_turn(self, session_id, messages, updated_at=None):
+        # A Mongo round trip: a cancellation delivered again here would lose the turn
+        for _ in range(3):
+            await asyncio.sleep(0)
+        self.turns.append((session_id, messages))
+
+def make_service(policy):
+    service = chat_service.ChatService.__new__(chat_service.ChatService)
+    service.disconnect_policy = policy
+    service.cancellations = {"abandoned_turns": 0, "cancelled_llm_calls": 0,
+                             "estimated_completion_tokens_saved": 0, "partial_turns_saved": 0}
+    service._background_tasks = set()
+    service.persistence = FakePersistence()
+    service.answer_started = asyncio.Event()
+
+    async def load_history(session_id):
+        return ""
+
+    async def retrieve_context(message, category, use_cache=True, session_id=None):
+        return {"relevant_documents": []}
+
+    async def complete_answer(session_id, message, category, context, history, on_text=None):
+        on_text("El RGPD ")
+        service.answer_started.set()
+        await asyncio.sleep(3600)
+    service.load_history = load_history
+    service.retrieve_context = retrieve_context
+    service.complete_answer = complete_answer
+    return service
+
+async def disconnect_mid_answer(service):
+    """Consume the stream like StreamingResponse and cancel it the way an anyio scope does: repeatedly"""
+    events = []
+
+    async def consume():
+        async for event in service.stream_response("s1", "u1", "¿Qué es el RGPD?", "data_protection"):
+            events.append(event)
+
+    consumer = asyncio.create_task(consume())
+    await service.answer_started.wait()
+    await asyncio.sleep(0)
+    while not consumer.done():
+        consumer.cancel()
+        await asyncio.sleep(0)
+    await asyncio.gather(consumer, return_exceptions=True)
+    await asyncio.gather(*list(service._background_tasks))
+    return events
+
+def test_partial_turn_is_saved_when_the_stream_is_cancelled():
+    service = make_service("partial")
+    events = asyncio.run(disconnect_mid_answer(service))
+
+    assert [event["event"] for event in events] == ["sources", "token"]
+    assert len(service.persistence.turns) == 1
+    session_id, messages = service.persistence.turns[0]
+    assert session_id == "s1"
+    assert [(message["role"], message["content"]) for message in messages] == [
+        ("user", "¿Qué es el RGPD?"), ("assistant", "El RGPD")
+    ]
+    assert messages[1]["metadata"]["partial"] is True
+    assert service.cancellations["partial_turns_saved"] == 1
+    assert service.cancellations["abandoned_turns"] == 1
+
+def test_discard_policy_saves_nothing():
+    service = make_service("discard")
+    asyncio.run(disconnect_mid_answer(service))
+
+    assert service.persistence.turns == []
+    assert service.cancellations["abandoned_turns"] == 1
@@ -0,0 +1,114 @@
+import asyncio
+from datetime import datetime, timezone
+
+from chat_persistence import ChatPersistence
+from tests.fake_mongo import FakeDB
+
+NOW = datetime(2026, 1, 5, 10, 0, tzinfo=timezone.utc)
+
+def turn(session_id, index):
+    return [
+        {"id": f"{session_id}-q{index}", "session_id": session_id, "role": "user", "content": f"pregunta {index}"},
+        {"id": f"{session_id}-a{index}", "session_id": session_id, "role": "assistant", "content": f"respuesta {index}"}
+    ]
+
+def make_db(*session_ids):
+    db = FakeDB()
+    db.chat_sessions.documents.extend({"id": session_id, "message_count": 0} for session_id in session_ids)
+    return db
+
+def saved_ids(db, session_id):
+    return [m["id"] for m in db.chat_messages.documents if m["session_id"] == session_id]
+
+def test_turn_is_written_inline_without_write_behind():
+    async def scenario():
+        db = make_db("s1")
+        persistence = ChatPersistence(db)
+        persistence.start()
+
+        await persistence.persist_turn("s1", turn("s1", 1), NOW)
+        assert saved_ids(db, "s1") == ["s1-q1", "s1-a1"]
+        assert db.chat_sessions.documents[0]["message_count"] == 2
+        assert db.chat_sessions.documents[0]["updated_at"] == NOW
+        assert persistence.stats()["turns_queued"] == 0
+
+    asyncio.run(scenario())
+
+def test_wait_for_session_sees_queued_writes():
+    async def scenario():
+        db = make_db("s1", "s2")
+        persistence = ChatPersistence(db, write_behind=True)
+        persistence.start()
+
+        await persistence.persist_turn("s1", turn("s1", 1), NOW)
+        await persistence.persist_turn("s1", turn("s1", 2), NOW)
+        assert saved_ids(db, "s1") == []
+
+        # Nothing pending for another session: no waiting
+        await asyncio.wait_for(persistence.wait_for_session("s2"), 0.01)
+
+        await persistence.wait_for_session("s1")
+        assert saved_ids(db, "s1") == ["s1-q1", "s1-a1", "s1-q2", "s1-a2"]
+        assert db.chat_sessions.documents[0]["message_count"] == 4
+        await persistence.stop()
+
+    asyncio.run(scenario())
+
+def test_full_queue_falls_back_to_an_inline_write():
+    async def scenario():
+        db = make_db("s1", "s2")
+        persistence = ChatPersistence(db, write_behind=True, max_queue_size=1)
+        persistence.start()
+
+        await persistence.persist_turn("s1", turn("s1", 1), NOW)
+        await persistence.persist_turn("s2", turn("s2", 1), NOW)
+        # Written before persist_turn returned, not queued
+        assert saved_ids(db, "s2") == ["s2-q1", "s2-a1"]
+        stats = persistence.stats()
+        assert (stats["turns_queued"], stats["inline_fallbacks"]) == (1, 1)
+        await persistence.stop()
+        assert saved_ids(db, "s1") == ["s1-q1", "s1-a1"]
+
+    asyncio.run(scenario())
+
+def test_stop_flushes_pending_turns():
+    async def scenario():
+        db = make_db("s1", "s2")
+        persistence = ChatPersistence(db, write_behind=True)
+        persistence.start()
+        for index in range(5):
+            await persistence.persist_turn("s1" if index % 2 else "s2", turn("s1" if index % 2 else "s2", index), NOW)
+
+        await persistence.stop()
+        assert len(db.chat_messages.documents) == 10
+        assert persistence.stats()["turns_written"] == 5
+
+        # Once stopped, turns are written inline again
+        await persistence.persist_turn("s1", turn("s1", 9), NOW)
+        assert saved_ids(db, "s1")[-2:] == ["s1-q9", "s1-a9"]
+
+    asyncio.run(scenario())
+
+def test_failed_write_is_retried_and_waiters_are_released():
+    async def scenario():
+        db = make_db("s1")
+        persistence = ChatPersistence(db, write_behind=True, max_retries=2)
+        persistence.start()
+        insert_many = db.chat_messages.insert_many
+        attempts = []
+
+        async def flaky_insert(documents, ordered=True):
+            attempts.append(len(documents))
+            if len(attempts) == 1:
+                raise ConnectionError("primary stepped down")
+            await insert_many(documents, ordered)
+        db.chat_messages.insert_many = flaky_insert
+
+        await persistence.persist_turn("s1", turn("s1", 1), NOW)
+        await asyncio.wait_for(persistence.wait_for_session("s1"), 5)
+        assert attempts == [2, 2]
+        assert saved_ids(db, "s1") == ["s1-q1", "s1-a1"]
+        assert persistence.stats()["failures"] == 0
+        await persistence.stop()
+
+    asyncio.run(scenario())
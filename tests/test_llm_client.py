@@ -0,0 +1,82 @@
+import asyncio
+import types
+
+import pytest
+
+litellm = pytest.importorskip("litellm")
+llm_client = pytest.importorskip("llm_client")
+
+from llm_client import LLMClient, LLMClientPool
+from llm_scheduler import LLMScheduler
+
+def chunk(text):
+    return types.SimpleNamespace(choices=[types.SimpleNamespace(delta=types.SimpleNamespace(content=text))])
+
+def make_client(monkeypatch, api_base, acompletion):
+    client = LLMClient("openai", "gpt-4o-mini", "sk-test", api_base)
+    completions = []
+
+    async def complete(prompt, system_message, session_id):
+        completions.append(prompt)
+        return "respuesta completa"
+    monkeypatch.setattr(client, "complete", complete)
+    monkeypatch.setattr(litellm, "acompletion", acompletion)
+    return client, completions
+
+async def collect(deltas):
+    return [delta async for delta in deltas]
+
+def test_without_streaming_endpoint_the_key_stays_with_llmchat(monkeypatch):
+    async def acompletion(**kwargs):
+        raise AssertionError("litellm must not be called without LLM_API_BASE")
+    client, completions = make_client(monkeypatch, None, acompletion)
+
+    assert asyncio.run(collect(client.stream("¿Qué es el RGPD?", "system", "s1"))) == ["respuesta completa"]
+    assert completions == ["¿Qué es el RGPD?"]
+    assert client.stats()["stream_fallbacks"] == 0
+
+def test_stream_failure_before_first_token_falls_back(monkeypatch):
+    async def acompletion(**kwargs):
+        raise RuntimeError("401 invalid api key")
+    client, completions = make_client(monkeypatch, "https://llm.example/v1", acompletion)
+
+    assert asyncio.run(collect(client.stream("pregunta", "system", "s1"))) == ["respuesta completa"]
+    assert client.stats()["stream_fallbacks"] == 1
+    assert client.stats()["streams"] == 0
+
+def test_tokens_are_streamed_from_the_configured_endpoint(monkeypatch):
+    calls = []
+
+    async def acompletion(**kwargs):
+        calls.append(kwargs)
+
+        async def chunks():
+            for text in ("El ", "", "RGPD ", "es..."):
+                yield chunk(text)
+        return chunks()
+    client, completions = make_client(monkeypatch, "https://llm.example/v1", acompletion)
+
+    assert asyncio.run(collect(client.stream("pregunta", "system", "s1"))) == ["El ", "RGPD ", "es..."]
+    assert completions == []
+    assert calls[0]["api_base"] == "https://llm.example/v1"
+    assert calls[0]["stream"] is True
+    assert client.stats()["streams"] == 1
+
+def test_pool_stream_releases_its_slot_when_closed_early(monkeypatch):
+    async def acompletion(**kwargs):
+        async def chunks():
+            for text in ("uno ", "dos ", "tres"):
+                yield chunk(text)
+        return chunks()
+    monkeypatch.setattr(litellm, "acompletion", acompletion)
+
+    async def scenario():
+        pool = LLMClientPool(api_key="sk-test", api_base="https://llm.example/v1",
+                             scheduler=LLMScheduler(max_concurrency=2, reserved_interactive=0))
+        deltas = pool.stream("openai", "gpt-4o-mini", "pregunta", "system", "s1")
+        assert await deltas.__anext__() == "uno "
+        assert pool.scheduler.stats()["running"] == 1
+        await deltas.aclose()
+        assert pool.scheduler.stats()["running"] == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,132 @@
+import asyncio
+
+import llm_scheduler
+from llm_scheduler import LLMScheduler, PRIORITY_BACKGROUND, PRIORITY_BATCH, PRIORITY_INTERACTIVE
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+def queue_calls(scheduler, order, calls):
+    """Start acquire() for each (name, priority, fairness_key); names are appended to order when admitted"""
+    async def call(name, priority, key):
+        await scheduler.acquire(priority, fairness_key=key)
+        order.append(name)
+    return [asyncio.create_task(call(*spec)) for spec in calls]
+
+def test_interactive_goes_first_and_reserved_slots_stay_free():
+    async def scenario():
+        scheduler = LLMScheduler(max_concurrency=3, reserved_interactive=1)
+        order = []
+        for _ in range(3):
+            await scheduler.acquire(PRIORITY_INTERACTIVE)
+        tasks = queue_calls(scheduler, order, [
+            ("batch", PRIORITY_BATCH, "job"),
+            ("news", PRIORITY_BACKGROUND, "news"),
+            ("chat", PRIORITY_INTERACTIVE, "session")
+        ])
+        await settle()
+        assert order == []
+
+        scheduler.release()
+        await settle()
+        assert order == ["chat"]
+
+        # Three running: lower classes may use at most max_concurrency - reserved_interactive = 2
+        scheduler.release()
+        await settle()
+        assert order == ["chat"]
+        scheduler.release()
+        await settle()
+        assert order == ["chat", "news"]
+        scheduler.release()
+        await settle()
+        assert order == ["chat", "news", "batch"]
+        assert scheduler.stats()["running"] == 2
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+
+def test_fairness_keys_take_turns_within_a_class():
+    async def scenario():
+        scheduler = LLMScheduler(max_concurrency=1, reserved_interactive=0)
+        order = []
+        await scheduler.acquire(PRIORITY_BATCH, fairness_key="blocker")
+        tasks = queue_calls(scheduler, order, [
+            ("a1", PRIORITY_BATCH, "job-a"),
+            ("a2", PRIORITY_BATCH, "job-a"),
+            ("a3", PRIORITY_BATCH, "job-a"),
+            ("b1", PRIORITY_BATCH, "job-b"),
+            ("c1", PRIORITY_BATCH, "job-c")
+        ])
+        await settle()
+        for _ in range(5):
+            scheduler.release()
+            await settle()
+        assert order == ["a1", "b1", "c1", "a2", "a3"]
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+
+def test_cancelled_waiter_does_not_take_a_slot():
+    async def scenario():
+        scheduler = LLMScheduler(max_concurrency=1, reserved_interactive=0)
+        order = []
+        await scheduler.acquire(PRIORITY_INTERACTIVE)
+        gone, stays = queue_calls(scheduler, order, [
+            ("gone", PRIORITY_INTERACTIVE, "s1"),
+            ("stays", PRIORITY_INTERACTIVE, "s2")
+        ])
+        await settle()
+        gone.cancel()
+        await settle()
+        scheduler.release()
+        await stays
+        assert order == ["stays"]
+        stats = scheduler.stats()
+        assert stats["running"] == 1
+        assert stats["classes"]["interactive"]["cancelled_while_queued"] == 1
+
+    asyncio.run(scenario())
+
+def test_requests_per_minute_budget(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(llm_scheduler.time, "monotonic", lambda: clock[0])
+
+    async def scenario():
+        scheduler = LLMScheduler(max_concurrency=10, requests_per_minute=2, reserved_interactive=0)
+        order = []
+        tasks = queue_calls(scheduler, order, [(f"call{i}", PRIORITY_INTERACTIVE, "s") for i in range(3)])
+        await settle()
+        assert order == ["call0", "call1"]
+
+        # A finished call does not free budget inside the same minute
+        scheduler.release()
+        await settle()
+        assert order == ["call0", "call1"]
+
+        clock[0] += 60
+        scheduler.release()
+        await asyncio.gather(*tasks)
+        assert order == ["call0", "call1", "call2"]
+
+    asyncio.run(scenario())
+
+def test_tokens_per_minute_budget(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(llm_scheduler.time, "monotonic", lambda: clock[0])
+
+    async def scenario():
+        scheduler = LLMScheduler(max_concurrency=10, tokens_per_minute=1000, reserved_interactive=0)
+        await scheduler.acquire(tokens=600)
+        waiting = asyncio.create_task(scheduler.acquire(tokens=600))
+        await settle()
+        assert not waiting.done()
+        assert scheduler.stats()["tokens_last_minute"] == 600
+
+        clock[0] += 60
+        scheduler.release(completion_tokens=100)
+        await waiting
+        assert scheduler.stats()["tokens_last_minute"] == 700
+
+    asyncio.run(scenario())
@@ -0,0 +1,56 @@
+import random
+
+from markdown_benchmark import SAMPLE, legacy_clean_markdown, stream_strip
+from markdown_stripper import MarkdownStripper, strip_markdown
+
+# Pieces that exercise every rule and the places where they interact
+PIECES = list("ab ") * 3 + ["#", "*", "**", "-", "- ", "`", "[", "]", "(", ")", "](", "\n", "\n", "\t", "\n```"]
+
+def random_answers(count, seed):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield "".join(rng.choice(PIECES) for _ in range(rng.randint(0, 40)))
+
+def test_matches_legacy_cleanup_on_sample():
+    assert strip_markdown(SAMPLE * 3) == legacy_clean_markdown(SAMPLE * 3)
+
+def test_matches_legacy_cleanup_on_random_input():
+    # Closed code fences are the one intended difference (see test_closed_fence_is_dropped)
+    mismatches = [
+        text for text in random_answers(20000, seed=1)
+        if text.count("```") < 2 and strip_markdown(text) != legacy_clean_markdown(text)
+    ]
+    assert mismatches == []
+
+def test_streamed_output_matches_single_call():
+    for text in random_answers(5000, seed=2):
+        expected = strip_markdown(text)
+        for chunk_size in (1, 3, 7):
+            assert stream_strip(text, chunk_size) == expected
+
+def test_unterminated_fence_keeps_the_text():
+    text = "Intro\n```\nArt. 9\nmas texto\nFin sin cierre"
+    assert strip_markdown(text) == legacy_clean_markdown(text) == "Intro\n`\nArt. 9\nmas texto\nFin sin cierre"
+
+def test_closed_fence_is_dropped():
+    assert strip_markdown("Antes\n```python\nprint('x')\n```\nDespués") == "Antes\nDespués"
+
+def test_empty_header_takes_next_line():
+    assert strip_markdown("#\n\nTexto") == "Texto"
+    assert strip_markdown("## \n- punto") == "1. punto"
+    assert strip_markdown("Fin\n#") == "Fin\n#"
+    assert strip_markdown("Fin\n# ") == "Fin"
+
+def test_feed_returns_only_completed_lines():
+    stripper = MarkdownStripper()
+    assert stripper.feed("## Título\n- uno\n- do") == "Título\n1. uno"
+    assert stripper.feed("s\n\n") == "\n2. dos"
+    assert stripper.flush() == ""
+
+def test_feed_releases_plain_text_before_the_line_ends():
+    stripper = MarkdownStripper()
+    assert stripper.feed("Primera línea\nSegún el ") == "Primera línea\nSegún el"
+    assert stripper.feed("**Reglamento**") == ""
+    assert stripper.feed(" aplica\n") == " Reglamento aplica"
+    assert stripper.feed("- uno") == ""
+    assert stripper.flush() == "\n1. uno"
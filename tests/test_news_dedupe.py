@@ -0,0 +1,96 @@
+import asyncio
+import hashlib
+import types
+
+import pytest
+
+# Needs the backend's dependencies (aiohttp, motor, the document manager's stack)
+news_service = pytest.importorskip("news_service")
+BulkWriteError = pytest.importorskip("pymongo.errors").BulkWriteError
+
+def news_id(url):
+    return hashlib.md5(url.encode()).hexdigest()
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def _iterate(self):
+        for document in self.documents:
+            yield document
+
+    def __aiter__(self):
+        return self._iterate()
+
+class FakeNewsItems:
+    """news_items collection holding ``saved`` ids; ``taken`` ids are inserted by a concurrent run"""
+
+    def __init__(self, saved=(), taken=()):
+        self.saved = set(saved)
+        self.taken = set(taken)
+        self.finds = []
+        self.inserts = []
+
+    def find(self, query, projection=None):
+        self.finds.append(query)
+        return FakeCursor([{"id": item_id} for item_id in query["id"]["$in"] if item_id in self.saved])
+
+    async def insert_many(self, documents, ordered=True):
+        self.inserts.append((list(documents), ordered))
+        errors = [
+            {"index": index, "code": 11000, "errmsg": "duplicate key"}
+            for index, document in enumerate(documents) if document["id"] in self.taken
+        ]
+        self.saved.update(document["id"] for document in documents if document["id"] not in self.taken)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+def make_service(monkeypatch, collection):
+    indexed = []
+    monkeypatch.setattr(news_service, "document_manager",
+                        types.SimpleNamespace(index_news_items=lambda items: indexed.append(list(items)) or len(items)))
+    service = news_service.NewsService.__new__(news_service.NewsService)
+    service.db = types.SimpleNamespace(news_items=collection)
+
+    async def summary(item, relevance_score):
+        return f"Resumen de {item['title']}"
+    service.generate_news_summary = summary
+    return service, indexed
+
+def news(url, title="Nueva guía de la AEMPS"):
+    return {"url": url, "title": title, "source": "AEMPS", "summary": "Inteligencia artificial"}
+
+def test_known_and_repeated_items_are_skipped(monkeypatch):
+    collection = FakeNewsItems(saved={news_id("https://boe.es/1")})
+    service, indexed = make_service(monkeypatch, collection)
+    items = [news("https://boe.es/1"), news("https://boe.es/2"), news("https://boe.es/3"), news("https://boe.es/2", "Otra búsqueda")]
+
+    asyncio.run(service.process_and_save_news(items))
+
+    assert len(collection.finds) == 1
+    assert set(collection.finds[0]["id"]["$in"]) == {news_id(f"https://boe.es/{n}") for n in (1, 2, 3)}
+    assert len(collection.inserts) == 1
+    documents, ordered = collection.inserts[0]
+    assert ordered is False
+    assert [document["id"] for document in documents] == [news_id("https://boe.es/2"), news_id("https://boe.es/3")]
+    assert documents[0]["title"] == "Nueva guía de la AEMPS"
+    assert documents[0]["ai_summary"] == "Resumen de Nueva guía de la AEMPS"
+    assert [[document["id"] for document in batch] for batch in indexed] == [[document["id"] for document in documents]]
+
+def test_nothing_new_writes_nothing(monkeypatch):
+    collection = FakeNewsItems(saved={news_id("https://boe.es/1")})
+    service, indexed = make_service(monkeypatch, collection)
+
+    asyncio.run(service.process_and_save_news([news("https://boe.es/1")]))
+
+    assert collection.inserts == []
+    assert indexed == []
+
+def test_items_saved_by_a_concurrent_run_are_not_indexed_twice(monkeypatch):
+    collection = FakeNewsItems(taken={news_id("https://boe.es/2")})
+    service, indexed = make_service(monkeypatch, collection)
+
+    asyncio.run(service.process_and_save_news([news(f"https://boe.es/{n}") for n in (1, 2, 3)]))
+
+    assert len(collection.inserts) == 1
+    assert [document["id"] for document in indexed[0]] == [news_id("https://boe.es/1"), news_id("https://boe.es/3")]
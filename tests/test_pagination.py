@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from pagination import before_filter, decode_cursor, encode_cursor, page_before
+
+START = datetime(2026, 3, 1, 9, 30, tzinfo=timezone.utc)
+
+def messages(count):
+    # Pairs share a timestamp, like a user message and an answer saved in the same millisecond
+    return [
+        {"id": f"m{index:03d}", "created_at": START + timedelta(milliseconds=index // 2)}
+        for index in range(count)
+    ]
+
+def read_all(items, limit):
+    """Walk the pages the way a client does, following next_cursor"""
+    pages, cursor = [], None
+    while True:
+        page = page_before(items, "created_at", limit, cursor)
+        cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            cursor = encode_cursor(page[-1]["created_at"], page[-1]["id"])
+        pages.append(list(reversed(page)))
+        if cursor is None:
+            return pages
+
+@pytest.mark.parametrize("timestamp", [START, START.replace(tzinfo=None), START + timedelta(microseconds=1)])
+def test_cursor_round_trip(timestamp):
+    cursor = encode_cursor(timestamp, "3f2a-id")
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (timestamp, "3f2a-id")
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", encode_cursor(START, "x")[:-3], "W10"])
+def test_malformed_cursor_is_a_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+def test_before_filter():
+    assert before_filter("created_at", None) == {}
+    assert before_filter("updated_at", encode_cursor(START, "s1")) == {"$or": [
+        {"updated_at": {"$lt": START}},
+        {"updated_at": START, "id": {"$lt": "s1"}}
+    ]}
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 7, 50])
+def test_pages_cover_every_message_once_in_order(limit):
+    items = messages(23)
+    pages = read_all(items, limit)
+    assert all(len(page) == limit for page in pages[:-1])
+    assert [item for page in reversed(pages) for item in page] == items
+
+def test_last_page_has_no_cursor():
+    items = messages(4)
+    page = page_before(items, "created_at", 4, None)
+    assert len(page) == 4
+    assert page[0]["id"] == "m003"
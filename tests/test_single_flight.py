@@ -0,0 +1,81 @@
+import asyncio
+
+from single_flight import SingleFlight, normalize_query
+
+def test_concurrent_calls_share_one_upstream_call():
+    async def scenario():
+        flight = SingleFlight("test")
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "respuesta"
+
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+        assert results == ["respuesta"] * 5
+        assert calls == [1]
+        assert flight.stats()["upstream_calls"] == 1
+        assert flight.stats()["coalesced_calls"] == 4
+        assert flight.stats()["in_flight"] == 0
+
+        # Nothing is cached once the call finished
+        await flight.do("key", work)
+        assert calls == [1, 1]
+
+    asyncio.run(scenario())
+
+def test_errors_reach_every_waiter():
+    async def scenario():
+        flight = SingleFlight("test")
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream failed")
+
+        results = await asyncio.gather(flight.do("key", work), flight.do("key", work), return_exceptions=True)
+        assert [str(result) for result in results] == ["upstream failed"] * 2
+        assert flight.stats()["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+def test_work_is_cancelled_only_when_the_last_waiter_leaves():
+    async def scenario():
+        flight = SingleFlight("test")
+        started = asyncio.Event()
+        release = asyncio.Event()
+        cancelled = []
+
+        async def work():
+            started.set()
+            try:
+                await release.wait()
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+            return "ok"
+
+        first = asyncio.create_task(flight.do("key", work))
+        second = asyncio.create_task(flight.do("key", work))
+        await started.wait()
+
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        assert cancelled == []
+        release.set()
+        assert await second == "ok"
+
+        release.clear()
+        started.clear()
+        only = asyncio.create_task(flight.do("other", work))
+        await started.wait()
+        only.cancel()
+        await asyncio.gather(only, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert cancelled == [True]
+        assert flight.stats()["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+def test_normalize_query():
+    assert normalize_query("  ¿Qué es el   AI Act?\n") == "¿qué es el ai act?"